@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""Compare loopback TCP against a Unix domain socket backend.
+
+Starts gzip_server.py twice in a subprocess (once per listener type), serves
+the same generated files from a temp directory and drives both with the same
+concurrent load. Each request opens a fresh connection, which is what nginx
+does against an HTTP/1.0 upstream without keepalive.
+
+    python3 bench_listeners.py --requests 5000 --concurrency 8 --size 4096
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SERVER = os.path.join(HERE, "gzip_server.py")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def connect(target):
+    if isinstance(target, str):
+        s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    else:
+        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    s.connect(target)
+    return s
+
+
+def wait_ready(target, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connect(target).close()
+            return
+        except OSError:
+            time.sleep(0.02)
+    raise RuntimeError(f"server on {target} did not come up")
+
+
+def fetch(target, request):
+    s = connect(target)
+    try:
+        s.sendall(request)
+        received = 0
+        while True:
+            chunk = s.recv(65536)
+            if not chunk:
+                return received
+            received += len(chunk)
+    finally:
+        s.close()
+
+
+def run_load(target, path, total, concurrency):
+    request = f"GET {path} HTTP/1.0\r\nHost: bench\r\n\r\n".encode()
+    latencies = []
+    lock = threading.Lock()
+    remaining = [total]
+
+    def worker():
+        local = []
+        while True:
+            with lock:
+                if remaining[0] == 0:
+                    break
+                remaining[0] -= 1
+            start = time.perf_counter()
+            fetch(target, request)
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "rps": total / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+def bench(name, server_args, target, directory, args):
+    proc = subprocess.Popen(
+        [sys.executable, SERVER, "--directory", directory] + server_args,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_ready(target)
+        run_load(target, "/payload.bin", min(200, args.requests), args.concurrency)  # warm up
+        result = run_load(target, "/payload.bin", args.requests, args.concurrency)
+    finally:
+        proc.terminate()
+        proc.wait()
+    print(f"{name:<14} {result['rps']:>10.0f} req/s   p50 {result['p50_ms']:6.2f} ms   p99 {result['p99_ms']:6.2f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--size", type=int, default=4096, help="response body size in bytes")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.path.join(directory, "payload.bin"), "wb") as f:
+            f.write(os.urandom(args.size))
+
+        print(f"{args.requests} requests, concurrency {args.concurrency}, {args.size} byte body")
+        port = free_port()
+        tcp = bench("loopback TCP", ["--bind", "127.0.0.1", "--port", str(port)], ("127.0.0.1", port), directory, args)
+        sock_path = os.path.join(directory, "gzip_server.sock")
+        uds = bench("unix socket", ["--unix", sock_path], sock_path, directory, args)
+        print(f"UDS speedup: {uds['rps'] / tcp['rps']:.2f}x throughput, "
+              f"{tcp['p50_ms'] / uds['p50_ms']:.2f}x median latency")
+
+
+if __name__ == "__main__":
+    main()
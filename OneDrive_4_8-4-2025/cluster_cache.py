@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""Peer-aware cache shared by several gzip_server nodes.
+
+Every node is started with the same static peer list. A consistent hash ring
+over that list names one owner per path. A miss on a non-owner is filled from
+the owner first, and only the owner goes to the origin, so a new build costs
+one origin pull per file for the whole cluster instead of one per node.
+"""
+import bisect
+import hashlib
+import http.client
+import threading
+import urllib.error
+import urllib.request
+from collections import OrderedDict, namedtuple
+from urllib.parse import urlsplit
+
+# Set on node-to-node requests so the owner never forwards again
+HOP_HEADER = "X-Cluster-Hop"
+
+Entry = namedtuple("Entry", "body content_type content_encoding source")
+
+
+class _Fill:
+    """One in-flight fill; waiters read the leader's error when it fails"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.error = None
+
+
+def _hash(value):
+    return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], "big")
+
+
+class HashRing:
+    """Consistent hash ring with virtual nodes for an even key spread"""
+
+    def __init__(self, nodes, replicas=100):
+        self.nodes = sorted(set(nodes))
+        self._ring = sorted(
+            (_hash(f"{node}#{i}"), node) for node in self.nodes for i in range(replicas)
+        )
+        self._keys = [h for h, _ in self._ring]
+
+    def owner(self, key):
+        if not self._ring:
+            return None
+        i = bisect.bisect(self._keys, _hash(key)) % len(self._ring)
+        return self._ring[i][1]
+
+
+class LRUCache:
+    """Byte-bounded LRU of Entry objects"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        if len(entry.body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old.body)
+            self._entries[key] = entry
+            self.size += len(entry.body)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted.body)
+
+
+class ClusterCache:
+    def __init__(self, node_id, peers, origin=None, max_bytes=256 * 1024 * 1024, timeout=5.0):
+        self.node_id = node_id
+        self.ring = HashRing(list(peers) + [node_id])
+        self.origin = origin.rstrip("/") if origin else None
+        self.cache = LRUCache(max_bytes)
+        self.timeout = timeout
+        self.stats = {"hits": 0, "peer_fills": 0, "origin_fills": 0, "misses": 0}
+        self._lock = threading.Lock()
+        self._inflight = {}
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def lookup(self, key, hop=False):
+        """Return an Entry for key, filling from the owning peer or the origin"""
+        entry = self.cache.get(key)
+        if entry is not None:
+            self._count("hits")
+            return entry._replace(source="HIT")
+
+        # Collapse concurrent misses for the same key into a single fill
+        with self._lock:
+            fill = self._inflight.get(key)
+            leader = fill is None
+            if leader:
+                fill = self._inflight[key] = _Fill()
+        if not leader:
+            finished = fill.done.wait(self.timeout * 2)
+            entry = self.cache.get(key)
+            if entry is not None:
+                self._count("hits")
+                return entry._replace(source="HIT")
+            if fill.error is not None:
+                # Same failure as the leader's: a 502, not a 404 for a file that exists
+                raise OSError(f"fill failed: {fill.error}") from fill.error
+            if finished:
+                return None
+            # The leader is stuck; fill on our own rather than guess
+            return self._fill(key, hop)
+
+        try:
+            entry = self._fill(key, hop)
+            if entry is not None:
+                self.cache.put(key, entry)
+            else:
+                self._count("misses")
+            return entry
+        except OSError as e:
+            fill.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            fill.done.set()
+
+    def _fill(self, key, hop):
+        owner = self.ring.owner(key)
+        if not hop and owner != self.node_id:
+            try:
+                entry = self.fetch_from_peer(owner, key)
+                if entry is not None:
+                    self._count("peer_fills")
+                # The owner already tried its disk and the origin, so its 404 is final
+                return entry
+            except (OSError, http.client.HTTPException):
+                pass  # Owner unreachable: go to the origin ourselves
+        if self.origin:
+            entry = self.fetch_from_origin(key)
+            if entry is not None:
+                self._count("origin_fills")
+            return entry
+        return None
+
+    def fetch_from_peer(self, peer, key):
+        host, _, port = peer.rpartition(":")
+        conn = http.client.HTTPConnection(host.strip("[]"), int(port), timeout=self.timeout)
+        try:
+            conn.request("GET", key, headers={HOP_HEADER: self.node_id})
+            response = conn.getresponse()
+            body = response.read()
+            if response.status == 404:
+                return None
+            if response.status != 200:
+                raise http.client.HTTPException(f"peer {peer} returned {response.status}")
+            return Entry(body, response.getheader("Content-Type"), response.getheader("Content-Encoding"), "PEER")
+        finally:
+            conn.close()
+
+    def fetch_from_origin(self, key):
+        try:
+            with urllib.request.urlopen(self.origin + key, timeout=self.timeout) as response:
+                return Entry(
+                    response.read(),
+                    response.headers.get("Content-Type"),
+                    response.headers.get("Content-Encoding"),
+                    "ORIGIN",
+                )
+        except urllib.error.HTTPError as e:
+            if e.code == 404:
+                return None
+            raise
+
+
+def cache_key(request_path):
+    """Files are cached by path; the query string never changes what is served"""
+    return urlsplit(request_path).path
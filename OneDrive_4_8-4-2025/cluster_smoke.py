@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""Run a gzip_server cluster on one host and check it pulls each file once.
+
+Starts an origin plus N cluster nodes as separate processes, each node with an
+empty document root, requests every file from every node and then reads the
+per-node counters from /.cluster/stats.
+
+    python3 cluster_smoke.py --nodes 3 --files 20
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SERVER = os.path.join(HERE, "gzip_server.py")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(port, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.02)
+    raise RuntimeError(f"node on port {port} did not come up")
+
+
+def get(port, path):
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=10) as response:
+        return response.read(), response.headers.get("X-Cache")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nodes", type=int, default=3)
+    parser.add_argument("--files", type=int, default=20)
+    args = parser.parse_args()
+
+    procs = []
+    with tempfile.TemporaryDirectory() as root:
+        build = os.path.join(root, "origin", "Build")
+        os.makedirs(build)
+        files = {}
+        for i in range(args.files):
+            name = f"/Build/chunk{i}.data.gz"
+            files[name] = os.urandom(1024 + i)
+            with open(os.path.join(root, "origin") + name, "wb") as f:
+                f.write(files[name])
+
+        try:
+            origin_port = free_port()
+            procs.append(subprocess.Popen(
+                [sys.executable, SERVER, "--bind", "127.0.0.1", "--port", str(origin_port),
+                 "--directory", os.path.join(root, "origin")],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+
+            ports = [free_port() for _ in range(args.nodes)]
+            peers = ",".join(f"127.0.0.1:{p}" for p in ports)
+            for port in ports:
+                docroot = os.path.join(root, f"node{port}")
+                os.makedirs(docroot)
+                procs.append(subprocess.Popen(
+                    [sys.executable, SERVER, "--bind", "127.0.0.1", "--port", str(port),
+                     "--directory", docroot, "--peers", peers, "--node-id", f"127.0.0.1:{port}",
+                     "--origin", f"http://127.0.0.1:{origin_port}"],
+                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+            for port in [origin_port] + ports:
+                wait_ready(port)
+
+            for port in ports:
+                for name, body in files.items():
+                    data, _ = get(port, name)
+                    assert data == body, f"corrupt body for {name} from node {port}"
+
+            totals = {}
+            for port in ports:
+                stats = json.loads(get(port, "/.cluster/stats")[0])
+                print(f"node {port}: {stats}")
+                for key, value in stats.items():
+                    totals[key] = totals.get(key, 0) + value
+        finally:
+            for proc in procs:
+                proc.terminate()
+                proc.wait()
+
+    print(f"cluster: {totals}")
+    assert totals["origin_fills"] == args.files, "each file should be pulled from the origin exactly once"
+    print(f"OK: {args.files} files, {args.nodes} nodes, {totals['origin_fills']} origin pulls")
+
+
+if __name__ == "__main__":
+    main()
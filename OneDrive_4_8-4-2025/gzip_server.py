@@ -1,9 +1,20 @@
 #!/usr/bin/env python3
 import http.server
 import socketserver
+import argparse
+import socket
+import stat
 import os
 import gzip
 import mimetypes
+import io
+import json
+from functools import partial
+
+from cluster_cache import HOP_HEADER, ClusterCache, cache_key
+
+# First inherited descriptor under the systemd socket-activation protocol
+SD_LISTEN_FDS_START = 3
 
 class GzipHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
     def end_headers(self):
@@ -41,6 +52,8 @@ class GzipHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
         try:
             f = open(path, 'rb')
         except OSError:
+            if getattr(self.server, "cluster", None) is not None:
+                return self.send_cluster_head()
             self.send_error(404, "File not found")
             return None
         
@@ -62,17 +75,187 @@ class GzipHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
         self.end_headers()
         return f
 
+    def send_cluster_head(self):
+        """Serve a file missing from disk out of the cluster cache"""
+        cluster = self.server.cluster
+        key = cache_key(self.path)
+        if key == "/.cluster/stats":
+            return self.send_bytes(json.dumps(cluster.stats).encode(), "application/json")
+        try:
+            entry = cluster.lookup(key, hop=HOP_HEADER in self.headers)
+        except OSError as e:
+            self.send_error(502, f"Cache fill failed: {e}")
+            return None
+        if entry is None:
+            self.send_error(404, "File not found")
+            return None
+        ctype = entry.content_type or self.guess_type(key)
+        encoding = entry.content_encoding or ("gzip" if key.endswith(".gz") else None)
+        return self.send_bytes(entry.body, ctype, encoding, entry.source)
+
+    def send_bytes(self, body, ctype, encoding=None, cache_status=None):
+        self.send_response(200)
+        self.send_header("Content-type", ctype)
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        if cache_status:
+            self.send_header("X-Cache", cache_status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        return io.BytesIO(body)
+
+
+class ReusableTCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    # Lets a restarted server rebind while old connections sit in TIME_WAIT
+    allow_reuse_address = True
+    # Threads keep one slow peer or origin fill from stalling every other client
+    daemon_threads = True
+    # The socketserver default of 5 drops SYNs when a proxy opens connections in bursts
+    request_queue_size = 128
+
+
+class DualStackTCPServer(ReusableTCPServer):
+    """IPv6 listener that also accepts IPv4 clients as ::ffff:a.b.c.d"""
+    address_family = socket.AF_INET6
+
+    def server_bind(self):
+        self.socket.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_V6ONLY, 0)
+        super().server_bind()
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix domain socket listener for a reverse proxy on the same host"""
+    socket_mode = 0o660
+    daemon_threads = True
+    request_queue_size = 128
+
+    def server_bind(self):
+        # Remove a stale socket left by a previous run, but never a regular file
+        try:
+            if stat.S_ISSOCK(os.stat(self.server_address).st_mode):
+                os.unlink(self.server_address)
+        except FileNotFoundError:
+            pass
+        super().server_bind()
+        os.chmod(self.server_address, self.socket_mode)
+
+    def get_request(self):
+        # AF_UNIX peers have no address; the request handler logs client_address[0]
+        request, _ = self.socket.accept()
+        return request, ("unix", 0)
+
+    def server_close(self):
+        super().server_close()
+        try:
+            os.unlink(self.server_address)
+        except OSError:
+            pass
+
+
+class InheritedUnixHTTPServer(UnixHTTPServer):
+    def server_close(self):
+        # The socket path belongs to whoever created the descriptor
+        socketserver.UnixStreamServer.server_close(self)
+
+
+def systemd_listen_fd():
+    """Return the first socket passed by systemd socket activation, or None"""
+    if os.environ.get("LISTEN_PID") != str(os.getpid()):
+        return None
+    count = int(os.environ.get("LISTEN_FDS", "0"))
+    # Don't leak the activation variables into child processes
+    for name in ("LISTEN_PID", "LISTEN_FDS", "LISTEN_FDNAMES"):
+        os.environ.pop(name, None)
+    return SD_LISTEN_FDS_START if count >= 1 else None
+
+
+def server_from_fd(fd, handler):
+    """Wrap an already bound and listening socket inherited from the parent"""
+    sock = socket.socket(fileno=fd)
+    if sock.type != socket.SOCK_STREAM:
+        raise ValueError(f"inherited fd {fd} is not a stream socket")
+    if sock.family == socket.AF_UNIX:
+        server_class = InheritedUnixHTTPServer
+    elif sock.family == socket.AF_INET6:
+        server_class = DualStackTCPServer
+    else:
+        server_class = ReusableTCPServer
+    httpd = server_class(sock.getsockname(), handler, bind_and_activate=False)
+    httpd.socket.close()
+    httpd.socket = sock
+    httpd.server_address = sock.getsockname()
+    return httpd
+
+
+def make_server(args, handler):
+    """Create the listener selected on the command line"""
+    if args.systemd:
+        fd = systemd_listen_fd()
+        if fd is None:
+            raise SystemExit("--systemd given but no socket was passed (LISTEN_FDS)")
+        return server_from_fd(fd, handler)
+    if args.fd is not None:
+        return server_from_fd(args.fd, handler)
+    if args.unix:
+        return UnixHTTPServer(args.unix, handler)
+    if args.ipv6:
+        return DualStackTCPServer((args.bind or "::", args.port), handler)
+    return ReusableTCPServer((args.bind or "0.0.0.0", args.port), handler)
+
+
+def describe_listener(httpd):
+    if httpd.address_family == socket.AF_UNIX:
+        return f"unix:{httpd.server_address}"
+    host, port = httpd.server_address[:2]
+    if httpd.address_family == socket.AF_INET6:
+        return f"http://[{host}]:{port}"
+    return f"http://{host}:{port}"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Static file server for gzipped Unity WebGL builds")
+    parser.add_argument("--port", type=int, default=8000, help="TCP port (default: 8000)")
+    parser.add_argument("--bind", help="address to bind (default: 0.0.0.0, or :: with --ipv6)")
+    parser.add_argument("--directory", default=os.getcwd(), help="directory to serve (default: current)")
+    listener = parser.add_mutually_exclusive_group()
+    listener.add_argument("--ipv6", action="store_true", help="dual-stack IPv6 listener that also accepts IPv4")
+    listener.add_argument("--unix", metavar="PATH", help="listen on a Unix domain socket instead of TCP")
+    listener.add_argument("--fd", type=int, metavar="N", help="serve on an inherited, already listening socket")
+    listener.add_argument("--systemd", action="store_true", help="use the socket passed by systemd (LISTEN_FDS)")
+    cluster = parser.add_argument_group("cluster cache")
+    cluster.add_argument("--peers", help="comma-separated host:port list of every node in the cluster")
+    cluster.add_argument("--node-id", help="this node's host:port as it appears in --peers")
+    cluster.add_argument("--origin", help="base URL to fill misses from when no peer has the file")
+    cluster.add_argument("--cache-mb", type=int, default=256, help="in-memory cache size (default: 256)")
+    args = parser.parse_args(argv)
+    if args.peers and not args.node_id:
+        parser.error("--peers requires --node-id")
+    return args
+
+
+def make_cluster(args):
+    """Build the shared cache when --peers or --origin is given, else None"""
+    if not (args.peers or args.origin):
+        return None
+    peers = [p.strip() for p in (args.peers or "").split(",") if p.strip()]
+    node_id = args.node_id or f"127.0.0.1:{args.port}"
+    return ClusterCache(node_id, peers, origin=args.origin, max_bytes=args.cache_mb * 1024 * 1024)
+
+
 if __name__ == "__main__":
-    PORT = 8000
-    Handler = GzipHTTPRequestHandler
-    
-    # Bind to all network interfaces (0.0.0.0) instead of just localhost
-    with socketserver.TCPServer(("0.0.0.0", PORT), Handler) as httpd:
-        print(f"Server running at http://0.0.0.0:{PORT}")
-        print("Accessible from other computers on your network")
+    args = parse_args()
+    Handler = partial(GzipHTTPRequestHandler, directory=args.directory)
+
+    with make_server(args, Handler) as httpd:
+        httpd.cluster = make_cluster(args)
+        print(f"Server running at {describe_listener(httpd)}")
+        if httpd.cluster:
+            print(f"Cluster node {httpd.cluster.node_id} of {len(httpd.cluster.ring.nodes)}, origin: {args.origin or 'none'}")
+        if httpd.address_family != socket.AF_UNIX:
+            print("Accessible from other computers on your network")
         print("Press Ctrl+C to stop the server")
         try:
             httpd.serve_forever()
         except KeyboardInterrupt:
             print("\nShutting down server...")
-            httpd.shutdown() 
\ No newline at end of file
+            httpd.shutdown()
@@ -2,15 +2,27 @@
 
 import os
 import sys
-import select
 import subprocess
 import time
 
+from claude_notify import profiler, sink
+from claude_notify.detector import get_detector
+from claude_notify.dispatch import get_dispatcher
+from claude_notify.ratecontrol import RateController, describe
+from claude_notify.relay import PtyRelay, sync_window_size
+from claude_notify.screen import PromptWatcher
+from claude_notify.timers import IdleTimer
+
 # Configuration
-CLAUDE_PATH = "/Users/chrismcdaniels/.claude/local/claude"
+CLAUDE_PATH = os.environ.get('CLAUDE_PATH', "/Users/chrismcdaniels/.claude/local/claude")
+DETECTOR = get_detector('prompt')
+# Seconds of quiet with a prompt on screen before notifying; 0 notifies on the prompt itself
+IDLE_DELAY = float(os.environ.get('CLAUDE_NOTIFY_IDLE', '0'))
 
 def send_notification():
     """Send notification when Claude is waiting"""
+    if sink.capture('desktop', message="Claude is waiting for your input"):
+        return
     # Play sound
     subprocess.run(['afplay', '/System/Library/Sounds/Glass.aiff'], capture_output=True)
     
@@ -25,27 +37,15 @@ def send_notification():
     time.sleep(0.1)
     subprocess.run(['osascript', '-e', 'tell application "Terminal" to set frontmost to false'], capture_output=True)
 
-def monitor_output(text):
-    """Check if output indicates Claude is waiting"""
-    lines = text.strip().split('\n')
-    if not lines:
-        return False
-        
-    last_line = lines[-1].strip()
-    
-    # Common waiting patterns
-    waiting_indicators = [
-        last_line == '>',
-        last_line == '❯',
-        last_line == '$',
-        last_line.endswith(':'),
-        last_line.endswith('?'),
-        'waiting' in last_line.lower(),
-        'enter' in last_line.lower() and ':' in last_line,
-        len(last_line) < 5 and any(c in last_line for c in ['>', '$', ':', '?', '❯'])
-    ]
-    
-    return any(waiting_indicators)
+def notify_desktop(message="Claude is waiting for your input"):
+    """Sound and notification banner, run on the dispatcher"""
+    if sink.capture('desktop', message=message):
+        return
+    subprocess.run(['afplay', '/System/Library/Sounds/Glass.aiff'], capture_output=True)
+    subprocess.run([
+        'osascript', '-e',
+        f'display notification "{message}" with title "Claude Code"'
+    ], capture_output=True)
 
 def main():
     print("Claude Notify Wrapper (Simple)")
@@ -54,6 +54,7 @@ def main():
     
     # Use pty to handle interactive mode properly
     import pty
+    import signal
     import termios
     import tty
     
@@ -63,6 +64,7 @@ def main():
     try:
         # Create a pseudo-terminal
         master_fd, slave_fd = pty.openpty()
+        rows, cols = sync_window_size(sys.stdin.fileno(), master_fd) or (24, 80)
         
         # Start Claude in the pty
         cmd = [CLAUDE_PATH] + sys.argv[1:]
@@ -81,58 +83,55 @@ def main():
         tty.setraw(sys.stdin.fileno())
         
         # Monitor claude output
-        last_notification = 0
-        output_buffer = ""
+        # Track Claude's screen so detection sees the redrawn prompt, not raw escapes
+        watcher = PromptWatcher(DETECTOR, rows, cols)
+        new_size = None
         waiting_detected = False
         
-        while True:
-            # Check if process is still running
-            if process.poll() is not None:
-                break
-                
-            # Use select to check for available data
-            r, w, e = select.select([sys.stdin, master_fd], [], [], 0.1)
-            
-            # Handle input from user
-            if sys.stdin in r:
-                data = os.read(sys.stdin.fileno(), 1024)
-                if data:
-                    os.write(master_fd, data)
-                    waiting_detected = False  # Reset when user types
-                    
-            # Handle output from Claude
-            if master_fd in r:
-                try:
-                    data = os.read(master_fd, 1024)
-                    if data:
-                        # Write to stdout
-                        os.write(sys.stdout.fileno(), data)
-                        
-                        # Add to buffer for analysis
-                        try:
-                            output_buffer += data.decode('utf-8', errors='ignore')
-                        except:
-                            output_buffer = ""
-                        
-                        # Keep buffer reasonable size
-                        if len(output_buffer) > 1000:
-                            output_buffer = output_buffer[-500:]
-                        
-                        # Check if Claude is waiting
-                        current_time = time.time()
-                        if (not waiting_detected and 
-                            current_time - last_notification > 3 and
-                            monitor_output(output_buffer)):
-                            waiting_detected = True
-                            last_notification = current_time
-                            # Send notification in background
-                            subprocess.Popen(['python3', '-c', 
-                                'import subprocess, time; time.sleep(0.5); ' +
-                                'subprocess.run(["afplay", "/System/Library/Sounds/Glass.aiff"], capture_output=True); ' +
-                                'subprocess.run(["osascript", "-e", \'display notification "Claude is waiting for your input" with title "Claude Code"\'], capture_output=True)'
-                            ])
-                except OSError:
-                    break
+        def on_winch(signum, frame):
+            nonlocal new_size
+            new_size = sync_window_size(sys.stdin.fileno(), master_fd)
+        signal.signal(signal.SIGWINCH, on_winch)
+        
+        def on_input(data):
+            nonlocal waiting_detected
+            waiting_detected = False  # Reset when user types
+            dispatcher.cancel('waiting')
+            rate.reset()
+        
+        def notify_waiting(prompt):
+            nonlocal waiting_detected
+            # Check if Claude is waiting
+            if not waiting_detected:
+                waiting_detected = True
+                rate.offer(prompt)
+        
+        def send_notice(notice):
+            # Send notification on a worker; typing before it starts drops it
+            message = describe(notice.count, "Claude is waiting for your input")
+            dispatcher.submit('desktop', notify_desktop, message, key='waiting')
+        
+        dispatcher = get_dispatcher()
+        
+        def on_output(data):
+            nonlocal new_size
+            if new_size:
+                watcher.screen.resize(*new_size)
+                new_size = None
+            # Only rows this chunk redrew are checked for a prompt
+            prompt = watcher.feed(data)
+            if idle:
+                # Any output pushes the deadline back; a prompt leaving the screen disarms it
+                idle.touch(watcher.current)
+            elif prompt:
+                notify_waiting(prompt)
+        
+        # Relay terminal <-> Claude until Claude closes the pty
+        relay = PtyRelay(master_fd, sys.stdin.fileno(), sys.stdout.fileno(),
+                         on_output=on_output, on_input=on_input)
+        idle = IdleTimer(relay.timers, IDLE_DELAY, notify_waiting) if IDLE_DELAY > 0 else None
+        rate = RateController('desktop', send_notice, timers=relay.timers)
+        relay.run()
                     
     except KeyboardInterrupt:
         pass
@@ -152,6 +151,7 @@ def main():
             process.wait()
 
 if __name__ == "__main__":
+    profiler.from_argv()
     if '--test' in sys.argv:
         print("Testing notification system...")
         send_notification()
@@ -1,13 +1,22 @@
 #!/usr/bin/env python3
 
+import os
 import subprocess
 import sys
 import time
 
-CLAUDE_PATH = "/Users/chrismcdaniels/.claude/local/claude"
+from claude_notify import profiler, sink
+from claude_notify.detector import get_detector
+from claude_notify.passthrough import stream_lines
+from claude_notify.ratecontrol import RateController
+
+CLAUDE_PATH = os.environ.get('CLAUDE_PATH', "/Users/chrismcdaniels/.claude/local/claude")
+DETECTOR = get_detector('visual')
 
 def send_notification():
     """Send visual notifications only"""
+    if sink.capture('desktop', message="Claude is waiting for your input"):
+        return
     # macOS notification (visual popup)
     subprocess.run([
         'osascript', '-e',
@@ -34,33 +43,30 @@ def main():
     process = subprocess.Popen(
         [CLAUDE_PATH] + sys.argv[1:],
         stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        universal_newlines=True,
-        bufsize=1
+        stderr=subprocess.STDOUT,
+        bufsize=0
     )
     
     output_buffer = []
-    last_notification = 0
+    # Dedups flapping prompts and merges bursts into one digest
+    rate = RateController('desktop', lambda notice: send_notification())
     
-    for line in process.stdout:
-        print(line, end='')
-        output_buffer.append(line)
+    for line in stream_lines(process.stdout):
+        # A quiet partial line is yielded early and again once finished;
+        # only the finished one goes into the buffer
+        if line.endswith('\n'):
+            output_buffer.append(line)
         
         # Keep buffer small
         if len(output_buffer) > 20:
             output_buffer = output_buffer[-10:]
         
         # Check for waiting patterns
-        stripped = line.strip()
-        if stripped and len(stripped) < 10:
-            waiting_patterns = ['>', '❯', '$', 'Human:', 'You:']
-            if any(p in stripped for p in waiting_patterns):
-                current_time = time.time()
-                if current_time - last_notification > 3:
-                    last_notification = current_time
-                    send_notification()
+        if DETECTOR.is_waiting(line):
+            rate.offer(line)
 
 if __name__ == "__main__":
+    profiler.from_argv()
     if '--test' in sys.argv:
         print("Testing visual notifications...")
         send_notification()
@@ -2,16 +2,24 @@
 
 import subprocess
 import sys
-import re
 import time
 import os
-from threading import Thread, Lock
+from threading import Lock
 from queue import Queue, Empty
 
+from claude_notify import profiler, sink
+from claude_notify.detector import get_detector
+from claude_notify.dispatch import get_dispatcher
+from claude_notify.passthrough import stream_lines
+from claude_notify.ratecontrol import RateController, describe
+from claude_notify.timers import IdleTimer, TimerThread
+
 # Configuration
 BELL_ENABLED = True
 NOTIFICATION_ENABLED = True
 DOCK_BOUNCE_ENABLED = True
+# Quiet time after a prompt before notifying; new output before then cancels it
+IDLE_DELAY = float(os.environ.get('CLAUDE_NOTIFY_IDLE', '0.5'))
 SOUND_NAME = "Glass"  # macOS sound: "Basso", "Blow", "Bottle", "Frog", "Funk", "Glass", "Hero", "Morse", "Ping", "Pop", "Purr", "Sosumi", "Submarine", "Tink"
 
 # ANSI colors
@@ -22,42 +30,29 @@ NC = '\033[0m'  # No Color
 
 class ClaudeMonitor:
     def __init__(self):
-        self.waiting_patterns = [
-            r'^>+\s*$',  # Simple prompt
-            r'^❯+\s*$',  # Fancy prompt
-            r'^\$\s*$',  # Shell prompt
-            r'^(Human|User|You):\s*$',  # Conversation prompts
-            r'waiting for (input|response|you)',  # Explicit waiting messages
-            r'(Type|Enter|Input|Provide).*:?\s*$',  # Input requests
-            r'^\s*\[\s*\]\s*$',  # Empty bracket prompt
-            r'continue\?.*$',  # Continue prompts
-        ]
-        self.waiting_regex = re.compile('|'.join(self.waiting_patterns), re.IGNORECASE)
-        
-        self.not_waiting_patterns = [
-            r'```',  # Code blocks
-            r'^\s*#',  # Comments
-            r'^\s*\/\/',  # Comments
-            r'Error:|Warning:|Info:',  # Log messages
-        ]
-        self.not_waiting_regex = re.compile('|'.join(self.not_waiting_patterns), re.IGNORECASE)
+        self.detector = get_detector('monitor')
         
         self.in_waiting_state = False
-        self.last_notification_time = 0
-        self.notification_cooldown = 3  # seconds
         self.output_buffer = []
         self.buffer_lock = Lock()
+        # One timer thread for every pending deadline instead of a thread per prompt;
+        # the notification itself runs on the dispatcher so sounds never delay a deadline
+        timers = TimerThread()
+        self.idle = IdleTimer(timers, IDLE_DELAY, self.queue_notification)
+        # Dedups flapping prompts and merges bursts into one digest
+        self.rate = RateController('desktop', self.dispatch_notification, timers=timers)
+        
+    def queue_notification(self, line=None):
+        self.rate.offer(line or '')
+        
+    def dispatch_notification(self, notice):
+        message = describe(notice.count, "Claude is waiting for your input")
+        get_dispatcher().submit('desktop', self.send_notification, message, key='waiting')
         
     def send_notification(self, message="Claude is waiting for your input"):
         """Send notifications through multiple channels"""
-        current_time = time.time()
-        
-        # Check cooldown
-        if current_time - self.last_notification_time < self.notification_cooldown:
-            print(f"{YELLOW}[DEBUG: Notification skipped - cooldown]{NC}", file=sys.stderr)
+        if sink.capture('desktop', message=message):
             return
-            
-        self.last_notification_time = current_time
         print(f"{GREEN}[DEBUG: Sending notification]{NC}", file=sys.stderr)
         
         # Terminal bell / System sound
@@ -96,25 +91,7 @@ class ClaudeMonitor:
     
     def is_waiting_indicator(self, line):
         """Determine if a line indicates Claude is waiting"""
-        stripped = line.strip()
-        
-        # Empty lines don't count
-        if not stripped:
-            return False
-            
-        # Check negative patterns first
-        if self.not_waiting_regex.search(line):
-            return False
-            
-        # Check positive patterns
-        if self.waiting_regex.search(line):
-            return True
-            
-        # Check for very short lines that might be prompts
-        if len(stripped) <= 3 and any(c in stripped for c in ['>', '$', ':', '?', '❯']):
-            return True
-            
-        return False
+        return self.detector.is_waiting(line)
     
     def analyze_recent_output(self):
         """Analyze recent output to determine if Claude is waiting"""
@@ -139,15 +116,15 @@ class ClaudeMonitor:
     
     def process_line(self, line):
         """Process a single line of output"""
-        # Add to buffer
-        with self.buffer_lock:
-            self.output_buffer.append(line)
-            # Keep buffer size manageable
-            if len(self.output_buffer) > 100:
-                self.output_buffer = self.output_buffer[-50:]
+        # Add to buffer; a quiet partial line comes back again once it is finished
+        if line.endswith('\n'):
+            with self.buffer_lock:
+                self.output_buffer.append(line)
+                # Keep buffer size manageable
+                if len(self.output_buffer) > 100:
+                    self.output_buffer = self.output_buffer[-50:]
         
-        # Print the line
-        print(line, end='')
+        # stream_lines() has already passed the bytes through to the terminal
         
         # Debug output
         stripped = line.strip()
@@ -155,16 +132,21 @@ class ClaudeMonitor:
             print(f"{BLUE}[DEBUG: Line='{stripped}' len={len(stripped)}]{NC}", file=sys.stderr)
         
         # Check if this indicates waiting
-        if self.is_waiting_indicator(line) or self.analyze_recent_output():
+        with profiler.span('decision'):
+            waiting = self.is_waiting_indicator(line) or self.analyze_recent_output()
+        if waiting:
             print(f"{GREEN}[DEBUG: Waiting indicator detected]{NC}", file=sys.stderr)
             if not self.in_waiting_state:
                 self.in_waiting_state = True
                 print(f"{GREEN}[DEBUG: Setting waiting state and triggering notification]{NC}", file=sys.stderr)
-                # Small delay to ensure we're really waiting
-                Thread(target=lambda: (time.sleep(0.5), self.send_notification())).start()
+                # Notify only if output stays quiet for IDLE_DELAY
+                self.idle.touch(line)
         else:
-            # Reset waiting state on substantial output
-            if len(line.strip()) > 20:
+            if line.strip():
+                # Output resumed, so Claude was not waiting after all; the next
+                # prompt must arm the timer again even after a short line
+                self.idle.cancel()
+                get_dispatcher().cancel('waiting')
                 self.in_waiting_state = False
 
 def test_notifications():
@@ -192,6 +174,7 @@ def main():
     # Start Claude process
     # First try to find claude in common locations
     claude_paths = [
+        os.environ.get('CLAUDE_PATH', ''),
         '/Users/chrismcdaniels/.claude/local/claude',  # Your specific claude location
         os.path.expanduser('~/.claude/local/claude'),
         'claude',
@@ -230,8 +213,7 @@ def main():
             stdin=sys.stdin,
             stdout=subprocess.PIPE,
             stderr=subprocess.STDOUT,
-            universal_newlines=True,
-            bufsize=1
+            bufsize=0
         )
     else:
         # Non-interactive mode
@@ -239,14 +221,14 @@ def main():
             cmd,
             stdout=subprocess.PIPE,
             stderr=subprocess.STDOUT,
-            universal_newlines=True,
-            bufsize=1
+            bufsize=0
         )
     
     # Monitor output
     try:
-        for line in process.stdout:
-            monitor.process_line(line)
+        for line in stream_lines(process.stdout):
+            with profiler.span('process_line'):
+                monitor.process_line(line)
     except KeyboardInterrupt:
         process.terminate()
         sys.exit(0)
@@ -257,4 +239,5 @@ def main():
         sys.exit(process.returncode)
 
 if __name__ == "__main__":
+    profiler.from_argv()
     main()
\ No newline at end of file
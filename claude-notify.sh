@@ -4,7 +4,7 @@
 # This script monitors Claude output and triggers notifications when waiting for input
 
 # Configuration
-CLAUDE_CMD="claude"
+CLAUDE_CMD="${CLAUDE_PATH:-claude}"
 BELL_ENABLED=true
 NOTIFICATION_ENABLED=true
 DOCK_BOUNCE_ENABLED=true
@@ -19,6 +19,14 @@ NC='\033[0m' # No Color
 send_notification() {
     local message="$1"
     
+    # Local stand-in sink (see claude_notify/sink.py); python3 does the JSON
+    # escaping and the sub-second time that BSD date lacks
+    if [[ -n "$CLAUDE_NOTIFY_SINK" ]]; then
+        python3 -c 'import json, sys, time; print(json.dumps({"time": time.time(), "pid": int(sys.argv[1]), "channel": "desktop", "message": sys.argv[2]}, ensure_ascii=False))' \
+            "$$" "$message" >> "$CLAUDE_NOTIFY_SINK"
+        return
+    fi
+    
     # Terminal bell
     if [[ "$BELL_ENABLED" == true ]]; then
         printf "$BELL"
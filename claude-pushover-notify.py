@@ -2,26 +2,43 @@
 
 import os
 import sys
-import requests
 import subprocess
 import time
 import hashlib
 from datetime import datetime
 
+from claude_notify import metrics, profiler, transport
+from claude_notify.breaker import guarded
+from claude_notify.detector import get_detector
+from claude_notify.fanout import FIRST, Channel, fan_out
+from claude_notify.outbox import Outbox
+from claude_notify.passthrough import stream_lines
+from claude_notify.payload import budget_for, fit_context
+from claude_notify.ratecontrol import RateController, describe
+
 # Pushover configuration (very secure, no public webhooks)
 PUSHOVER_USER_KEY = os.environ.get('PUSHOVER_USER_KEY', '')
 PUSHOVER_APP_TOKEN = os.environ.get('PUSHOVER_APP_TOKEN', '')
+PUSHOVER_API_BASE = os.environ.get('PUSHOVER_API_BASE', 'https://api.pushover.net').rstrip('/')
 
 # Optional: Telegram Bot (also secure)
 TELEGRAM_BOT_TOKEN = os.environ.get('TELEGRAM_BOT_TOKEN', '')
 TELEGRAM_CHAT_ID = os.environ.get('TELEGRAM_CHAT_ID', '')
+TELEGRAM_API_BASE = os.environ.get('TELEGRAM_API_BASE', 'https://api.telegram.org').rstrip('/')
 
-CLAUDE_PATH = "/Users/chrismcdaniels/.claude/local/claude"
+CLAUDE_PATH = os.environ.get('CLAUDE_PATH', "/Users/chrismcdaniels/.claude/local/claude")
+DETECTOR = get_detector('strict')
+# Seconds to wait on Pushover before also trying Telegram
+HEDGE_DELAY = float(os.environ.get('CLAUDE_NOTIFY_HEDGE', '2'))
 
 class SecureMobileNotifier:
     def __init__(self):
         self.session_id = hashlib.md5(str(time.time()).encode()).hexdigest()[:8]
-        self.last_notification = 0
+        # Dedups flapping prompts and merges bursts into one digest
+        self.rate = RateController('mobile', lambda notice: self.notify(
+            notice.context, notice.text, notice.count, notice.detected))
+        # Delivery runs on the outbox thread, with retries and replay after a restart
+        self.outbox = Outbox({'mobile': self.deliver})
         
     def send_pushover(self, message, priority=0):
         """Send notification via Pushover (recommended)"""
@@ -44,8 +61,8 @@ class SecureMobileNotifier:
                 data['retry'] = 30  # Retry every 30 seconds
                 data['expire'] = 600  # Expire after 10 minutes
                 
-            response = requests.post(
-                'https://api.pushover.net/1/messages.json',
+            response = transport.post(
+                f'{PUSHOVER_API_BASE}/1/messages.json',
                 data=data,
                 timeout=10
             )
@@ -63,7 +80,7 @@ class SecureMobileNotifier:
             
         try:
             # Telegram bot API
-            url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
+            url = f"{TELEGRAM_API_BASE}/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
             
             data = {
                 'chat_id': TELEGRAM_CHAT_ID,
@@ -71,17 +88,17 @@ class SecureMobileNotifier:
                 'parse_mode': 'Markdown'
             }
             
-            response = requests.post(url, json=data, timeout=10)
+            response = transport.post(url, json=data, timeout=10)
             return response.status_code == 200
             
         except Exception as e:
             print(f"Telegram error: {e}")
             return False
             
-    def notify(self, context, waiting_line):
+    def notify(self, context, waiting_line, count=1, detected=None):
         """Send secure mobile notification"""
         # Format message
-        message = f"""🔔 *Claude Waiting*
+        message = f"""🔔 *{describe(count, 'Claude Waiting')}*
         
 Session: {self.session_id}
 Time: {datetime.now().strftime('%H:%M:%S')}
@@ -90,24 +107,32 @@ Waiting at: {waiting_line}
 
 Recent output:
 ```
-{context[-300:]}
+{fit_context(context, budget_for('pushover'))}
 ```"""
         
-        # Try Pushover first (most reliable)
-        success = False
+        self.outbox.enqueue('mobile', {'message': message, 'detected': detected})
+        
+    def deliver(self, payload):
+        """Send a queued notification; False asks the outbox to retry it"""
+        message = payload['message']
+        # Pushover first (most reliable); Telegram is hedged in if Pushover
+        # fails, has not answered within HEDGE_DELAY, or its breaker is open
+        channels = []
         if PUSHOVER_USER_KEY:
-            success = self.send_pushover(message, priority=1)
-            if success:
-                print("✅ Pushover notification sent")
+            channels.append(Channel('Pushover', guarded('pushover', lambda: self.send_pushover(message, priority=1)), timeout=10))
+        if TELEGRAM_BOT_TOKEN:
+            hedge = HEDGE_DELAY if channels else None
+            channels.append(Channel('Telegram', guarded('telegram', lambda: self.send_telegram(message)), timeout=10, hedge_after=hedge))
                 
-        # Try Telegram as backup
-        if not success and TELEGRAM_BOT_TOKEN:
-            success = self.send_telegram(message)
-            if success:
-                print("✅ Telegram notification sent")
-                
-        if not success:
+        if not channels:
             print("❌ No notification service configured")
+            return True  # Nothing will ever deliver it
+        result = fan_out(channels, policy=FIRST, detected=payload.get('detected'))
+        if result.winner:
+            print(f"✅ {result.winner} notification sent")
+        else:
+            print("❌ Notification failed, will retry")
+        return result.winner is not None
 
 def setup_instructions():
     """Print setup instructions"""
@@ -152,6 +177,7 @@ def main():
         print("Testing mobile notifications...")
         notifier = SecureMobileNotifier()
         notifier.notify("Test context\nLine 2\nLine 3", "> Waiting for input")
+        notifier.outbox.close(timeout=30)
         return
         
     # Check configuration
@@ -176,40 +202,39 @@ def main():
     notifier = SecureMobileNotifier()
     
     cmd = [CLAUDE_PATH] + sys.argv[1:]
+    metrics.dump_at_exit()
     process = subprocess.Popen(
         cmd,
         stdout=subprocess.PIPE,
         stderr=subprocess.STDOUT,
         stdin=sys.stdin,
-        universal_newlines=True,
-        bufsize=1
+        bufsize=0
     )
     
     output_buffer = []
     
     try:
-        for line in process.stdout:
-            print(line, end='')
-            output_buffer.append(line)
+        for line in stream_lines(process.stdout):
+            # A quiet partial line is yielded early and again once finished;
+            # only the finished one goes into the buffer
+            if line.endswith('\n'):
+                output_buffer.append(line)
             
             if len(output_buffer) > 30:
                 output_buffer = output_buffer[-20:]
                 
             # Simple waiting detection
             stripped = line.strip()
-            if (stripped in ['>', '❯', '$', 'Human:', 'You:'] or
-                (stripped.endswith(':') and len(stripped) < 20)):
-                
-                current_time = time.time()
-                if current_time - notifier.last_notification > 60:  # 1 minute cooldown
-                    notifier.last_notification = current_time
-                    context = ''.join(output_buffer[-10:])
-                    notifier.notify(context, stripped)
+            if DETECTOR.is_waiting(stripped):
+                context = ''.join(output_buffer[-10:])
+                notifier.rate.offer(stripped, context)
                     
     except KeyboardInterrupt:
         print("\nStopped")
     finally:
         process.terminate()
+        notifier.outbox.close(timeout=2)
 
 if __name__ == "__main__":
+    profiler.from_argv()
     main()
\ No newline at end of file
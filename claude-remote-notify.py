@@ -3,14 +3,22 @@
 import os
 import sys
 import json
-import requests
 import subprocess
 import time
-import re
 import threading
 from datetime import datetime
-from flask import Flask, request, jsonify
-import queue
+
+from claude_notify import metrics, profiler, recorder, transport, tunnel
+from claude_notify.detector import get_detector
+from claude_notify.dispatch import get_dispatcher
+from claude_notify.fanout import ALL, Channel, fan_out
+from claude_notify.lines import LineRing
+from claude_notify.options import OptionTracker
+from claude_notify.ratecontrol import RateController, describe
+from claude_notify.readiness import BackgroundTask, port_open, report, wait_until
+from claude_notify.relay import Mailbox, PtyRelay, sync_window_size
+from claude_notify.screen import PromptWatcher
+from claude_notify.timers import IdleTimer
 
 # Configuration - You'll need to set these
 TEAMS_WEBHOOK_URL = os.environ.get('TEAMS_WEBHOOK_URL', '')  # Get from Teams channel
@@ -20,64 +28,49 @@ TWILIO_FROM_NUMBER = os.environ.get('TWILIO_FROM_NUMBER', '')  # Your Twilio num
 TWILIO_TO_NUMBER = os.environ.get('TWILIO_TO_NUMBER', '')  # Your phone number
 
 # Local config
-CLAUDE_PATH = "/Users/chrismcdaniels/.claude/local/claude"
+CLAUDE_PATH = os.environ.get('CLAUDE_PATH', "/Users/chrismcdaniels/.claude/local/claude")
 WEBHOOK_PORT = 8888
 NGROK_ENABLED = True  # Use ngrok for external access
+DETECTOR = get_detector('remote')
+# Seconds of quiet with a prompt on screen before notifying; 0 notifies on the prompt itself
+IDLE_DELAY = float(os.environ.get('CLAUDE_NOTIFY_IDLE', '0'))
+# Each gets its own RateController; SMS costs money and buzzes a phone, so its policy is tighter
+CHANNELS = ('teams', 'sms')
 
-# Global queue for remote commands
-command_queue = queue.Queue()
-app = Flask(__name__)
+# Remote commands from the webhook thread; put() wakes the PTY loop
+command_queue = Mailbox()
+# Background startup steps, reported on /health
+STARTUP_TASKS = []
 
 class RemoteNotifier:
     def __init__(self):
         self.session_id = datetime.now().strftime("%Y%m%d_%H%M%S")
         self.ngrok_url = None
         self.last_context = []
+        # Status lines from send_*, which run on dispatcher workers
+        self.log = print
         
     def start_ngrok(self):
-        """Start ngrok tunnel for receiving remote commands"""
+        """Start an ngrok tunnel for remote commands; returns its public URL.
+        
+        Runs in the background while Claude starts, so it reports problems by
+        raising instead of printing over Claude's screen.
+        """
         if not NGROK_ENABLED:
             return None
             
-        try:
-            # Check if ngrok is installed
-            result = subprocess.run(['which', 'ngrok'], capture_output=True)
-            if result.returncode != 0:
-                print("⚠️  ngrok not found. Install with: brew install ngrok")
-                return None
-                
-            # Kill any existing ngrok
-            subprocess.run(['pkill', 'ngrok'], capture_output=True)
-            time.sleep(1)
-            
-            # Start ngrok
-            subprocess.Popen(['ngrok', 'http', str(WEBHOOK_PORT)], 
-                           stdout=subprocess.DEVNULL, 
-                           stderr=subprocess.DEVNULL)
-            time.sleep(3)
-            
-            # Get ngrok URL
-            try:
-                response = requests.get('http://localhost:4040/api/tunnels', timeout=5)
-                tunnels = response.json()['tunnels']
-                for tunnel in tunnels:
-                    if tunnel['proto'] == 'https':
-                        self.ngrok_url = tunnel['public_url']
-                        print(f"✅ Remote access URL: {self.ngrok_url}/command")
-                        return self.ngrok_url
-            except:
-                print("⚠️  Could not get ngrok URL")
-                
-        except Exception as e:
-            print(f"⚠️  ngrok error: {e}")
-            
-        return None
+        # Reuses a tunnel another session already has open to this port
+        return tunnel.start_ngrok(WEBHOOK_PORT)
+        
+    def enable_remote(self, tunnel_url):
+        """Switch on Teams action buttons once the tunnel and webhook server are up"""
+        self.ngrok_url = tunnel_url
         
     def send_teams_notification(self, message, options=None):
         """Send notification to Microsoft Teams"""
         if not TEAMS_WEBHOOK_URL:
-            print("⚠️  Teams webhook URL not configured")
-            return
+            self.log("⚠️  Teams webhook URL not configured")
+            return False
             
         try:
             # Create adaptive card
@@ -115,25 +108,24 @@ class RemoteNotifier:
                 
                 card["potentialAction"] = actions
                 
-            response = requests.post(TEAMS_WEBHOOK_URL, json=card, timeout=10)
+            response = transport.post(TEAMS_WEBHOOK_URL, json=card, timeout=10)
             if response.status_code == 200:
-                print("✅ Teams notification sent")
-            else:
-                print(f"⚠️  Teams error: {response.status_code}")
+                self.log("✅ Teams notification sent")
+                return True
+            self.log(f"⚠️  Teams error: {response.status_code}")
                 
         except Exception as e:
-            print(f"⚠️  Teams notification error: {e}")
+            self.log(f"⚠️  Teams notification error: {e}")
+        return False
             
     def send_sms_notification(self, message, options=None):
         """Send SMS notification via Twilio"""
         if not all([TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_FROM_NUMBER, TWILIO_TO_NUMBER]):
-            print("⚠️  Twilio not configured")
-            return
+            self.log("⚠️  Twilio not configured")
+            return False
             
         try:
-            from twilio.rest import Client
-            
-            client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+            client = transport.get_twilio_client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
             
             # Format message
             sms_body = f"Claude waiting:\n{message}\n"
@@ -149,90 +141,115 @@ class RemoteNotifier:
                 to=TWILIO_TO_NUMBER
             )
             
-            print(f"✅ SMS sent: {message.sid}")
+            self.log(f"✅ SMS sent: {message.sid}")
+            return True
             
         except ImportError:
-            print("⚠️  Twilio not installed. Run: pip install twilio")
+            self.log("⚠️  Twilio not installed. Run: pip install twilio")
         except Exception as e:
-            print(f"⚠️  SMS error: {e}")
+            self.log(f"⚠️  SMS error: {e}")
+        return False
             
-    def extract_options(self, output_buffer):
-        """Extract numbered options from Claude's output"""
-        options = []
-        
-        # Look for numbered lists
-        lines = output_buffer.split('\n')
-        for line in lines:
-            # Match patterns like "1. ", "1) ", "[1]", etc.
-            match = re.match(r'^\s*(?:\[?(\d+)\]?[\.)\s])\s*(.+)', line)
-            if match:
-                num = int(match.group(1))
-                text = match.group(2).strip()
-                if 1 <= num <= 10:  # Reasonable range
-                    while len(options) < num:
-                        options.append("")
-                    options[num-1] = text
-                    
-        # Clean up empty options
-        options = [opt for opt in options if opt]
-        
-        return options
-        
-    def notify(self, message, output_buffer):
-        """Send notifications through all configured channels"""
-        # Extract any numbered options
-        options = self.extract_options(output_buffer)
-        
+    def notify(self, message, output_buffer, count=1, options=None, detected=None, channels=CHANNELS):
+        """Send a notification on the given channels, already rate limited by the caller"""
         # Get last few lines for context
         lines = [l.strip() for l in output_buffer.split('\n') if l.strip()]
         context = '\n'.join(lines[-5:])  # Last 5 lines
         
-        full_message = f"**Claude is waiting for input**\n\nContext:\n```\n{context}\n```"
+        title = describe(count, "**Claude is waiting for input**")
+        full_message = f"{title}\n\nContext:\n```\n{context}\n```"
         
-        # Send notifications
-        self.send_teams_notification(full_message, options)
-        self.send_sms_notification(message, options)
+        senders = {'teams': lambda: self.send_teams_notification(full_message, options),
+                   'sms': lambda: self.send_sms_notification(message, options)}
+        fan_out([Channel(name, senders[name], timeout=10) for name in channels], policy=ALL, detected=detected)
 
-# Flask webhook endpoints
-@app.route('/command', methods=['POST'])
-def receive_command():
-    """Receive commands from Teams/SMS"""
-    try:
-        data = request.json
-        command = data.get('command', '')
-        source = data.get('source', 'unknown')
-        
-        if command:
-            command_queue.put(command)
-            return jsonify({"status": "received", "command": command})
-        else:
-            return jsonify({"status": "error", "message": "No command provided"}), 400
+def create_app():
+    """Flask app for remote commands; Flask is only imported when the server starts"""
+    from flask import Flask, Response, request, jsonify
+    app = Flask(__name__)
+    
+    @app.route('/command', methods=['POST'])
+    def receive_command():
+        """Receive commands from Teams/SMS"""
+        try:
+            data = request.json
+            command = data.get('command', '')
+            source = data.get('source', 'unknown')
             
-    except Exception as e:
-        return jsonify({"status": "error", "message": str(e)}), 500
-
-@app.route('/health', methods=['GET'])
-def health_check():
-    """Health check endpoint"""
-    return jsonify({"status": "healthy", "queue_size": command_queue.qsize()})
+            if command:
+                command_queue.put(command)
+                return jsonify({"status": "received", "command": command})
+            else:
+                return jsonify({"status": "error", "message": "No command provided"}), 400
+                
+        except Exception as e:
+            return jsonify({"status": "error", "message": str(e)}), 500
+    
+    @app.route('/metrics', methods=['GET'])
+    def metrics_endpoint():
+        """Counters and latency histograms for Prometheus"""
+        return Response(metrics.render(), mimetype=metrics.CONTENT_TYPE)
+    
+    @app.route('/health', methods=['GET'])
+    def health_check():
+        """Health check endpoint"""
+        return jsonify({"status": "healthy", "queue_size": command_queue.qsize(),
+                        "dispatch": get_dispatcher().stats(),
+                        "startup": {task.name: task.status() for task in STARTUP_TASKS}})
+    
+    return app
 
 def run_webhook_server():
     """Run Flask server in background thread"""
-    app.run(host='0.0.0.0', port=WEBHOOK_PORT, debug=False, threaded=True)
+    import logging
+    import flask.cli
+    # Claude owns the terminal by now; keep Flask's banner and request log off it
+    flask.cli.show_server_banner = lambda *args: None
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    create_app().run(host='0.0.0.0', port=WEBHOOK_PORT, debug=False, threaded=True)
+
+def start_webhook_server():
+    """Start the webhook server thread and wait until it accepts connections"""
+    server_thread = threading.Thread(target=run_webhook_server, daemon=True)
+    server_thread.start()
+    
+    def listening():
+        if not server_thread.is_alive():
+            raise RuntimeError("webhook server exited (is Flask installed?)")
+        return port_open('127.0.0.1', WEBHOOK_PORT)
+    wait_until(listening, timeout=10)
+    return f"http://localhost:{WEBHOOK_PORT}"
+
+def start_remote_control(notifier):
+    """Bring up the webhook server and tunnel in the background; returns their tasks"""
+    tasks = []
+    
+    def switch_on(_):
+        if all(task.ok for task in tasks):
+            notifier.enable_remote(tasks[1].result)
+            
+    tasks.append(BackgroundTask('webhook server', start_webhook_server, on_ready=switch_on))
+    tasks.append(BackgroundTask('ngrok tunnel', notifier.start_ngrok, on_ready=switch_on))
+    STARTUP_TASKS.extend(tasks)
+    for task in tasks:
+        task.start()
+    return tasks
 
 def monitor_claude_with_remote(notifier):
     """Monitor Claude output and handle remote commands"""
-    import select
     import pty
+    import signal
     import termios
     import tty
     
     # Save terminal settings
     old_tty = termios.tcgetattr(sys.stdin)
+    transcript = None
     
     try:
         # Create pseudo-terminal
         master_fd, slave_fd = pty.openpty()
+        rows, cols = sync_window_size(sys.stdin.fileno(), master_fd) or (24, 80)
         
         # Start Claude
         cmd = [CLAUDE_PATH] + sys.argv[1:]
@@ -247,78 +264,92 @@ def monitor_claude_with_remote(notifier):
         os.close(slave_fd)
         tty.setraw(sys.stdin.fileno())
         
-        output_buffer = ""
+        output_lines = LineRing()
+        # The numbered menu on screen, for the notification and for numeric replies
+        menu = OptionTracker()
+        watcher = PromptWatcher(DETECTOR, rows, cols)
+        # Full transcript when CLAUDE_NOTIFY_RECORD is set
+        transcript = recorder.from_env(notifier.session_id, rows, cols, ' '.join(cmd))
+        new_size = None
         waiting_detected = False
-        last_notification = 0
         
-        while True:
-            if process.poll() is not None:
-                break
-                
-            # Check for remote commands
-            try:
-                remote_command = command_queue.get_nowait()
-                if remote_command:
-                    print(f"\n💬 Remote command: {remote_command}\n")
-                    os.write(master_fd, (remote_command + '\n').encode())
-                    waiting_detected = False
-            except queue.Empty:
-                pass
+        def on_winch(signum, frame):
+            nonlocal new_size
+            new_size = sync_window_size(sys.stdin.fileno(), master_fd)
+        signal.signal(signal.SIGWINCH, on_winch)
+        
+        def inject_command(remote_command):
+            nonlocal waiting_detected
+            if remote_command:
+                keys, text = menu.answer(remote_command)
+                if keys:
+                    # A live selection menu takes the option's digit as a keystroke
+                    relay.write_local(f"\r\n💬 Remote choice: {keys}. {menu.resolve(keys).text}\r\n".encode())
+                    relay.write_child(keys.encode())
+                else:
+                    relay.write_local(f"\r\n💬 Remote command: {text}\r\n".encode())
+                    # Framed as a paste when Claude supports it, then Enter
+                    relay.paste(text)
+                menu.reset()
+                waiting_detected = False
+        
+        def on_input(data):
+            nonlocal waiting_detected
+            waiting_detected = False
+            for channel, rate in rates.items():
+                get_dispatcher().cancel(f'waiting:{channel}')
+                rate.reset()
+        
+        def notify_waiting(last_line):
+            nonlocal waiting_detected
+            if not waiting_detected:
+                waiting_detected = True
+                if transcript:
+                    transcript.marker(last_line)
+                # Numbered options skip coalescing so the menu reaches the phone at once
+                for rate in rates.values():
+                    rate.offer(last_line, output_lines.text(), menu.texts)
+        
+        def send_notice(channel, notice):
+            # Send notification on a worker; typing before it starts drops it
+            get_dispatcher().submit('notify', notifier.notify, notice.text,
+                                    notice.context, key=f'waiting:{channel}', count=notice.count,
+                                    options=notice.options, detected=notice.detected, channels=(channel,))
+        
+        def on_output(data):
+            nonlocal new_size
+            menu.feed(output_lines.feed(data))
+            if transcript:
+                transcript.output(data)
+            if new_size:
+                watcher.screen.resize(*new_size)
+                if transcript:
+                    transcript.resize(*new_size)
+                new_size = None
                 
-            # Monitor I/O
-            r, w, e = select.select([sys.stdin, master_fd], [], [], 0.1)
-            
-            if sys.stdin in r:
-                data = os.read(sys.stdin.fileno(), 1024)
-                if data:
-                    os.write(master_fd, data)
-                    waiting_detected = False
-                    
-            if master_fd in r:
-                try:
-                    data = os.read(master_fd, 1024)
-                    if data:
-                        os.write(sys.stdout.fileno(), data)
-                        
-                        # Add to buffer
-                        try:
-                            output_buffer += data.decode('utf-8', errors='ignore')
-                        except:
-                            output_buffer = ""
-                            
-                        if len(output_buffer) > 2000:
-                            output_buffer = output_buffer[-1000:]
-                            
-                        # Check if waiting
-                        lines = output_buffer.strip().split('\n')
-                        if lines:
-                            last_line = lines[-1].strip()
-                            current_time = time.time()
-                            
-                            waiting_indicators = [
-                                last_line in ['>', '❯', '$'],
-                                last_line.endswith(':') and len(last_line) < 50,
-                                'waiting' in last_line.lower(),
-                                bool(re.match(r'^\s*(?:Human|You|User):\s*$', last_line))
-                            ]
-                            
-                            if (any(waiting_indicators) and 
-                                not waiting_detected and
-                                current_time - last_notification > 5):
-                                
-                                waiting_detected = True
-                                last_notification = current_time
-                                
-                                # Send notification in background
-                                threading.Thread(
-                                    target=notifier.notify,
-                                    args=(last_line, output_buffer)
-                                ).start()
-                                
-                except OSError:
-                    break
+            # Check if waiting; only rows this chunk redrew are examined
+            last_line = watcher.feed(data)
+            if idle:
+                # Any output pushes the deadline back; a prompt leaving the screen disarms it
+                idle.touch(watcher.current)
+            elif last_line:
+                notify_waiting(last_line)
+        
+        relay = PtyRelay(master_fd, sys.stdin.fileno(), sys.stdout.fileno(),
+                         on_output=on_output, on_input=on_input)
+        # Remote commands arrive from the Flask thread and are injected as soon as they land
+        relay.watch(command_queue, inject_command)
+        idle = IdleTimer(relay.timers, IDLE_DELAY, notify_waiting) if IDLE_DELAY > 0 else None
+        # Dedup, coalescing and the per-channel budget all happen here, once
+        rates = {channel: RateController(channel, lambda notice, channel=channel: send_notice(channel, notice),
+                                         timers=relay.timers)
+                 for channel in CHANNELS}
+        # stdout is non-blocking now; a worker's print() could fail on a full tty
+        notifier.log = lambda text: relay.call_soon(relay.write_local, f"\r\n{text}\r\n".encode())
+        relay.run()
                     
     finally:
+        notifier.log = print
         termios.tcsetattr(sys.stdin, termios.TCSADRAIN, old_tty)
         try:
             os.close(master_fd)
@@ -326,6 +357,8 @@ def monitor_claude_with_remote(notifier):
             pass
         if process.poll() is None:
             process.terminate()
+        if transcript:
+            transcript.close()
 
 def main():
     print("🚀 Claude Remote Notify")
@@ -345,23 +378,24 @@ def main():
     # Initialize notifier
     notifier = RemoteNotifier()
     
-    # Start ngrok
-    notifier.start_ngrok()
-    
-    # Start webhook server
-    print(f"🌐 Starting webhook server on port {WEBHOOK_PORT}")
-    server_thread = threading.Thread(target=run_webhook_server, daemon=True)
-    server_thread.start()
-    time.sleep(1)
+    # Webhook server and ngrok come up in the background; Claude starts now
+    # and the Teams action buttons switch on once both are ready
+    print(f"🌐 Starting webhook server on port {WEBHOOK_PORT} and tunnel in the background")
+    tasks = start_remote_control(notifier)
     
     print("=" * 50)
     print("Starting Claude with remote notifications...")
     print()
     
-    # Run Claude with monitoring
+    # Run Claude with monitoring; metrics go to $CLAUDE_NOTIFY_METRICS on exit, if set
+    metrics.dump_at_exit()
     monitor_claude_with_remote(notifier)
+    
+    print("Remote control startup:")
+    print(report(tasks))
 
 if __name__ == "__main__":
+    profiler.from_argv()
     if '--help' in sys.argv:
         print("""
 Claude Remote Notify - Get notifications and control Claude remotely
@@ -2,16 +2,20 @@
 
 import os
 import sys
-import json
-import requests
 import subprocess
 import time
-import hmac
-import hashlib
 import uuid
 from datetime import datetime
-from cryptography.fernet import Fernet
-import base64
+
+from claude_notify import metrics, profiler, transport
+from claude_notify.breaker import guarded
+from claude_notify.detector import get_detector
+from claude_notify.fanout import ALL, Channel, fan_out
+from claude_notify.options import OptionTracker
+from claude_notify.outbox import Outbox
+from claude_notify.passthrough import stream_lines
+from claude_notify.payload import budget_for, encode, fit_context, seal
+from claude_notify.ratecontrol import RateController
 
 # Secure cloud webhook services (choose one)
 WEBHOOK_SERVICE = os.environ.get('WEBHOOK_SERVICE', 'pipedream')  # pipedream, webhook.site, requestbin
@@ -31,44 +35,44 @@ AWS_API_KEY = os.environ.get('AWS_API_KEY', '')
 # Encryption key for sensitive data
 ENCRYPTION_KEY = os.environ.get('CLAUDE_ENCRYPTION_KEY', '')
 
+# Azure and AWS payloads are meant to be sealed; without cryptography they
+# would go out as plain JSON, so these services refuse to start unless
+# plaintext is explicitly allowed
+SEALED_SERVICES = ('azure', 'aws')
+ALLOW_PLAINTEXT = os.environ.get('CLAUDE_NOTIFY_ALLOW_PLAINTEXT', '') == '1'
+
 # Teams webhook (for notifications)
 TEAMS_WEBHOOK_URL = os.environ.get('TEAMS_WEBHOOK_URL', '')
 
-CLAUDE_PATH = "/Users/chrismcdaniels/.claude/local/claude"
+CLAUDE_PATH = os.environ.get('CLAUDE_PATH', "/Users/chrismcdaniels/.claude/local/claude")
+DETECTOR = get_detector('strict')
 
 class SecureNotifier:
     def __init__(self):
         self.session_id = str(uuid.uuid4())
-        self.encryption_key = self._get_or_create_key()
-        self.cipher = Fernet(self.encryption_key) if self.encryption_key else None
+        self.cipher = self._make_cipher()
+        # Delivery runs on the outbox thread, with retries and replay after a restart
+        self.outbox = Outbox({'secure': self.deliver})
         
-    def _get_or_create_key(self):
-        """Get or create encryption key"""
+    def _make_cipher(self):
+        """Fernet cipher from CLAUDE_ENCRYPTION_KEY, or a new key; None without cryptography"""
+        try:
+            from cryptography.fernet import Fernet
+        except ImportError:
+            if WEBHOOK_SERVICE in SEALED_SERVICES and not ALLOW_PLAINTEXT:
+                sys.exit(f"❌ {WEBHOOK_SERVICE} needs encryption: pip install cryptography "
+                         "(or set CLAUDE_NOTIFY_ALLOW_PLAINTEXT=1 to send plain JSON)")
+            print("⚠️  Encryption disabled: pip install cryptography")
+            return None
         if ENCRYPTION_KEY:
-            return ENCRYPTION_KEY.encode()
+            key = ENCRYPTION_KEY.encode()
         else:
             # Generate new key
             key = Fernet.generate_key()
             print(f"⚠️  Generated new encryption key. Save this:")
             print(f"export CLAUDE_ENCRYPTION_KEY='{key.decode()}'")
-            return key
+        return Fernet(key)
             
-    def _sign_request(self, payload, secret):
-        """Create HMAC signature for request"""
-        message = json.dumps(payload, sort_keys=True).encode()
-        signature = hmac.new(
-            secret.encode(),
-            message,
-            hashlib.sha256
-        ).hexdigest()
-        return signature
-        
-    def _encrypt_sensitive_data(self, data):
-        """Encrypt sensitive information"""
-        if self.cipher:
-            return self.cipher.encrypt(json.dumps(data).encode()).decode()
-        return data
-        
     def send_to_pipedream(self, event_data):
         """Send to Pipedream (good balance of ease and security)"""
         if not PIPEDREAM_WEBHOOK_URL:
@@ -76,7 +80,6 @@ class SecureNotifier:
             
         try:
             headers = {
-                'Content-Type': 'application/json',
                 'X-Session-ID': self.session_id,
                 'X-Timestamp': str(int(time.time()))
             }
@@ -84,13 +87,12 @@ class SecureNotifier:
             if PIPEDREAM_API_KEY:
                 headers['Authorization'] = f'Bearer {PIPEDREAM_API_KEY}'
                 
-            # Sign the request
-            signature = self._sign_request(event_data, self.session_id)
-            headers['X-Signature'] = signature
+            # Serialized once; X-Signature covers exactly the body sent
+            body, headers = encode(event_data, secret=self.session_id, headers=headers)
             
-            response = requests.post(
+            response = transport.post(
                 PIPEDREAM_WEBHOOK_URL,
-                json=event_data,
+                data=body,
                 headers=headers,
                 timeout=10
             )
@@ -107,24 +109,22 @@ class SecureNotifier:
             return False
             
         try:
-            # Azure expects specific format
+            # Azure expects specific format; data is compressed, then encrypted
+            sealed = seal(event_data, self.cipher)
             payload = {
                 'sessionId': self.session_id,
                 'timestamp': datetime.utcnow().isoformat(),
                 'event': 'claude_waiting',
-                'data': self._encrypt_sensitive_data(event_data)
+                'encoding': sealed['encoding'],
+                'data': sealed['data']
             }
             
-            headers = {'Content-Type': 'application/json'}
-            
-            # Add shared key authentication if configured
-            if AZURE_SHARED_KEY:
-                signature = self._sign_request(payload, AZURE_SHARED_KEY)
-                headers['X-Signature'] = signature
+            # Shared key authentication if configured, over the exact body
+            body, headers = encode(payload, secret=AZURE_SHARED_KEY or None)
                 
-            response = requests.post(
+            response = transport.post(
                 AZURE_LOGIC_APP_URL,
-                json=payload,
+                data=body,
                 headers=headers,
                 timeout=10
             )
@@ -141,21 +141,19 @@ class SecureNotifier:
             return False
             
         try:
-            headers = {
-                'Content-Type': 'application/json',
-                'x-api-key': AWS_API_KEY
-            }
-            
             # AWS payload
+            sealed = seal(event_data, self.cipher)
             payload = {
                 'sessionId': self.session_id,
                 'timestamp': int(time.time()),
-                'encryptedData': self._encrypt_sensitive_data(event_data)
+                'encoding': sealed['encoding'],
+                'encryptedData': sealed['data']
             }
+            body, headers = encode(payload, headers={'x-api-key': AWS_API_KEY})
             
-            response = requests.post(
+            response = transport.post(
                 AWS_API_GATEWAY_URL,
-                json=payload,
+                data=body,
                 headers=headers,
                 timeout=10
             )
@@ -195,44 +193,61 @@ class SecureNotifier:
                 }]
             }
             
-            response = requests.post(TEAMS_WEBHOOK_URL, json=card, timeout=10)
+            response = transport.post(TEAMS_WEBHOOK_URL, json=card, timeout=10)
             return response.status_code == 200
             
         except Exception as e:
             print(f"Teams error: {e}")
             return False
             
-    def notify(self, context, options=None):
+    def notify(self, context, options=None, count=1, detected=None):
         """Send notification through configured service"""
         event_data = {
-            'context': context[-500:],  # Limit context size
+            'context': fit_context(context, budget_for(WEBHOOK_SERVICE, sealed=self.cipher is not None)),
             'options': options or [],
+            'alerts': count,
             'timestamp': int(time.time())
         }
         
-        # Try to send through configured service
-        success = False
+        self.outbox.enqueue('secure', {'event': event_data, 'sent': [], 'detected': detected})
+        
+    def deliver(self, payload):
+        """Send a queued notification; channels that got through are skipped on retry"""
+        event_data = payload['event']
+        sent = payload['sent']
+        
+        # Pick the configured service
+        send_service = None
         webhook_url = None
         
         if WEBHOOK_SERVICE == 'pipedream':
-            success = self.send_to_pipedream(event_data)
+            send_service = self.send_to_pipedream
             webhook_url = PIPEDREAM_WEBHOOK_URL
         elif WEBHOOK_SERVICE == 'azure':
-            success = self.send_to_azure_logic_app(event_data)
+            send_service = self.send_to_azure_logic_app
             webhook_url = AZURE_LOGIC_APP_URL
         elif WEBHOOK_SERVICE == 'aws':
-            success = self.send_to_aws(event_data)
+            send_service = self.send_to_aws
             webhook_url = AWS_API_GATEWAY_URL
             
-        if success:
-            print(f"✅ Sent to {WEBHOOK_SERVICE}")
-            # Also send Teams notification with webhook info
-            self.send_teams_notification(
+        # The Teams pointer only needs the configured URL, so it goes out
+        # alongside the service instead of waiting for it
+        channels = []
+        if TEAMS_WEBHOOK_URL and 'teams' not in sent:
+            channels.append(Channel('teams', guarded('teams', lambda: self.send_teams_notification(
                 f"Claude is waiting. Check {WEBHOOK_SERVICE} for details.",
                 webhook_url
-            )
-        else:
-            print(f"❌ Failed to send to {WEBHOOK_SERVICE}")
+            )), timeout=10))
+        if send_service and WEBHOOK_SERVICE not in sent:
+            channels.append(Channel(WEBHOOK_SERVICE, guarded(WEBHOOK_SERVICE, lambda: send_service(event_data)), timeout=10))
+        result = fan_out(channels, policy=ALL, detected=payload.get('detected'))
+        sent.extend(name for name, ok in result.results.items() if ok is True)
+            
+        if WEBHOOK_SERVICE in sent:
+            print(f"✅ Sent to {WEBHOOK_SERVICE}")
+        elif send_service:
+            print(f"❌ Failed to send to {WEBHOOK_SERVICE}, will retry")
+        return all(channel.name in sent for channel in channels)
 
 def setup_instructions():
     """Print setup instructions"""
@@ -264,12 +279,14 @@ Choose a secure webhook service:
    - Channel → Connectors → Incoming Webhook
    - Set: export TEAMS_WEBHOOK_URL='your-url'
 
-5. **Encryption** (Recommended)
+5. **Encryption** (Recommended; required for Azure and AWS)
    - Generate: export CLAUDE_ENCRYPTION_KEY='$(python3 -c "from cryptography.fernet import Fernet; print(Fernet.generate_key().decode())")'
+   - Azure and AWS refuse to start without cryptography unless
+     CLAUDE_NOTIFY_ALLOW_PLAINTEXT=1 is set
 
 Security features:
-- Request signing (HMAC-SHA256)
-- Optional encryption for sensitive data
+- Request signing (HMAC-SHA256 over the exact request body)
+- Optional encryption for sensitive data (compressed, then Fernet)
 - API key authentication
 - Session tracking
 - No direct internet exposure of your machine
@@ -287,51 +304,46 @@ def monitor_claude():
     
     # Run Claude
     cmd = [CLAUDE_PATH] + sys.argv[1:]
+    metrics.dump_at_exit()
     process = subprocess.Popen(
         cmd,
         stdout=subprocess.PIPE,
         stderr=subprocess.STDOUT,
         stdin=sys.stdin,
-        universal_newlines=True,
-        bufsize=1
+        bufsize=0
     )
     
     output_buffer = []
-    last_notification = 0
+    menu = OptionTracker()
+    # Dedups flapping prompts and merges bursts into one digest;
+    # numbered options skip coalescing
+    rate = RateController('secure', lambda notice: notifier.notify(
+        notice.context, notice.options, notice.count, notice.detected))
     
     try:
-        for line in process.stdout:
-            print(line, end='')
-            output_buffer.append(line)
+        for line in stream_lines(process.stdout):
+            # A quiet partial line is yielded early and again once finished;
+            # only the finished one goes into the buffer
+            if line.endswith('\n'):
+                output_buffer.append(line)
+                menu.feed_line(line)
             
             if len(output_buffer) > 50:
                 output_buffer = output_buffer[-30:]
                 
             # Detect waiting
             stripped = line.strip()
-            if (stripped in ['>', '❯', '$', 'Human:', 'You:'] or
-                (stripped.endswith(':') and len(stripped) < 20)):
+            if DETECTOR.is_waiting(stripped):
                 
-                current_time = time.time()
-                if current_time - last_notification > 30:
-                    last_notification = current_time
-                    
-                    # Extract options
-                    context = ''.join(output_buffer[-20:])
-                    options = []
-                    for buf_line in output_buffer[-20:]:
-                        import re
-                        match = re.match(r'^\s*(\d+)[\.)\s]+(.+)', buf_line)
-                        if match:
-                            options.append(match.group(2).strip())
-                            
-                    # Send notification
-                    notifier.notify(context, options)
+                # Send notification with the menu on screen, if any
+                context = ''.join(output_buffer[-20:])
+                rate.offer(stripped, context, menu.texts)
                     
     except KeyboardInterrupt:
         print("\nStopped")
     finally:
         process.terminate()
+        notifier.outbox.close(timeout=2)
 
 def main():
     if '--help' in sys.argv:
@@ -340,15 +352,10 @@ def main():
         print("Testing secure notification...")
         notifier = SecureNotifier()
         notifier.notify("Test notification", ["Option 1", "Option 2"])
+        notifier.outbox.close(timeout=30)
     else:
-        # Check dependencies
-        try:
-            import cryptography
-        except ImportError:
-            print("Installing cryptography for encryption...")
-            subprocess.run([sys.executable, '-m', 'pip', 'install', 'cryptography'])
-            
         monitor_claude()
 
 if __name__ == "__main__":
+    profiler.from_argv()
     main()
\ No newline at end of file
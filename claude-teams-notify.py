@@ -3,23 +3,35 @@
 import os
 import sys
 import json
-import requests
 import subprocess
 import time
-import re
-import threading
 from datetime import datetime
 
+from claude_notify import metrics, profiler, transport
+from claude_notify.detector import get_detector
+from claude_notify.dispatch import get_dispatcher
+from claude_notify.options import OptionTracker
+from claude_notify.passthrough import stream_lines
+from claude_notify.payload import budget_for, fit_context
+from claude_notify.ratecontrol import RateController, describe
+
 # Configuration
 TEAMS_WEBHOOK_URL = os.environ.get('TEAMS_WEBHOOK_URL', '')
-CLAUDE_PATH = "/Users/chrismcdaniels/.claude/local/claude"
+CLAUDE_PATH = os.environ.get('CLAUDE_PATH', "/Users/chrismcdaniels/.claude/local/claude")
+DETECTOR = get_detector('teams')
 
 class TeamsNotifier:
     def __init__(self):
         self.session_id = datetime.now().strftime("%Y%m%d_%H%M%S")
-        self.last_notification = 0
+        # Dedups flapping prompts and merges bursts into one digest
+        self.rate = RateController('teams', self.dispatch)
+        
+    def dispatch(self, notice):
+        # Send notification on the shared worker pool
+        get_dispatcher().submit('teams', self.send_notification, notice.context,
+                                notice.options, key='waiting', count=notice.count)
         
-    def send_notification(self, context, options=None):
+    def send_notification(self, context, options=None, count=1):
         """Send rich notification to Teams"""
         if not TEAMS_WEBHOOK_URL:
             print("⚠️  Set TEAMS_WEBHOOK_URL environment variable")
@@ -46,14 +58,14 @@ class TeamsNotifier:
                 "summary": "Claude is waiting for your input",
                 "sections": [{
                     "activityTitle": "🔔 Claude Code Alert",
-                    "activitySubtitle": "Claude is waiting for your input",
+                    "activitySubtitle": describe(count, "Claude is waiting for your input"),
                     "facts": facts,
                     "markdown": True,
-                    "text": f"**Recent output:**\n```\n{context[-500:]}\n```"
+                    "text": f"**Recent output:**\n```\n{fit_context(context, budget_for('teams'))}\n```"
                 }]
             }
             
-            response = requests.post(TEAMS_WEBHOOK_URL, json=card, timeout=10)
+            response = transport.post(TEAMS_WEBHOOK_URL, json=card, timeout=10)
             if response.status_code == 200:
                 print("✅ Teams notification sent")
             else:
@@ -61,16 +73,6 @@ class TeamsNotifier:
                 
         except Exception as e:
             print(f"⚠️  Teams error: {e}")
-            
-    def extract_options(self, text):
-        """Extract numbered options from output"""
-        options = []
-        for line in text.split('\n'):
-            # Match: "1. option" or "1) option" or "[1] option"
-            match = re.match(r'^\s*(?:\[?(\d+)\]?[\.)\s])\s*(.+)', line)
-            if match and 1 <= int(match.group(1)) <= 10:
-                options.append(match.group(2).strip())
-        return options
 
 def monitor_claude_output():
     """Simple output monitoring approach"""
@@ -78,58 +80,55 @@ def monitor_claude_output():
     
     # Start Claude
     cmd = [CLAUDE_PATH] + sys.argv[1:]
+    metrics.dump_at_exit()
     process = subprocess.Popen(
         cmd,
         stdout=subprocess.PIPE,
         stderr=subprocess.STDOUT,
         stdin=sys.stdin,
-        universal_newlines=True,
-        bufsize=1
+        bufsize=0
     )
     
     output_buffer = []
+    menu = OptionTracker()
     waiting_count = 0
+    partial = None
     
     try:
-        for line in process.stdout:
-            # Print line
-            print(line, end='')
+        # Bytes reach the terminal as they arrive; an unfinished prompt line
+        # is yielded once output goes quiet
+        for line in stream_lines(process.stdout):
+            if not line.endswith('\n'):
+                partial = line
+                context_lines = output_buffer + [line]
+            elif line[:-1] == partial:
+                # The prompt we already counted, now finished
+                partial = None
+                output_buffer.append(line)
+                menu.feed_line(line)
+                continue
+            else:
+                partial = None
+                output_buffer.append(line)
+                menu.feed_line(line)
+                context_lines = output_buffer
             
-            # Add to buffer
-            output_buffer.append(line)
             if len(output_buffer) > 50:
                 output_buffer = output_buffer[-30:]
             
             # Check for waiting patterns
             stripped = line.strip()
             if stripped and len(stripped) < 20:
-                waiting_patterns = [
-                    stripped in ['>', '❯', '$', 'Human:', 'User:', 'You:'],
-                    stripped.endswith(':') and 'Human' in stripped,
-                    'waiting' in stripped.lower(),
-                    bool(re.match(r'^(?:>+|❯+|\$)\s*$', stripped))
-                ]
-                
-                if any(waiting_patterns):
+                if DETECTOR.is_waiting(stripped):
                     waiting_count += 1
                     
                     # Need multiple indicators to be sure
                     if waiting_count >= 2:
-                        current_time = time.time()
-                        if current_time - notifier.last_notification > 10:
-                            notifier.last_notification = current_time
-                            
-                            # Get context and options
-                            context = ''.join(output_buffer[-20:])
-                            options = notifier.extract_options(context)
-                            
-                            # Send notification in background
-                            threading.Thread(
-                                target=notifier.send_notification,
-                                args=(context, options)
-                            ).start()
-                            
-                            waiting_count = 0
+                        # Numbered options skip coalescing
+                        context = ''.join(context_lines[-20:])
+                        notifier.rate.offer(stripped, context, menu.texts)
+                        
+                        waiting_count = 0
                 else:
                     # Reset on substantial output
                     if len(stripped) > 30:
@@ -149,4 +148,16 @@ What would you like to do?
 1. Create a new feature
 2. Fix a bug
 3. Review code
-4. Exit
\ No newline at end of file
+4. Exit"""
+    menu = OptionTracker()
+    menu.feed(test_context.split('\n'))
+    options = menu.texts
+    print("Sending test notification to Teams...")
+    notifier.send_notification(test_context, options)
+
+if __name__ == "__main__":
+    profiler.from_argv()
+    if '--test' in sys.argv:
+        test_notification()
+    else:
+        monitor_claude_output()
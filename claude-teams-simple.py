@@ -3,15 +3,22 @@
 import os
 import sys
 import json
-import requests
 import subprocess
 import time
 import re
 from datetime import datetime
 
+from claude_notify import metrics, profiler, transport
+from claude_notify.detector import get_detector
+from claude_notify.outbox import Outbox
+from claude_notify.passthrough import stream_lines
+from claude_notify.payload import fit_context
+from claude_notify.ratecontrol import RateController, describe
+
 # Configuration
 TEAMS_WEBHOOK_URL = os.environ.get('TEAMS_WEBHOOK_URL', '')
-CLAUDE_PATH = "/Users/chrismcdaniels/.claude/local/claude"
+CLAUDE_PATH = os.environ.get('CLAUDE_PATH', "/Users/chrismcdaniels/.claude/local/claude")
+DETECTOR = get_detector('strict')
 
 def send_teams_alert(message, context=""):
     """Send a simple Teams notification"""
@@ -34,12 +41,12 @@ def send_teams_alert(message, context=""):
                 "text": message,
                 "facts": [
                     {"name": "Status", "value": "Waiting for input"},
-                    {"name": "Context", "value": context[-200:] if context else "Starting session"}
+                    {"name": "Context", "value": fit_context(context, 200) if context else "Starting session"}
                 ]
             }]
         }
         
-        response = requests.post(TEAMS_WEBHOOK_URL, json=card, timeout=5)
+        response = transport.post(TEAMS_WEBHOOK_URL, json=card, timeout=5)
         return response.status_code == 200
         
     except Exception as e:
@@ -64,22 +71,30 @@ def main():
     
     # Run Claude
     cmd = [CLAUDE_PATH] + sys.argv[1:]
+    metrics.dump_at_exit()
     process = subprocess.Popen(
         cmd,
         stdout=subprocess.PIPE,
         stderr=subprocess.STDOUT,
         stdin=sys.stdin,
-        universal_newlines=True,
-        bufsize=1
+        bufsize=0
     )
     
+    # Sends happen on the outbox thread and are retried if Teams is down
+    outbox = Outbox({'teams': lambda p: send_teams_alert(p['message'], p['context'])})
+    # Dedups flapping prompts and merges bursts into one digest
+    rate = RateController('teams', lambda notice: outbox.enqueue('teams', {
+        'message': describe(notice.count, "Claude is waiting for your input"),
+        'context': notice.context
+    }))
     output_buffer = []
-    last_notification = 0
     
     try:
-        for line in process.stdout:
-            print(line, end='')
-            output_buffer.append(line)
+        for line in stream_lines(process.stdout):
+            # A quiet partial line is yielded early and again once finished;
+            # only the finished one goes into the buffer
+            if line.endswith('\n'):
+                output_buffer.append(line)
             
             # Keep buffer manageable
             if len(output_buffer) > 30:
@@ -87,23 +102,17 @@ def main():
             
             # Simple waiting detection
             stripped = line.strip()
-            if (stripped in ['>', '❯', '$', 'Human:', 'You:'] or 
-                (stripped.endswith(':') and len(stripped) < 20)):
-                
-                current_time = time.time()
-                if current_time - last_notification > 30:  # 30 second cooldown
-                    last_notification = current_time
-                    context = ''.join(output_buffer[-10:])
-                    send_teams_alert(
-                        "Claude is waiting for your input",
-                        context
-                    )
+            if DETECTOR.is_waiting(stripped):
+                context = ''.join(output_buffer[-10:])
+                rate.offer(stripped, context)
                     
     except KeyboardInterrupt:
         print("\nInterrupted")
     finally:
         process.terminate()
         process.wait()
+        outbox.close(timeout=2)
 
 if __name__ == "__main__":
+    profiler.from_argv()
     main()
\ No newline at end of file
@@ -0,0 +1,7 @@
+"""python3 -m claude_notify"""
+
+import sys
+
+from claude_notify.cli import main
+
+sys.exit(main())
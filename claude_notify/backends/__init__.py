@@ -0,0 +1,68 @@
+"""Notification backends, imported only when enabled.
+
+Each backend is a module with a send(message, context='', options=None)
+function that returns True on success. The registry only records where
+that module lives and which environment variables configure it. Deciding
+what is enabled therefore imports nothing: Twilio, requests and the rest
+load the first time a notification goes out on a channel that uses them.
+
+CLAUDE_NOTIFY_BACKENDS picks backends by name (comma separated). Without
+it, every configured backend is used. A dotted name that is not in the
+registry is imported as a plugin module with the same send() interface:
+
+    CLAUDE_NOTIFY_BACKENDS=desktop,teams,mycompany.pager
+"""
+
+import importlib
+import os
+from collections import namedtuple
+
+Backend = namedtuple('Backend', 'name module env')
+
+BACKENDS = {
+    'desktop': Backend('desktop', 'claude_notify.backends.desktop', ()),
+    'teams': Backend('teams', 'claude_notify.backends.teams', ('TEAMS_WEBHOOK_URL',)),
+    'pushover': Backend('pushover', 'claude_notify.backends.pushover',
+                        ('PUSHOVER_USER_KEY', 'PUSHOVER_APP_TOKEN')),
+    'telegram': Backend('telegram', 'claude_notify.backends.telegram',
+                        ('TELEGRAM_BOT_TOKEN', 'TELEGRAM_CHAT_ID')),
+    'sms': Backend('sms', 'claude_notify.backends.sms',
+                   ('TWILIO_ACCOUNT_SID', 'TWILIO_AUTH_TOKEN', 'TWILIO_FROM_NUMBER', 'TWILIO_TO_NUMBER')),
+    'webhook': Backend('webhook', 'claude_notify.backends.webhook', ('CLAUDE_NOTIFY_WEBHOOK_URL',)),
+}
+
+
+def register(name, module, env=()):
+    """Add a backend from outside this package"""
+    BACKENDS[name] = Backend(name, module, tuple(env))
+
+
+def configured(name):
+    """True if every environment variable the backend needs is set"""
+    backend = BACKENDS.get(name)
+    if backend is None:
+        return '.' in name  # Plugins configure themselves
+    return all(os.environ.get(var) for var in backend.env)
+
+
+def enabled(requested=None):
+    """Names of the backends to use: requested ones, CLAUDE_NOTIFY_BACKENDS, or all configured"""
+    if requested is None:
+        requested = os.environ.get('CLAUDE_NOTIFY_BACKENDS')
+    if requested:
+        names = [n.strip() for n in requested.split(',') if n.strip()]
+    else:
+        names = list(BACKENDS)
+    return [n for n in names if configured(n)]
+
+
+_loaded = {}
+
+
+def load(name):
+    """Import a backend module on first use"""
+    module = _loaded.get(name)
+    if module is None:
+        backend = BACKENDS.get(name)
+        module = _loaded[name] = importlib.import_module(backend.module if backend else name)
+    return module
@@ -0,0 +1,26 @@
+"""macOS sound and notification banner.
+
+This runs on a dispatcher worker while the relay owns the terminal with
+O_NONBLOCK set, so it must not write to stdout; the wrapper rings the
+terminal bell itself through the relay's output queue.
+"""
+
+import subprocess
+
+from claude_notify import sink
+
+SOUND = '/System/Library/Sounds/Glass.aiff'
+
+
+def send(message, context='', options=None):
+    if sink.capture('desktop', message=message, context=context, options=options):
+        return True
+    try:
+        subprocess.run(['afplay', SOUND], capture_output=True)
+        subprocess.run([
+            'osascript', '-e',
+            f'display notification "{message}" with title "Claude Code"'
+        ], capture_output=True)
+    except OSError:
+        return False  # Not on macOS
+    return True
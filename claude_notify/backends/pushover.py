@@ -0,0 +1,26 @@
+"""Pushover push notifications"""
+
+import os
+import time
+
+from claude_notify import transport
+from claude_notify.payload import budget_for, fit_context
+
+API_BASE = os.environ.get('PUSHOVER_API_BASE', 'https://api.pushover.net')
+API_URL = f"{API_BASE.rstrip('/')}/1/messages.json"
+USER_KEY = os.environ.get('PUSHOVER_USER_KEY', '')
+APP_TOKEN = os.environ.get('PUSHOVER_APP_TOKEN', '')
+
+
+def send(message, context='', options=None):
+    text = f"{message}\n\n{fit_context(context, budget_for('pushover'))}" if context else message
+    response = transport.post(API_URL, data={
+        'token': APP_TOKEN,
+        'user': USER_KEY,
+        'message': text[:1024],
+        'title': 'Claude Code Alert',
+        'priority': 1,
+        'timestamp': int(time.time()),
+        'sound': 'pushover',
+    }, timeout=10)
+    return response.status_code == 200
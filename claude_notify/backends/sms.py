@@ -0,0 +1,21 @@
+"""SMS through Twilio (or the REST API at TWILIO_API_BASE, see transport)"""
+
+import os
+
+from claude_notify import transport
+
+ACCOUNT_SID = os.environ.get('TWILIO_ACCOUNT_SID', '')
+AUTH_TOKEN = os.environ.get('TWILIO_AUTH_TOKEN', '')
+FROM_NUMBER = os.environ.get('TWILIO_FROM_NUMBER', '')
+TO_NUMBER = os.environ.get('TWILIO_TO_NUMBER', '')
+
+
+def send(message, context='', options=None):
+    body = f"Claude waiting:\n{message}\n"
+    if options:
+        body += "\nReply with number:\n"
+        for i, option in enumerate(options[:5]):
+            body += f"{i+1}. {option[:30]}\n"
+    client = transport.get_twilio_client(ACCOUNT_SID, AUTH_TOKEN)
+    client.messages.create(body=body[:1600], from_=FROM_NUMBER, to=TO_NUMBER)
+    return True
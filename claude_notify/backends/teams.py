@@ -0,0 +1,33 @@
+"""Microsoft Teams incoming webhook"""
+
+import os
+from datetime import datetime
+
+from claude_notify import transport
+from claude_notify.payload import budget_for, fit_context
+
+WEBHOOK_URL = os.environ.get('TEAMS_WEBHOOK_URL', '')
+
+
+def send(message, context='', options=None):
+    facts = [
+        {"name": "Time", "value": datetime.now().strftime("%H:%M:%S")},
+        {"name": "Status", "value": "Waiting for input"},
+    ]
+    for i, option in enumerate((options or [])[:5]):
+        facts.append({"name": f"Option {i+1}", "value": option[:100]})
+    card = {
+        "@type": "MessageCard",
+        "@context": "http://schema.org/extensions",
+        "themeColor": "FF6B6B",
+        "summary": message,
+        "sections": [{
+            "activityTitle": "🔔 Claude Code Alert",
+            "activitySubtitle": message,
+            "facts": facts,
+            "markdown": True,
+            "text": f"**Recent output:**\n```\n{fit_context(context, budget_for('teams'))}\n```" if context else "",
+        }],
+    }
+    response = transport.post(WEBHOOK_URL, json=card, timeout=10)
+    return response.status_code == 200
@@ -0,0 +1,22 @@
+"""Telegram bot messages"""
+
+import os
+
+from claude_notify import transport
+from claude_notify.payload import budget_for, fit_context
+
+BOT_TOKEN = os.environ.get('TELEGRAM_BOT_TOKEN', '')
+CHAT_ID = os.environ.get('TELEGRAM_CHAT_ID', '')
+API_BASE = os.environ.get('TELEGRAM_API_BASE', 'https://api.telegram.org').rstrip('/')
+
+
+def send(message, context='', options=None):
+    text = f"🔔 *{message}*"
+    if context:
+        text += f"\n```\n{fit_context(context, budget_for('telegram'))}\n```"
+    response = transport.post(f"{API_BASE}/bot{BOT_TOKEN}/sendMessage", json={
+        'chat_id': CHAT_ID,
+        'text': text,
+        'parse_mode': 'Markdown',
+    }, timeout=10)
+    return response.status_code == 200
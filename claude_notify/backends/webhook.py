@@ -0,0 +1,24 @@
+"""Generic JSON webhook (Pipedream, Azure Logic Apps, API Gateway, ...)"""
+
+import os
+import time
+
+from claude_notify import transport
+from claude_notify.payload import budget_for, fit_context
+
+URL = os.environ.get('CLAUDE_NOTIFY_WEBHOOK_URL', '')
+TOKEN = os.environ.get('CLAUDE_NOTIFY_WEBHOOK_TOKEN', '')
+
+
+def send(message, context='', options=None):
+    headers = {'Content-Type': 'application/json'}
+    if TOKEN:
+        headers['Authorization'] = f'Bearer {TOKEN}'
+    response = transport.post(URL, json={
+        'event': 'claude_waiting',
+        'message': message,
+        'context': fit_context(context, budget_for('webhook')),
+        'options': options or [],
+        'timestamp': int(time.time()),
+    }, headers=headers, timeout=10)
+    return response.status_code < 300
@@ -0,0 +1 @@
+"""Runnable benchmarks: python3 -m claude_notify.benchmarks.<name>"""
@@ -0,0 +1,87 @@
+"""Lines per second for each waiting-detector rule set.
+
+    python3 -m claude_notify.benchmarks.bench_detector [--lines 200000]
+
+The corpus mixes prose, code, log lines, numbered menus and prompts, roughly
+in the proportions of a Claude session. The legacy two-regex ClaudeMonitor
+check is timed alongside for comparison.
+"""
+
+import argparse
+import random
+import re
+import time
+
+from claude_notify.detector import RULE_SETS, WaitingDetector
+
+SAMPLE_LINES = [
+    "I'll update the configuration loader so it reads the new environment variables.",
+    "    def load_config(path):",
+    "        return json.load(open(path))",
+    "```python",
+    "# Read settings from disk",
+    "// TODO: handle missing keys",
+    "Error: ENOENT: no such file or directory, open 'config.json'",
+    "Warning: deprecated option --legacy",
+    "1. Create a new feature",
+    "2. Fix a bug",
+    "Do you want to continue? (y/n)",
+    "Enter the name of the branch:",
+    ">",
+    "❯",
+    "Human:",
+    "",
+    "  ⎿  Updated src/app.ts with 12 additions and 3 removals",
+]
+
+
+def legacy_monitor():
+    """The checks ClaudeMonitor ran before the shared detector"""
+    waiting = re.compile('|'.join([
+        r'^>+\s*$', r'^❯+\s*$', r'^\$\s*$', r'^(Human|User|You):\s*$',
+        r'waiting for (input|response|you)', r'(Type|Enter|Input|Provide).*:?\s*$',
+        r'^\s*\[\s*\]\s*$', r'continue\?.*$',
+    ]), re.IGNORECASE)
+    not_waiting = re.compile(r'```|^\s*#|^\s*\/\/|Error:|Warning:|Info:', re.IGNORECASE)
+
+    def check(line):
+        stripped = line.strip()
+        if not stripped or not_waiting.search(line):
+            return False
+        if waiting.search(line):
+            return True
+        return len(stripped) <= 3 and any(c in stripped for c in '>$:?❯')
+    return check
+
+
+def corpus(n, seed=0):
+    rng = random.Random(seed)
+    weights = [12, 8, 8, 2, 2, 2, 1, 1, 2, 2, 1, 1, 1, 1, 1, 6, 4]
+    return rng.choices(SAMPLE_LINES, weights=weights, k=n)
+
+
+def time_it(check, lines):
+    start = time.perf_counter()
+    hits = 0
+    for line in lines:
+        if check(line):
+            hits += 1
+    return len(lines) / (time.perf_counter() - start), hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lines', type=int, default=200000)
+    args = parser.parse_args()
+    lines = corpus(args.lines)
+
+    print(f"{'rule set':<16}{'rules':>6}{'lines/s':>14}{'hits':>9}")
+    for name, rules in RULE_SETS.items():
+        rate, hits = time_it(WaitingDetector(rules, name).is_waiting, lines)
+        print(f"{name:<16}{len(rules):>6}{rate:>14,.0f}{hits:>9}")
+    rate, hits = time_it(legacy_monitor(), lines)
+    print(f"{'legacy monitor':<16}{'-':>6}{rate:>14,.0f}{hits:>9}")
+
+
+if __name__ == '__main__':
+    main()
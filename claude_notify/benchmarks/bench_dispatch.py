@@ -0,0 +1,167 @@
+"""Load test of the dispatch path against local mock services.
+
+    python3 -m claude_notify.benchmarks.bench_dispatch [--rate 3000] [--duration 60] [--backends NAME,...]
+                                                       [--latency-ms 80] [--jitter-ms 40] [--error-rate 0.02]
+                                                       [--real-limits] [--outbox] [--drain 30]
+
+Starts claude_notify.mockservices and points every backend at it. It then
+submits --rate notifications a minute for --duration seconds, the way
+python3 -m claude_notify does: Dispatcher.submit('notify', cli.deliver),
+which fans each notification out to every backend behind its circuit
+breaker. With --outbox, they go through an Outbox first, as in the
+pushover, secure and teams-simple wrappers. Each backend that fails is
+then retried with backoff until every backend has delivered.
+
+Every notification carries a serial number in its text. The run ends,
+the queue drains (up to --drain seconds), and then the requests the mocks
+accepted are matched against what was sent. Reported per backend:
+
+    delivered   notifications the mock service accepted
+    p50/p99 ms  submitted -> accepted by the mock
+    loss        notifications it never accepted
+    429 / 5xx   throttled and failed requests the mock answered
+
+Submissions have no key, so none supersede each other; in the wrapper
+they share the 'waiting' key and a burst collapses to one notification.
+"""
+
+import argparse
+import os
+import re
+import tempfile
+import time
+
+from claude_notify.mockservices import REAL_LIMITS, MockServices
+
+# backend -> the mock service it talks to
+SERVICE = {'teams': 'teams', 'pushover': 'pushover', 'telegram': 'telegram', 'sms': 'twilio', 'webhook': 'pipedream'}
+SERIAL = re.compile(rb'loadtest-(\d+)')
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def pace(count, per_second, submit):
+    """Call submit(i) count times on a fixed schedule; return the submit times"""
+    sent = []
+    start = time.monotonic()
+    for i in range(count):
+        delay = start + i / per_second - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        sent.append(time.time())
+        submit(i)
+    return sent
+
+
+def through_dispatcher(names, count, per_second, drain):
+    from claude_notify.cli import deliver
+    from claude_notify.dispatch import get_dispatcher
+    from claude_notify.ratecontrol import Notice
+
+    dispatcher = get_dispatcher()
+    jobs = []
+
+    def submit(i):
+        notice = Notice(f'loadtest-{i}', f'context for loadtest-{i}', ['Yes', 'No'], 1, [])
+        jobs.append(dispatcher.submit('notify', deliver, names, notice, message=f'Claude is waiting loadtest-{i}'))
+
+    sent = pace(count, per_second, submit)
+    deadline = time.monotonic() + drain
+    for job in jobs:
+        if job is not None:
+            job.wait(max(deadline - time.monotonic(), 0))
+    stats = dispatcher.stats()
+    return sent, {'rejected by queue': stats['counters'].get('rejected', 0),
+                  'unfinished': sum(1 for j in jobs if j is not None and not j.done.is_set())}
+
+
+def through_outbox(names, count, per_second, drain, directory):
+    from claude_notify import backends
+    from claude_notify.breaker import guarded
+    from claude_notify.fanout import ALL, Channel, fan_out
+    from claude_notify.outbox import Outbox
+
+    def handle(payload):
+        todo = [n for n in names if n not in payload['done']]
+        message = f"Claude is waiting {payload['message']}"
+
+        def sender(name):
+            return lambda: backends.load(name).send(message, payload['context'], payload['options'])
+        result = fan_out([Channel(n, guarded(n, sender(n)), timeout=10) for n in todo], policy=ALL)
+        payload['done'] += [n for n, ok in result.results.items() if ok is True]
+        return len(payload['done']) == len(names)
+
+    outbox = Outbox({'notify': handle}, path=os.path.join(directory, 'outbox.db'), max_pending=count + 1)
+    sent = pace(count, per_second, lambda i: outbox.enqueue('notify', {
+        'message': f'loadtest-{i}', 'context': f'context for loadtest-{i}', 'options': ['Yes', 'No'], 'done': []}))
+    deadline = time.monotonic() + drain
+    while time.monotonic() < deadline and outbox.counters['delivered'] + outbox.counters['dropped'] < count:
+        time.sleep(0.2)
+    extra = {'retried': outbox.counters['retried'], 'dropped': outbox.counters['dropped'],
+             'rejected by queue': outbox.counters['rejected'], 'pending': outbox.pending()}
+    # Whatever is still due stays on disk; the drain window is the limit
+    outbox.close(timeout=0)
+    return sent, extra
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rate', type=float, default=3000, help='notifications per minute')
+    parser.add_argument('--duration', type=float, default=60, help='seconds of submissions')
+    parser.add_argument('--backends', default=','.join(SERVICE))
+    parser.add_argument('--latency-ms', type=float, default=80)
+    parser.add_argument('--jitter-ms', type=float, default=40)
+    parser.add_argument('--error-rate', type=float, default=0.02)
+    parser.add_argument('--real-limits', action='store_true', help='throttle services at their published limits')
+    parser.add_argument('--outbox', action='store_true', help='go through an Outbox with retries')
+    parser.add_argument('--drain', type=float, default=30, help='seconds to wait for the backlog after the last submit')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    names = [n.strip() for n in args.backends.split(',') if n.strip()]
+    services = {name: {'rate': rate, 'burst': burst} for name, (rate, burst) in REAL_LIMITS.items()} \
+        if args.real_limits else {}
+    count = int(args.rate * args.duration / 60)
+    mocks = MockServices(latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000,
+                         error_rate=args.error_rate, services=services, seed=args.seed).start()
+    # The backends read their configuration when first imported
+    os.environ.update(mocks.env())
+    os.environ.pop('CLAUDE_NOTIFY_SINK', None)
+
+    print(f"{count} notifications at {args.rate:.0f}/min to {', '.join(names)}"
+          f" via {'outbox' if args.outbox else 'dispatcher'}; mock latency {args.latency_ms:.0f}"
+          f"+{args.jitter_ms:.0f} ms, {args.error_rate:.0%} errors"
+          + (', published rate limits' if args.real_limits else ''))
+    start = time.monotonic()
+    with tempfile.TemporaryDirectory() as directory:
+        if args.outbox:
+            sent, extra = through_outbox(names, count, args.rate / 60, args.drain, directory)
+        else:
+            sent, extra = through_dispatcher(names, count, args.rate / 60, args.drain)
+        elapsed = time.monotonic() - start
+        deliveries = mocks.deliveries()
+        stats = mocks.stats()
+    mocks.stop()
+
+    print(f"{'backend':<10}{'delivered':>11}{'p50 ms':>9}{'p99 ms':>9}{'loss':>8}{'429':>7}{'5xx':>6}")
+    for name in names:
+        service = SERVICE.get(name, name)
+        first = {}
+        for delivery in (d for d in deliveries if d.service == service):
+            match = SERIAL.search(delivery.body)
+            if match:
+                first.setdefault(int(match.group(1)), delivery.time)
+        latencies = [(t - sent[i]) * 1000 for i, t in first.items() if i < len(sent)]
+        counts = stats.get(service, {})
+        loss = 1 - len(first) / count if count else 0
+        print(f"{name:<10}{len(first):>11}"
+              f"{percentile(latencies, 50) if latencies else 0:>9.0f}{percentile(latencies, 99) if latencies else 0:>9.0f}"
+              f"{loss:>8.1%}{counts.get('throttled', 0):>7}{counts.get('failed', 0):>6}")
+    print('  ' + ', '.join(f"{k} {v}" for k, v in extra.items()) + f"; {elapsed:.1f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""Remote-command injection latency through the PTY relay.
+
+    python3 -m claude_notify.benchmarks.bench_injection [--commands 50] [--paste-kb 1024]
+
+A PtyRelay runs on its own thread in front of a raw PTY, standing in for
+the remote wrapper, while the webhook thread is simulated from the main
+thread. Each command is timed from the put() until its last byte can be read
+on the child side of the PTY:
+
+    tick poll    queue.Queue checked from on_tick every 100 ms (the old loop)
+    mailbox      relay.Mailbox, whose put() wakes the selector
+
+It then pastes --paste-kb of text in a single bracketed paste and reports
+how long the child takes to receive all of it.
+"""
+
+import argparse
+import os
+import pty
+import queue
+import random
+import statistics
+import threading
+import time
+import tty
+
+from claude_notify.relay import PASTE_END, PASTE_START, Mailbox, PtyRelay
+
+
+def start_relay(setup):
+    master_fd, slave_fd = pty.openpty()
+    tty.setraw(slave_fd)
+    sink = os.open(os.devnull, os.O_WRONLY)
+    relay = setup(master_fd, sink)
+    thread = threading.Thread(target=relay.run, daemon=True)
+    thread.start()
+
+    def stop():
+        relay.call_soon(relay.stop)
+        thread.join()
+        for fd in (master_fd, slave_fd, sink):
+            os.close(fd)
+    return relay, slave_fd, stop
+
+
+def tick_poll(commands):
+    def setup(master_fd, sink):
+        def check():
+            try:
+                relay.write_child((commands.get_nowait() + '\n').encode())
+            except queue.Empty:
+                pass
+        relay = PtyRelay(master_fd, None, sink, on_tick=check, tick_interval=0.1)
+        return relay
+    return setup
+
+
+def mailbox(commands):
+    def setup(master_fd, sink):
+        relay = PtyRelay(master_fd, None, sink)
+        relay.watch(commands, relay.paste)
+        return relay
+    return setup
+
+
+def read_until(fd, size):
+    received = 0
+    while received < size:
+        received += len(os.read(fd, 65536))
+
+
+def time_commands(make_setup, commands, n):
+    relay, slave_fd, stop = start_relay(make_setup(commands))
+    latencies = []
+    try:
+        for i in range(n):
+            # Random spacing so commands do not line up with the polling tick
+            time.sleep(random.uniform(0, 0.05))
+            command = f"run step {i}"
+            start = time.perf_counter()
+            commands.put(command)
+            read_until(slave_fd, len(command) + 1)
+            latencies.append((time.perf_counter() - start) * 1000)
+    finally:
+        stop()
+    return latencies
+
+
+def time_paste(size):
+    commands = Mailbox()
+    relay, slave_fd, stop = start_relay(mailbox(commands))
+    relay.paste_mode.enabled = True
+    text = ('x' * 79 + '\n') * (size // 80)
+    try:
+        start = time.perf_counter()
+        commands.put(text)
+        read_until(slave_fd, len(PASTE_START) + len(text) + len(PASTE_END) + 1)
+        return time.perf_counter() - start
+    finally:
+        stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--commands', type=int, default=50)
+    parser.add_argument('--paste-kb', type=int, default=1024)
+    args = parser.parse_args()
+
+    print(f"{'loop':<14}{'median ms':>12}{'p99 ms':>10}{'max ms':>10}")
+    for name, make_setup, commands in (('tick poll', tick_poll, queue.Queue()),
+                                       ('mailbox', mailbox, Mailbox())):
+        latencies = sorted(time_commands(make_setup, commands, args.commands))
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        print(f"{name:<14}{statistics.median(latencies):>12.3f}{p99:>10.3f}{latencies[-1]:>10.3f}")
+
+    elapsed = time_paste(args.paste_kb * 1024)
+    print(f"\n{args.paste_kb} KB bracketed paste delivered in {elapsed * 1000:.1f} ms "
+          f"({args.paste_kb / 1024 / elapsed:.1f} MB/s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""Menu options found at each prompt: rescanning the tail versus OptionTracker.
+
+    python3 -m claude_notify.benchmarks.bench_options [--prompts 2000] [--seed 1]
+
+Builds a session of output lines with three kinds of prompt, in equal
+numbers:
+
+    permission   the boxed ❯ 1. Yes / 2. ... / 3. No dialog
+    question     'Which approach should I take?' and a plain numbered list
+    y/n          a numbered list in Claude's answer, a few lines of prose,
+                 then 'Continue? (y/n)' (no options)
+
+At each prompt the options are taken three ways: the regex the remote and
+teams wrappers ran over the last 20 lines, the one python3 -m claude_notify
+ran, and OptionTracker.texts after it was fed every line once. Reported:
+CPU per prompt (the rescans) or per line (the tracker, which works as
+output arrives), the session total, and how often each got exactly the
+options on screen.
+"""
+
+import argparse
+import random
+import re
+import time
+
+from claude_notify import fakeclaude
+from claude_notify.options import OptionTracker
+
+_REMOTE = re.compile(r'^\s*(?:\[?(\d+)\]?[\.)\s])\s*(.+)')
+_CLI = re.compile(r'^\s*\[?(\d+)\]?[.)]\s+(.+)')
+CHOICES = ['Keep the cache in memory', 'Move it to Redis', 'Drop the cache and measure again']
+
+
+def remote_options(text):
+    """RemoteNotifier.extract_options as it was"""
+    options = []
+    for line in text.split('\n'):
+        match = _REMOTE.match(line)
+        if match:
+            num = int(match.group(1))
+            if 1 <= num <= 10:
+                while len(options) < num:
+                    options.append('')
+                options[num - 1] = match.group(2).strip()
+    return [opt for opt in options if opt]
+
+
+def cli_options(lines):
+    """cli.extract_options as it was"""
+    options = []
+    for line in lines:
+        match = _CLI.match(line)
+        if match and 1 <= int(match.group(1)) <= 10:
+            options.append(match.group(2).strip())
+    return options
+
+
+def make_session(rng, prompts):
+    """(lines, [(index of the prompt line, expected options)])"""
+    lines = []
+    marks = []
+    for n in range(prompts):
+        for _ in range(rng.randrange(10, 40)):
+            if rng.random() < 0.6:
+                lines.append(f"● {rng.choice(fakeclaude.PROSE)}")
+            else:
+                lines.append(f"\x1b[38;5;246m{rng.choice(fakeclaude.CODE)}\x1b[0m")
+        kind = n % 3
+        if kind == 0:
+            command = rng.choice(fakeclaude.COMMANDS)
+            box, _ = fakeclaude._permission(command)
+            lines += [f"● Bash({command})"] + box.split('\r\n')
+            expected = ['Yes', f"Yes, and don't ask again for {command.split()[0]} commands",
+                        'No, and tell Claude what to do differently (esc)']
+        elif kind == 1:
+            lines += ['Which approach should I take?'] + [f"{i}. {c}" for i, c in enumerate(CHOICES, 1)]
+            expected = list(CHOICES)
+        else:
+            lines += ["Here's what I changed:", '1. Moved the loader', '2. Added a test', '']
+            lines += [f"● {rng.choice(fakeclaude.PROSE)}" for _ in range(2)]
+            lines.append('Continue? (y/n)')
+            expected = []
+        marks.append((len(lines) - 1, expected))
+    return lines, marks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--prompts', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    lines, marks = make_session(random.Random(args.seed), args.prompts)
+    print(f"{len(lines)} lines, {len(marks)} prompts")
+    print(f"{'method':<22}{'cpu us':>10}{'per':>8}{'total ms':>10}{'exact':>8}")
+
+    for name, pick in (('remote/teams rescan', lambda tail: remote_options('\n'.join(tail))),
+                       ('cli rescan', cli_options)):
+        start = time.process_time()
+        found = [pick(lines[max(0, i - 19):i + 1]) for i, _ in marks]
+        total = time.process_time() - start
+        exact = sum(f == e for f, (_, e) in zip(found, marks)) / len(marks)
+        print(f"{name:<22}{total / len(marks) * 1e6:>10.1f}{'prompt':>8}{total * 1000:>10.1f}{exact:>8.0%}")
+
+    tracker = OptionTracker()
+    found = []
+    todo = iter(marks)
+    index, _ = next(todo)
+    start = time.process_time()
+    for i, line in enumerate(lines):
+        tracker.feed_line(line)
+        if i == index:
+            found.append(tracker.texts)
+            index, _ = next(todo, (-1, None))
+    total = time.process_time() - start
+    exact = sum(f == e for f, (_, e) in zip(found, marks)) / len(marks)
+    print(f"{'OptionTracker':<22}{total / len(lines) * 1e6:>10.1f}{'line':>8}{total * 1000:>10.1f}{exact:>8.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""Prompt detection latency of the line-mode wrappers.
+
+    python3 -m claude_notify.benchmarks.bench_passthrough [--trials 5] [--hold 2.0]
+
+Runs a fake claude that prints a screenful of output, then draws a bare
+"> " prompt with no newline and waits --hold seconds before finishing the
+line. Each reader is timed from the moment the prompt is written until the
+detector sees it:
+
+    text-mode lines    for line in process.stdout (what the wrappers did)
+    stream_lines       claude_notify.passthrough: chunked reads + quiet tail
+
+The text-mode reader cannot see the prompt until its newline arrives, so its
+latency is about --hold. stream_lines should see it after QUIET_INTERVAL.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from claude_notify.detector import get_detector
+from claude_notify.passthrough import QUIET_INTERVAL, stream_lines
+
+FAKE_CLAUDE = r"""
+import sys, time
+out = sys.stdout
+for i in range(200):
+    out.write(f"step {i}: reading src/module_{i}.py and planning the next edit\n")
+out.write("Done. What would you like to do next?\n")
+out.write("> ")
+out.flush()
+with open(sys.argv[1], 'w') as f:
+    f.write(repr(time.monotonic()))
+time.sleep(float(sys.argv[2]))
+out.write("\n")
+"""
+
+
+def spawn(stamp, hold, text):
+    return subprocess.Popen(
+        [sys.executable, '-c', FAKE_CLAUDE, stamp, str(hold)],
+        stdout=subprocess.PIPE, universal_newlines=text, bufsize=1 if text else 0)
+
+
+def text_mode(process, sink):
+    for line in process.stdout:
+        sink.write(line)
+        yield line
+
+
+def chunked(process, sink):
+    return stream_lines(process.stdout, out=sink)
+
+
+def trial(reader, hold, sink, detector):
+    """Seconds from prompt drawn to prompt detected"""
+    with tempfile.NamedTemporaryFile('r', suffix='.stamp') as stamp:
+        process = spawn(stamp.name, hold, reader is text_mode)
+        detected = None
+        for line in reader(process, sink):
+            if detector.is_waiting(line.strip()):
+                detected = time.monotonic()
+                break
+        process.kill()
+        process.wait()
+        drawn = float(stamp.read())
+    return detected - drawn
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--trials', type=int, default=5)
+    parser.add_argument('--hold', type=float, default=2.0, help='seconds the prompt stays unfinished')
+    args = parser.parse_args()
+
+    detector = get_detector('strict')
+    print(f"{'reader':<20}{'median ms':>12}{'max ms':>10}")
+    with open(os.devnull, 'w') as sink:
+        for name, reader in (('text-mode lines', text_mode), ('stream_lines', chunked)):
+            latencies = [trial(reader, args.hold, sink, detector) * 1000 for _ in range(args.trials)]
+            print(f"{name:<20}{statistics.median(latencies):>12.1f}{max(latencies):>10.1f}")
+    print(f"(quiet interval {QUIET_INTERVAL * 1000:.0f} ms, prompt held {args.hold * 1000:.0f} ms)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""Payload size, CPU and kept context for the secure notifier, before and after.
+
+    python3 -m claude_notify.benchmarks.bench_payload [--events 2000] [--lines 20] [--budget 2048]
+
+Builds contexts the way the secure wrapper sees them: the last --lines
+lines of raw output, with escape sequences, spinner redraws, tool calls,
+an occasional error, and a permission dialog at the end. Each context is
+then run through both pipelines:
+
+    old    context[-500:], Fernet over json.dumps(data), json.dumps(sort_keys)
+           to sign, and json.dumps again for the body
+    new    fit_context to --budget bytes, canonical JSON once, zlib, Fernet,
+           HMAC over the body bytes
+
+Reported per pipeline: body bytes on the wire (p50/max), CPU microseconds
+per event, and how often the context that was sent still holds the
+question ('Do you want to proceed?'), the command it is about, and the
+last error when there was one. Without the cryptography package the
+Fernet step is left out of the timings and its token length is computed
+from the spec instead.
+"""
+
+import argparse
+import base64
+import hashlib
+import hmac
+import json
+import random
+import time
+
+from claude_notify import fakeclaude
+from claude_notify.payload import encode, fit_context, seal
+
+SECRET = 'session-secret'
+QUESTION = 'Do you want to proceed?'
+COMMAND = '● Bash('
+ERROR = "Error: cannot import name"
+
+
+def fernet_length(n):
+    """Length of a Fernet token for n bytes of plaintext"""
+    raw = 1 + 8 + 16 + (n // 16 + 1) * 16 + 32
+    return len(base64.urlsafe_b64encode(b'\0' * raw))
+
+
+class SizeOnly:
+    """Token of the right length, for sizes when cryptography is missing"""
+    def encrypt(self, data):
+        return b'g' * fernet_length(len(data))
+
+
+def make_cipher():
+    try:
+        from cryptography.fernet import Fernet
+    except ImportError:
+        return SizeOnly(), False
+    return Fernet(Fernet.generate_key()), True
+
+
+def make_context(rng, lines):
+    out = []
+    while len(out) < lines * 3:
+        roll = rng.random()
+        if roll < 0.15:
+            out.append(f"\x1b[38;5;174m{rng.choice(fakeclaude.SPINNER)}\x1b[0m Thinking… "
+                       f"({rng.randrange(9)}s · esc to interrupt)")
+        elif roll < 0.45:
+            out.append(f"● {rng.choice(fakeclaude.PROSE)}")
+        elif roll < 0.55:
+            out.append(rng.choice(fakeclaude.TOOL_OUTPUT))
+        elif roll < 0.58:
+            out.append("Error: cannot import name 'LRUCache' from 'app.cache' (app/cache.py)")
+        elif roll < 0.62:
+            out.append('')
+        else:
+            out.append(f"\x1b[38;5;246m{rng.choice(fakeclaude.CODE)}\x1b[0m")
+    command = rng.choice(fakeclaude.COMMANDS)
+    box, _ = fakeclaude._permission(command)
+    out += [f"● Bash({command})"] + box.split('\r\n')
+    return '\n'.join(out[-lines:]) + '\n'
+
+
+def old_pipeline(context, cipher):
+    data = {'context': context[-500:], 'options': ['Yes', 'No'], 'alerts': 1, 'timestamp': 1760870400}
+    token = cipher.encrypt(json.dumps(data).encode()).decode()
+    payload = {'sessionId': 'x' * 36, 'timestamp': '2025-10-19T12:00:00', 'event': 'claude_waiting', 'data': token}
+    hmac.new(SECRET.encode(), json.dumps(payload, sort_keys=True).encode(), hashlib.sha256).hexdigest()
+    body = json.dumps(payload).encode()
+    return len(body), data['context']
+
+
+def new_pipeline(context, cipher, budget):
+    data = {'context': fit_context(context, budget), 'options': ['Yes', 'No'], 'alerts': 1, 'timestamp': 1760870400}
+    sealed = seal(data, cipher)
+    payload = {'sessionId': 'x' * 36, 'timestamp': '2025-10-19T12:00:00', 'event': 'claude_waiting',
+               'encoding': sealed['encoding'], 'data': sealed['data']}
+    body, headers = encode(payload, secret=SECRET)
+    return len(body), data['context']
+
+
+def measure(name, run, contexts):
+    sizes = []
+    sent = []
+    start = time.process_time()
+    for context in contexts:
+        size, text = run(context)
+        sizes.append(size)
+        sent.append(text)
+    cpu = (time.process_time() - start) / len(contexts) * 1e6
+    sizes.sort()
+    n = len(contexts)
+    question = sum(QUESTION in s for s in sent) / n
+    command = sum(COMMAND in s for s in sent) / n
+    with_error = [s for c, s in zip(contexts, sent) if ERROR in c]
+    error = sum(ERROR in s for s in with_error) / len(with_error) if with_error else 0
+    print(f"{name:<24}{sizes[n // 2]:>8}{sizes[-1]:>8}{cpu:>9.1f}{question:>10.0%}{command:>9.0%}{error:>7.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--events', type=int, default=2000)
+    parser.add_argument('--lines', type=int, default=20, help='lines of output per context (the wrapper keeps 20)')
+    parser.add_argument('--budget', type=int, default=2048, help='context bytes for the new pipeline')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    contexts = [make_context(rng, args.lines) for _ in range(args.events)]
+    raw = sum(len(c.encode()) for c in contexts) / len(contexts)
+    cipher, encrypting = make_cipher()
+    print(f"{args.events} events, {args.lines} lines, {raw:.0f} bytes of raw context on average")
+    if not encrypting:
+        print("cryptography is not installed: Fernet token sizes computed, encryption not timed")
+    print(f"{'pipeline':<24}{'p50 B':>8}{'max B':>8}{'cpu us':>9}{'question':>10}{'command':>9}{'error':>7}")
+    measure('old: tail 500', lambda c: old_pipeline(c, cipher), contexts)
+    for budget in sorted({500, args.budget}):
+        measure(f'new: fit {budget}, zlib', lambda c: new_pipeline(c, cipher, budget), contexts)
+
+
+if __name__ == '__main__':
+    main()
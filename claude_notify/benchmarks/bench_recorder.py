@@ -0,0 +1,123 @@
+"""Relay CPU overhead of recording the session transcript.
+
+    python3 -m claude_notify.benchmarks.bench_recorder [--mb 16] [--runs 3]
+
+Pushes --mb of Claude-like output (a mix of prose, code and escape
+sequences) from a child process through a PtyRelay. It measures the CPU
+time of the relay thread in two setups:
+
+    wrapper loop   on_output does what cli.run does (LineRing + PromptWatcher)
+    bare relay     no on_output work at all; the worst case for any hook
+
+Each setup runs with and without a Recorder fed from on_output. The runs
+alternate and the medians are compared. The writer thread's CPU (decode,
+JSON and compression) is reported separately, because it runs off the loop.
+On a single-core machine it still competes with the loop for the CPU.
+"""
+
+import argparse
+import os
+import pty
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from claude_notify.detector import get_detector
+from claude_notify.lines import LineRing
+from claude_notify.recorder import Recorder
+from claude_notify.relay import PtyRelay
+from claude_notify.screen import PromptWatcher
+
+CHILD = r"""
+import os, sys
+chunk = (
+    "\x1b[1m●\x1b[0m I'll update the parser to handle the new token types.\r\n"
+    "  def parse(self, tokens):\r\n        for token in tokens:\r\n"
+    "            if token.kind == 'ident':\r\n                yield Name(token.text)\r\n"
+    "\x1b[2K\x1b[1G\x1b[38;5;246m✻ Thinking… (12s · esc to interrupt)\x1b[0m\r\n"
+).encode() * 64
+total = int(sys.argv[1])
+out = sys.stdout.fileno()
+while total > 0:
+    total -= os.write(out, chunk[:total])
+"""
+
+
+def cpu_total():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def wrapper_loop(rec):
+    """on_output as the PTY wrappers have it"""
+    lines = LineRing()
+    watcher = PromptWatcher(get_detector('prompt'))
+
+    def on_output(data):
+        lines.feed(data)
+        if rec:
+            rec.output(data)
+        watcher.feed(data)
+    return on_output
+
+
+def run(size, directory=None, analyse=True):
+    """(relay thread CPU s, writer thread CPU s, wall s, compressed bytes)"""
+    master_fd, slave_fd = pty.openpty()
+    process = subprocess.Popen([sys.executable, '-c', CHILD, str(size)],
+                               stdin=slave_fd, stdout=slave_fd, stderr=slave_fd, close_fds=True)
+    os.close(slave_fd)
+    sink = os.open(os.devnull, os.O_WRONLY)
+    rec = Recorder(directory, session='bench') if directory else None
+    on_output = wrapper_loop(rec) if analyse else rec.output if rec else None
+    relay = PtyRelay(master_fd, None, sink, on_output=on_output)
+    process_cpu = cpu_total()
+    start = time.perf_counter()
+    relay_cpu = time.thread_time()
+    relay.run()
+    relay_cpu = time.thread_time() - relay_cpu
+    wall = time.perf_counter() - start
+    if rec:
+        rec.close(timeout=60)
+    writer_cpu = cpu_total() - process_cpu - relay_cpu
+    process.wait()
+    os.close(master_fd)
+    os.close(sink)
+    compressed = sum(os.path.getsize(p) for p in rec.segments) if rec else 0
+    return relay_cpu, writer_cpu, wall, compressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mb', type=int, default=16)
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+    size = args.mb * 1024 * 1024
+
+    print(f"{args.mb} MB through the relay, median of {args.runs} runs")
+    print(f"{'setup':<14}{'plain ms':>10}{'recording ms':>14}{'overhead':>10}{'writer ms':>11}{'MB/s':>7}")
+    directory = tempfile.mkdtemp()
+    try:
+        for name, analyse in (('wrapper loop', True), ('bare relay', False)):
+            plain, recorded = [], []
+            for i in range(args.runs):
+                plain.append(run(size, analyse=analyse))
+                recorded.append(run(size, os.path.join(directory, f'{name}{i}'), analyse))
+            base = statistics.median(r[0] for r in plain)
+            with_rec = statistics.median(r[0] for r in recorded)
+            writer = statistics.median(r[1] for r in recorded)
+            rate = args.mb / statistics.median(r[2] for r in plain)
+            print(f"{name:<14}{base * 1000:>10.1f}{with_rec * 1000:>14.1f}"
+                  f"{(with_rec - base) / base * 100:>+9.2f}%{writer * 1000:>11.1f}{rate:>7.0f}")
+        compressed = statistics.median(r[3] for r in recorded)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    print(f"transcript {compressed / 1024:.0f} KB ({size / max(compressed, 1):.0f}x smaller than the output)")
+
+
+if __name__ == '__main__':
+    main()
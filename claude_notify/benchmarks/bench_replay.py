@@ -0,0 +1,268 @@
+"""End-to-end replay of a claude session through every wrapper.
+
+    python3 -m claude_notify.benchmarks.bench_replay [--wrappers NAME,...] [--turns 10] [--speed 4]
+                                                     [--burst 1048576] [--answer 1.5] [--script CAST]
+
+Each wrapper runs in a PTY of its own, with CLAUDE_PATH pointing at
+claude_notify/fakeclaude.py and CLAUDE_NOTIFY_SINK collecting what it would
+have sent. Service URLs and keys are placeholders, so nothing leaves the
+machine, and HOME is a temporary directory. The harness plays the user. It
+drains the terminal, and answers each prompt as soon as the notification
+for it lands in the sink, or after --answer seconds without one. Reported
+per wrapper:
+
+    MB/s           bursts of output from claude to the harness's terminal,
+                   timed from the fake's log to the burst's closing sequence
+    p50/p99 ms     prompt written by the fake -> notification in the sink
+    caught         prompts that got a notification before they were answered
+    false+         notifications with no prompt waiting
+    cpu s          CPU used by the wrapper's processes (the fake excluded)
+
+The prompts are a mix of the input box, permission dialogs and bare '>'
+lines (see fakeclaude.synthetic). Only the first notification per prompt
+counts; a second one for the same prompt is reported as a duplicate.
+"""
+
+import argparse
+import json
+import os
+import pty
+import select
+import shutil
+import signal
+import struct
+import subprocess
+import sys
+import tempfile
+import termios
+import time
+from fcntl import ioctl
+
+from claude_notify import fakeclaude
+from claude_notify.sink import read
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+FAKE = os.path.join(ROOT, 'claude_notify', 'fakeclaude.py')
+TEAMS = {'TEAMS_WEBHOOK_URL': 'https://teams.sink.invalid/webhook'}
+PY = sys.executable
+
+# name, argv, extra environment; the first row is the fake on its own, as a ceiling
+WRAPPERS = [
+    ('(no wrapper)', [PY, FAKE], {}),
+    ('claude-notify.sh', ['bash', 'claude-notify.sh'], {}),
+    ('claude-notify.py', [PY, 'claude-notify.py'], {}),
+    ('claude-notify-simple.py', [PY, 'claude-notify-simple.py'], {}),
+    ('claude-notify-visual.py', [PY, 'claude-notify-visual.py'], {}),
+    ('claude-teams-notify.py', [PY, 'claude-teams-notify.py'], TEAMS),
+    ('claude-teams-simple.py', [PY, 'claude-teams-simple.py'], TEAMS),
+    ('claude-pushover-notify.py', [PY, 'claude-pushover-notify.py'],
+     {'PUSHOVER_USER_KEY': 'sink', 'PUSHOVER_APP_TOKEN': 'sink'}),
+    ('claude-secure-notify.py', [PY, 'claude-secure-notify.py'],
+     {'PIPEDREAM_WEBHOOK_URL': 'https://pipedream.sink.invalid/hook'}),
+    ('claude-remote-notify.py', [PY, 'claude-remote-notify.py'], dict(TEAMS, CLAUDE_NOTIFY_WEBHOOK_PORT='0')),
+    ('claude_notify', [PY, '-m', 'claude_notify', '--backends', 'desktop'], {}),
+]
+ROWS, COLS = 40, 120
+GRACE = 0.25
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class Tail:
+    """New JSON lines appended to a file since the last call"""
+
+    def __init__(self, path):
+        self.path = path
+        self.offset = 0
+        self.partial = ''
+
+    def read(self):
+        try:
+            with open(self.path) as f:
+                f.seek(self.offset)
+                data = f.read()
+                self.offset = f.tell()
+        except FileNotFoundError:
+            return []
+        lines = (self.partial + data).split('\n')
+        self.partial = lines.pop()
+        return [json.loads(line) for line in lines if line]
+
+
+def group_cpu(pgid, exclude, seen):
+    """Update seen[pid] with the CPU seconds of every process in the group"""
+    tick = os.sysconf('SC_CLK_TCK')
+    for pid in os.listdir('/proc'):
+        if not pid.isdigit() or int(pid) in exclude:
+            continue
+        try:
+            with open(f'/proc/{pid}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[2]) == pgid:
+            seen[int(pid)] = (int(fields[11]) + int(fields[12])) / tick
+
+
+def run(name, argv, extra, args, directory):
+    sink_path = os.path.join(directory, 'sink.jsonl')
+    log_path = os.path.join(directory, 'fake.jsonl')
+    env = dict(os.environ, **extra)
+    env.update({
+        'HOME': directory,
+        'PYTHONPATH': ROOT,
+        'CLAUDE_PATH': FAKE,
+        'CLAUDE_NOTIFY_SINK': sink_path,
+        'CLAUDE_NOTIFY_OUTBOX': os.path.join(directory, 'outbox.db'),
+        'CLAUDE_FAKE_LOG': log_path,
+        'CLAUDE_FAKE_SPEED': str(args.speed),
+        'CLAUDE_FAKE_TURNS': str(args.turns),
+        'CLAUDE_FAKE_BURST': str(args.burst),
+        'CLAUDE_FAKE_SEED': str(args.seed),
+        'TERM': 'xterm-256color',
+    })
+    if args.script:
+        env['CLAUDE_FAKE_SCRIPT'] = args.script
+    master, slave = pty.openpty()
+    ioctl(slave, termios.TIOCSWINSZ, struct.pack('HHHH', ROWS, COLS, 0, 0))
+    process = subprocess.Popen(argv, cwd=ROOT, env=env, stdin=slave, stdout=slave, stderr=slave,
+                               start_new_session=True)
+    os.close(slave)
+    fake_log, sink = Tail(log_path), Tail(sink_path)
+
+    received = 0
+    tail = b''
+    bursts = {}           # id -> [size, written at, seen at]
+    prompts = {}          # id -> [written at, answered at, notified at]
+    pending = None        # id of the prompt the fake is waiting at
+    false_positives = duplicates = 0
+    cpu = {}
+    fake_pids = set()
+    start = time.monotonic()
+    next_cpu = 0
+    exited = False
+    while not exited:
+        now = time.monotonic()
+        if now - start > args.timeout:
+            print(f"  {name}: timed out after {args.timeout:.0f} s", file=sys.stderr)
+            break
+        ready, _, _ = select.select([master], [], [], 0.01)
+        if ready:
+            try:
+                data = os.read(master, 65536)
+            except OSError:
+                data = b''
+            if not data:
+                exited = True
+            received += len(data)
+            window = tail + data
+            for burst_id, entry in bursts.items():
+                if entry[2] is None and (fakeclaude.BURST_END % burst_id).encode() in window:
+                    entry[2] = time.time()
+            tail = window[-64:]
+        # The sink is read first: any notification in it was caused by a
+        # prompt whose log line is therefore already on disk for the next read
+        records = sink.read()
+        for event in fake_log.read():
+            if event['event'] == 'start':
+                fake_pids.add(event['pid'])
+            elif event['event'] == 'burst':
+                bursts[event['id']] = [event['size'], event['time'], None]
+            elif event['event'] == 'prompt':
+                prompts[event['id']] = [event['time'], None, None]
+                pending = event['id']
+        for record in records:
+            latest = max((i for i, p in prompts.items() if p[0] <= record['time']), default=None)
+            entry = prompts.get(latest)
+            if entry is None or (entry[1] is not None and record['time'] > entry[1] + GRACE):
+                false_positives += 1
+            elif entry[2] is not None:
+                duplicates += 1
+            else:
+                entry[2] = record['time']
+        if pending is not None:
+            entry = prompts[pending]
+            if entry[2] is not None or time.time() - entry[0] > args.answer:
+                entry[1] = time.time()
+                pending = None
+                os.write(master, b'\r')
+        if now >= next_cpu and process.poll() is None:
+            group_cpu(process.pid, fake_pids, cpu)
+            next_cpu = now + 0.1
+        if process.poll() is not None and not ready:
+            exited = True
+    wall = time.monotonic() - start
+    if process.poll() is None:
+        os.killpg(process.pid, signal.SIGTERM)
+    try:
+        process.wait(5)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+    os.close(master)
+
+    timed = [b for b in bursts.values() if b[2] is not None]
+    latencies = [(p[2] - p[0]) * 1000 for p in prompts.values() if p[2] is not None]
+    by_kind = {}
+    events = read(log_path)
+    for event in events:
+        if event['event'] == 'prompt':
+            caught = prompts[event['id']][2] is not None
+            total, hit = by_kind.get(event['kind'], (0, 0))
+            by_kind[event['kind']] = (total + 1, hit + caught)
+    return {
+        'mbps': sum(b[0] for b in timed) / 2**20 / sum(b[2] - b[1] for b in timed) if timed else None,
+        'p50': percentile(latencies, 50) if latencies else None,
+        'p99': percentile(latencies, 99) if latencies else None,
+        'caught': len(latencies),
+        'prompts': len(prompts),
+        'by_kind': by_kind,
+        'false': false_positives,
+        'dup': duplicates,
+        'cpu': sum(cpu.values()),
+        'wall': wall,
+        'bytes': received,
+        'finished': any(e['event'] == 'exit' for e in events),
+    }
+
+
+def fmt(value, spec):
+    return format(value, spec) if value is not None else format('-', spec.rstrip('f').split('.')[0] or '>')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--wrappers', help='comma-separated names (default: all)')
+    parser.add_argument('--turns', type=int, default=10)
+    parser.add_argument('--speed', type=float, default=4)
+    parser.add_argument('--burst', type=int, default=1024 * 1024, help='bytes per burst (default 1 MB)')
+    parser.add_argument('--answer', type=float, default=1.5, help='seconds before answering a prompt nobody was told about')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--script', help='replay this asciicast instead of the synthetic session')
+    parser.add_argument('--timeout', type=float, default=300)
+    parser.add_argument('-v', '--verbose', action='store_true', help='break caught prompts down by kind')
+    args = parser.parse_args()
+
+    wanted = set(args.wrappers.split(',')) if args.wrappers else None
+    print(f"{'wrapper':<26}{'MB/s':>7}{'p50 ms':>8}{'p99 ms':>8}{'caught':>9}{'false+':>7}{'dup':>5}{'cpu s':>7}{'wall s':>8}")
+    for name, argv, extra in WRAPPERS:
+        if wanted and name not in wanted:
+            continue
+        directory = tempfile.mkdtemp()
+        try:
+            r = run(name, argv, extra, args, directory)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+        caught = f"{r['caught']}/{r['prompts']}"
+        print(f"{name:<26}{fmt(r['mbps'], '>7.1f')}{fmt(r['p50'], '>8.0f')}{fmt(r['p99'], '>8.0f')}"
+              f"{caught:>9}{r['false']:>7}{r['dup']:>5}{r['cpu']:>7.2f}{r['wall']:>8.1f}"
+              + ('' if r['finished'] else '  (fake did not finish)'))
+        if args.verbose:
+            print('    ' + ', '.join(f"{kind} {hit}/{total}" for kind, (total, hit) in sorted(r['by_kind'].items())))
+
+
+if __name__ == '__main__':
+    main()
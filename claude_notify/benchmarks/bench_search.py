@@ -0,0 +1,209 @@
+"""Transcript search: index build rate and query latency against a linear scan.
+
+    python3 -m claude_notify.benchmarks.bench_search [--mb 512] [--sessions 40] [--days 30] [--keep DIR]
+
+Writes a synthetic recordings directory of --mb raw output. Each segment is
+gzip blocks plus a .blocks table, in the same layout Recorder produces.
+Sessions are spread over --days. Most lines are drawn from a pool of
+Claude-like output. A few blocks also carry rare words, so queries range
+from a handful of hits to every block. Reported:
+
+    build          Index.sync() over the whole corpus: MB/s of raw output, and
+                   the per-segment cost the recorder pays when it seals one
+    index size     index.db next to the compressed corpus
+    query ms       median of --repeat runs, for each query shape
+    linear scan    inflate every segment and search it, as zgrep would
+
+Use --mb 2048 or more for a multi-GB corpus; generation and the linear scan
+take about a minute per GB here.
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+
+from claude_notify.recorder import BLOCK_SIZE, BLOCKS_SUFFIX, SEGMENT_SIZE, decompress_block, get_codec
+from claude_notify.search import Index
+
+POOL = [
+    "\x1b[1m●\x1b[0m I'll update the parser to handle the new token types.",
+    "  def parse(self, tokens):",
+    "        for token in tokens:",
+    "            if token.kind == 'ident':",
+    "                yield Name(token.text)",
+    "\x1b[2K\x1b[1G\x1b[38;5;246m✻ Thinking… (12s · esc to interrupt)\x1b[0m",
+    "\x1b[32m✓\x1b[0m Tests passed: 148 passed, 2 skipped in 3.41s",
+    "Reading src/server/handlers.py (412 lines)",
+    "  - return self.cache.get(key)",
+    "  + return self.cache.get(key, default)",
+    "Running: pytest tests/test_handlers.py -q",
+    "The migration adds a nullable column, so existing rows keep working.",
+    "Updated README.md with the new configuration options.",
+]
+WORDS = ('alpha bravo cache config deploy endpoint fixture handler index lambda '
+         'module network output payload queue retry schema thread update worker').split()
+# (word, occurrences in the corpus): rare enough to show what the index saves
+RARE = [('zebrafish', 2), ('quokka', 16), ('narwhal', 128)]
+
+
+def make_lines(rng, position, due, total):
+    """About a block of output; rare words go in, evenly spaced, once position passes their turn"""
+    lines = []
+    size = 0
+    while size < BLOCK_SIZE:
+        if rng.random() < 0.3:
+            lines.append(' '.join(rng.choices(WORDS, k=8)) + f" {rng.randrange(100000)}")
+        else:
+            lines.append(rng.choice(POOL))
+        size += len(lines[-1]) + 2
+    for word, count in RARE:
+        if position >= due.setdefault(word, total // count // 2):
+            due[word] += total // count
+            lines.insert(rng.randrange(len(lines)), f"Do you want me to migrate the {word} table? (y/n)")
+    return lines
+
+
+def generate(directory, total, sessions, days, seed=1):
+    """Write the corpus; returns (raw bytes, compressed bytes, segments, blocks)"""
+    rng = random.Random(seed)
+    suffix, compress = get_codec('gzip')
+    now = time.time()
+    per_session = total // sessions
+    raw_total = compressed_total = segments = block_no = 0
+    due = {}
+    for s in range(sessions):
+        session = f"bench-s{s:03d}"
+        clock = now - days * 86400 * (1 - s / sessions)
+        written = 0
+        seq = 0
+        while written < per_session:
+            seq += 1
+            path = os.path.join(directory, f"{session}.{seq:04d}.cast{suffix}")
+            header = {'version': 2, 'width': 120, 'height': 40, 'timestamp': int(clock), 'title': session}
+            base = int(clock)
+            blocks = []
+            with open(path, 'wb') as f:
+                while written < per_session and f.tell() < SEGMENT_SIZE:
+                    events = [json.dumps(header)] if not blocks else []
+                    start = clock
+                    for line in make_lines(rng, raw_total + written, due, total):
+                        clock += rng.random() * 0.05
+                        events.append(json.dumps([round(clock - base, 6), 'o', line + '\r\n'], ensure_ascii=False))
+                    raw = ('\n'.join(events) + '\n').encode()
+                    block = compress(raw)
+                    blocks.append({'offset': f.tell(), 'length': len(block), 'raw': len(raw),
+                                   'start': round(start, 3), 'end': round(clock, 3)})
+                    f.write(block)
+                    written += len(raw)
+                    compressed_total += len(block)
+                    block_no += 1
+            with open(path + BLOCKS_SUFFIX, 'w') as f:
+                json.dump({'session': session, 'header': header, 'blocks': blocks}, f)
+            segments += 1
+        raw_total += written
+    return raw_total, compressed_total, segments, block_no
+
+
+def corpus_size(directory):
+    """(raw bytes, compressed bytes, segments) of a recordings directory"""
+    raw = compressed = segments = 0
+    for name in os.listdir(directory):
+        if name.endswith(BLOCKS_SUFFIX):
+            with open(os.path.join(directory, name)) as f:
+                raw += sum(block['raw'] for block in json.load(f)['blocks'])
+            compressed += os.path.getsize(os.path.join(directory, name[:-len(BLOCKS_SUFFIX)]))
+            segments += 1
+    return raw, compressed, segments
+
+
+def linear_scan(directory, word):
+    """What grepping the gz files costs: inflate everything, count matching lines"""
+    needle = word.encode()
+    matches = 0
+    for name in os.listdir(directory):
+        if name.endswith('.cast.gz'):
+            path = os.path.join(directory, name)
+            with open(path, 'rb') as f:
+                data = decompress_block(path, f.read())
+            matches += sum(1 for line in data.split(b'\n') if needle in line)
+    return matches
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mb', type=int, default=512)
+    parser.add_argument('--sessions', type=int, default=40)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--keep', help='generate into (or reuse) this directory instead of a temporary one')
+    args = parser.parse_args()
+
+    directory = args.keep or tempfile.mkdtemp()
+    os.makedirs(directory, exist_ok=True)
+    try:
+        start = time.perf_counter()
+        if any(n.endswith(BLOCKS_SUFFIX) for n in os.listdir(directory)):
+            print(f"reusing corpus in {directory}")
+        else:
+            raw, compressed, segments, blocks = generate(directory, args.mb * 1024 * 1024, args.sessions, args.days)
+            print(f"corpus: {raw / 2**20:.0f} MB raw, {compressed / 2**20:.0f} MB compressed, "
+                  f"{segments} segments, {blocks} blocks ({time.perf_counter() - start:.1f} s to generate)")
+        raw, compressed, segments = corpus_size(directory)
+
+        db = os.path.join(directory, 'index.db')
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(db + suffix):
+                os.remove(db + suffix)
+        index = Index(db, directory)
+        start = time.perf_counter()
+        blocks = index.sync()
+        build = time.perf_counter() - start
+        index.db.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        print(f"build: {blocks} blocks in {build:.1f} s, {raw / 2**20 / build:.1f} MB/s raw, "
+              f"{build / segments * 1000:.0f} ms per segment on seal")
+        print(f"index size: {os.path.getsize(db) / 2**20:.1f} MB "
+              f"({os.path.getsize(db) / compressed * 100:.1f}% of the compressed corpus)")
+
+        now = time.time()
+        session = f"bench-s{args.sessions // 2:03d}"
+        queries = [
+            ('rare word', 'zebrafish', {}),
+            ('uncommon word', 'quokka', {}),
+            ('phrase', '"migrate the narwhal table"', {}),
+            ('common word, limit 20', 'parser', {}),
+            ('AND / NOT', 'narwhal AND migrate NOT quokka', {}),
+            ('word, one session', 'narwhal', {'session': session}),
+            (f'word, last {args.days // 3} days', 'narwhal', {'since': now - args.days // 3 * 86400}),
+            ('no match', 'wombat', {}),
+        ]
+        print(f"{'query':<24}{'hits':>6}{'median ms':>11}")
+        for name, query, kwargs in queries:
+            ms, hits = timed(lambda: index.search(query, limit=20, **kwargs), args.repeat)
+            print(f"{name:<24}{len(hits):>6}{ms:>11.2f}")
+        index.close()
+
+        start = time.perf_counter()
+        matches = linear_scan(directory, 'zebrafish')
+        scan = (time.perf_counter() - start) * 1000
+        print(f"linear scan for 'zebrafish': {matches} lines, {scan:.0f} ms")
+    finally:
+        if not args.keep:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""Per-session cost of the supervisor as sessions scale.
+
+    python3 -m claude_notify.benchmarks.bench_supervisor [--sessions 1,8,32,64] [--rounds 50]
+
+Starts a supervisor (no webhook, no tunnel, no backends) on a temporary
+socket, opens N sessions of /bin/cat and attaches one client to each. Every
+round, each client types a line at once and waits for cat to echo it back
+through the supervisor. Reported per N:
+
+    rss MB         supervisor resident memory with N sessions open
+    KB/session     growth over the first session, divided by the extra sessions
+    cpu ms/1k      supervisor CPU time per thousand echoed lines
+    p50/p99 ms     keystroke-to-echo round trip through the supervisor
+
+Flat KB/session and cpu ms/1k mean the loop does not slow down as sessions
+are added.
+"""
+
+import argparse
+import os
+import select
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from claude_notify.readiness import wait_until
+from claude_notify.supervisor import INPUT, connect, frame, request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def rss_kb(pid):
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return 0
+
+
+def cpu_seconds(pid):
+    with open(f'/proc/{pid}/stat') as f:
+        fields = f.read().rsplit(')', 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def start_supervisor(path):
+    env = dict(os.environ, CLAUDE_NOTIFY_BACKENDS='none')
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'claude_notify.supervisor', '--socket', path, 'serve', '--port', '0'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL)
+
+    def listening():
+        try:
+            connect(path).close()
+            return True
+        except OSError:
+            return False
+    wait_until(listening, timeout=10)
+    return process
+
+
+def open_sessions(path, n):
+    clients = []
+    for _ in range(n):
+        _, sock, _ = request({'op': 'new', 'argv': ['/bin/cat'], 'rows': 24, 'cols': 80}, path)
+        clients.append(sock)
+    return clients
+
+
+def run_rounds(clients, rounds):
+    latencies = []
+    for r in range(rounds):
+        pending = {}
+        for i, sock in enumerate(clients):
+            token = f'r{r}c{i}'.encode()
+            sock.sendall(frame(INPUT, token + b'\r'))
+            # The PTY echoes the line, then cat prints it again
+            pending[sock] = [token, b'', time.perf_counter()]
+        while pending:
+            ready, _, _ = select.select(list(pending), [], [], 5)
+            if not ready:
+                raise RuntimeError("no echo within 5 s")
+            for sock in ready:
+                entry = pending[sock]
+                entry[1] += sock.recv(65536)
+                if entry[1].count(entry[0]) >= 2:
+                    latencies.append((time.perf_counter() - entry[2]) * 1000)
+                    del pending[sock]
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', default='1,8,32,64')
+    parser.add_argument('--rounds', type=int, default=50)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'bench.sock')
+    print(f"{'sessions':>8}{'rss MB':>9}{'KB/session':>12}{'cpu ms/1k':>11}{'p50 ms':>9}{'p99 ms':>9}")
+    try:
+        for n in (int(x) for x in args.sessions.split(',')):
+            supervisor = start_supervisor(path)
+            clients = []
+            try:
+                clients = open_sessions(path, 1)
+                run_rounds(clients, 2)
+                base = rss_kb(supervisor.pid)
+                clients += open_sessions(path, n - 1)
+                run_rounds(clients, 2)
+                rss = rss_kb(supervisor.pid)
+                cpu = cpu_seconds(supervisor.pid)
+                latencies = run_rounds(clients, args.rounds)
+                cpu = cpu_seconds(supervisor.pid) - cpu
+                per_session = (rss - base) / (n - 1) if n > 1 else 0
+                print(f"{n:>8}{rss / 1024:>9.1f}{per_session:>12.1f}{cpu * 1e6 / len(latencies):>11.1f}"
+                      f"{percentile(latencies, 50):>9.2f}{percentile(latencies, 99):>9.2f}")
+            finally:
+                for sock in clients:
+                    sock.close()
+                supervisor.terminate()
+                supervisor.wait()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""Per-notification latency with and without pooled connections.
+
+    python3 -m claude_notify.benchmarks.bench_transport [--requests 200] [--connect-delay-ms 0]
+
+Starts a local HTTPS stand-in for a webhook (self-signed certificate made
+with openssl) and posts a Teams-sized JSON card to it repeatedly:
+
+    bare requests.post    what the backends did before: a new connection per send
+    transport.post        claude_notify.transport: one kept-alive client per host
+    http.client fresh     stdlib, new HTTPSConnection per send
+    http.client reused    stdlib, one HTTPSConnection for every send
+
+The http.client pair isolates the handshake cost and runs even without
+requests installed. Localhost has no round-trip time, so --connect-delay-ms
+makes the server stall each new connection to stand in for a real network.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CARD = {
+    "@type": "MessageCard",
+    "@context": "http://schema.org/extensions",
+    "summary": "Claude needs input",
+    "sections": [{"activityTitle": "Claude is waiting", "text": "x" * 600}],
+}
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    connect_delay = 0.0
+
+    def setup(self):
+        super().setup()
+        if self.connect_delay:
+            time.sleep(self.connect_delay)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        body = b'1'
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def make_cert(directory):
+    cert = os.path.join(directory, 'cert.pem')
+    key = os.path.join(directory, 'key.pem')
+    subprocess.run([
+        'openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+        '-keyout', key, '-out', cert, '-subj', '/CN=localhost',
+        '-addext', 'subjectAltName=DNS:localhost,IP:127.0.0.1',
+    ], check=True, capture_output=True)
+    return cert, key
+
+
+def start_server(cert, key, connect_delay):
+    WebhookHandler.connect_delay = connect_delay
+    server = ThreadingHTTPServer(('127.0.0.1', 0), WebhookHandler)
+    server.daemon_threads = True
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+    server.socket = context.wrap_socket(server.socket, server_side=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def stdlib_senders(port, cert):
+    context = ssl.create_default_context(cafile=cert)
+    body = json.dumps(CARD).encode()
+    headers = {'Content-Type': 'application/json'}
+
+    def send(conn):
+        conn.request('POST', '/webhook', body, headers)
+        response = conn.getresponse()
+        response.read()
+        return response.status
+
+    def fresh():
+        conn = http.client.HTTPSConnection('localhost', port, context=context)
+        try:
+            return send(conn)
+        finally:
+            conn.close()
+
+    shared = http.client.HTTPSConnection('localhost', port, context=context)
+    return [('http.client fresh', fresh), ('http.client reused', lambda: send(shared))]
+
+
+def requests_senders(url):
+    try:
+        import requests
+    except ImportError:
+        return []
+    from claude_notify import transport
+    return [
+        ('bare requests.post', lambda: requests.post(url, json=CARD, timeout=10).status_code),
+        ('transport.post', lambda: transport.post(url, json=CARD, timeout=10).status_code),
+    ]
+
+
+def time_sender(send, n):
+    send()  # DNS, imports and the first handshake are paid once either way
+    samples = []
+    for _ in range(n):
+        start = time.perf_counter()
+        send()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return samples[len(samples) // 2], samples[min(len(samples) - 1, len(samples) * 99 // 100)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--connect-delay-ms', type=float, default=0.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cert, key = make_cert(tmp)
+        # requests reads REQUESTS_CA_BUNDLE, httpx reads SSL_CERT_FILE
+        os.environ['REQUESTS_CA_BUNDLE'] = cert
+        os.environ['SSL_CERT_FILE'] = cert
+        server = start_server(cert, key, args.connect_delay_ms / 1000)
+        port = server.server_address[1]
+        url = f'https://localhost:{port}/webhook'
+
+        senders = requests_senders(url) + stdlib_senders(port, cert)
+        if len(senders) == 2:
+            print("requests is not installed; timing the stdlib pair only")
+        print(f"{'sender':<22}{'p50 ms':>10}{'p99 ms':>10}")
+        for name, send in senders:
+            p50, p99 = time_sender(send, args.requests)
+            print(f"{name:<22}{p50 * 1000:>10.2f}{p99 * 1000:>10.2f}")
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
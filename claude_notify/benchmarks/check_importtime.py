@@ -0,0 +1,99 @@
+"""Import-time regression check for the wrapper entry points.
+
+    python3 -m claude_notify.benchmarks.check_importtime [--budget-ms 50] [-v]
+
+Loads each entry point under python -X importtime without running its
+main() and adds up the cumulative time of every module imported beyond a
+bare interpreter's startup set. The check fails when an entry point goes
+over the budget, or when it imports a heavy dependency that should only
+load on first use (Flask, requests, cryptography, ...).
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ENTRY_POINTS = [
+    'claude_notify.cli',
+    'claude_notify.supervisor',
+    'claude-notify.py',
+    'claude-notify-simple.py',
+    'claude-notify-visual.py',
+    'claude-pushover-notify.py',
+    'claude-remote-notify.py',
+    'claude-secure-notify.py',
+    'claude-teams-notify.py',
+    'claude-teams-simple.py',
+]
+# Only ever imported lazily, when the feature that needs them runs
+DEFERRED = ('flask', 'requests', 'cryptography', 'httpx', 'twilio', 'urllib3', 'werkzeug')
+
+
+def importtime(code):
+    """(module, cumulative us) for each top-level import made while running code"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        imports.append((name, int(cumulative)))
+    return imports
+
+
+def load_code(entry):
+    if entry.endswith('.py'):
+        return (f"import runpy, sys; sys.path.insert(0, {ROOT!r}); "
+                f"runpy.run_path({os.path.join(ROOT, entry)!r}, run_name='importcheck')")
+    return f"import importlib, sys; sys.path.insert(0, {ROOT!r}); importlib.import_module({entry!r})"
+
+
+def measure(entry, baseline):
+    total = 0
+    heavy = []
+    top = []
+    for name, cumulative in importtime(load_code(entry)):
+        module = name.strip()
+        if module.split('.')[0] in DEFERRED:
+            heavy.append(module)
+        # Nested imports are indented and already counted in their parent
+        if name.startswith(' ') and not name.startswith('  ') and module not in baseline:
+            total += cumulative
+            top.append((cumulative, module))
+    return total, sorted(set(heavy)), sorted(top, reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--budget-ms', type=float, default=50.0)
+    parser.add_argument('-v', '--verbose', action='store_true', help='list the slowest imports of each entry point')
+    args = parser.parse_args()
+
+    # Interpreter startup plus what the loader snippets themselves import
+    baseline = {name.strip() for name, _ in importtime('import importlib, pkgutil, runpy, sys')}
+    failed = False
+    print(f"{'entry point':<28}{'imports ms':>12}  status")
+    for entry in ENTRY_POINTS:
+        total, heavy, top = measure(entry, baseline)
+        problems = []
+        if total / 1000 > args.budget_ms:
+            problems.append(f"over {args.budget_ms:g} ms budget")
+        if heavy:
+            problems.append("imports " + ", ".join(heavy))
+        failed = failed or bool(problems)
+        print(f"{entry:<28}{total / 1000:>12.1f}  {'; '.join(problems) or 'ok'}")
+        if args.verbose:
+            for cumulative, module in top[:5]:
+                print(f"    {cumulative / 1000:>8.1f} ms  {module}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
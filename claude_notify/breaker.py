@@ -0,0 +1,84 @@
+"""Per-endpoint circuit breakers.
+
+Once an endpoint has failed `failure_threshold` times in a row, its breaker
+opens, and calls are refused at once instead of waiting out another 10 s
+timeout. After `reset_timeout` seconds one trial call is let through
+(half-open). If the trial succeeds the breaker closes; if it fails the
+breaker opens for another period.
+"""
+
+import threading
+import time
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=3, reset_timeout=30.0, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """True if a call may go out now; in half-open state only one trial is allowed"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and self.clock() >= self.opened_at + self.reset_timeout:
+                self.state = HALF_OPEN
+                return True
+            return False
+
+    def record(self, ok):
+        with self._lock:
+            if ok:
+                self.state = CLOSED
+                self.failures = 0
+                return
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = OPEN
+                self.opened_at = self.clock()
+
+    def retry_in(self):
+        """Seconds until the breaker lets a trial through (0 unless open)"""
+        with self._lock:
+            if self.state != OPEN:
+                return 0.0
+            return max(self.opened_at + self.reset_timeout - self.clock(), 0.0)
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name):
+    """Process-wide breaker for an endpoint name"""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name)
+        return breaker
+
+
+def guarded(name, send):
+    """Wrap send() so it returns False at once while the endpoint's breaker is open"""
+    breaker = get_breaker(name)
+
+    def call():
+        if not breaker.allow():
+            return False
+        ok = False
+        try:
+            ok = bool(send())
+        finally:
+            breaker.record(ok)
+        return ok
+    return call
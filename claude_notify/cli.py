@@ -0,0 +1,182 @@
+"""Single entry point that wraps claude and notifies through pluggable backends.
+
+    python3 -m claude_notify [--backends desktop,teams] [--idle SECONDS] [claude args...]
+    python3 -m claude_notify --list
+    python3 -m claude_notify --test
+    python3 -m claude_notify --profile[=PATH] --trace[=PATH] [...]
+
+Arguments this parser does not know are passed through to claude; put them
+after -- if they clash. Backends are imported only when a notification is
+actually sent (see claude_notify.backends), so the wrapper adds only a few
+milliseconds to claude's startup. check_importtime guards that budget.
+--profile and --trace are handled by claude_notify.profiler before parsing.
+"""
+
+import argparse
+import os
+import sys
+
+from claude_notify import backends, profiler
+
+CLAUDE_PATH = os.environ.get('CLAUDE_PATH', 'claude')
+WAITING_MESSAGE = "Claude is waiting for your input"
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog='python3 -m claude_notify', description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backends', help='comma-separated backend names (default: every configured one)')
+    parser.add_argument('--rules', default='prompt', help='detector rule set (default: prompt)')
+    parser.add_argument('--idle', type=float, default=float(os.environ.get('CLAUDE_NOTIFY_IDLE', '0')),
+                        help='seconds of quiet with a prompt on screen before notifying')
+    parser.add_argument('--claude', default=CLAUDE_PATH, help='claude executable (default: $CLAUDE_PATH or claude)')
+    parser.add_argument('--list', action='store_true', help='show backends and whether they are configured')
+    parser.add_argument('--test', action='store_true', help='send a test notification and exit')
+    args, claude_args = parser.parse_known_args(argv)
+    if claude_args[:1] == ['--']:
+        claude_args = claude_args[1:]
+    args.claude_args = claude_args
+    return args
+
+
+def deliver(names, notice, message=WAITING_MESSAGE):
+    """Send one notice on every backend at once; returns the FanoutResult"""
+    from claude_notify.breaker import guarded
+    from claude_notify.fanout import ALL, Channel, fan_out
+    from claude_notify.ratecontrol import describe
+
+    message = describe(notice.count, message)
+
+    def sender(name):
+        return lambda: backends.load(name).send(message, notice.context, notice.options)
+    return fan_out([Channel(name, guarded(name, sender(name)), timeout=10) for name in names], policy=ALL,
+                   detected=notice.detected)
+
+
+def list_backends():
+    active = set(backends.enabled())
+    for name, backend in backends.BACKENDS.items():
+        state = 'enabled' if name in active else 'configured' if backends.configured(name) else 'not configured'
+        needs = ', '.join(backend.env) or '-'
+        print(f"{name:<10}{state:<16}{needs}")
+
+
+def send_test(names):
+    from claude_notify.ratecontrol import Notice
+    result = deliver(names, Notice('test', 'This is a test notification', [], 1, ['test']))
+    for name in names:
+        print(f"{name:<10}{result.results.get(name)}")
+    return 0 if result.winner else 1
+
+
+def run(args, names):
+    import pty
+    import signal
+    import subprocess
+    import termios
+    import tty
+
+    from claude_notify.detector import get_detector
+    from claude_notify.dispatch import get_dispatcher
+    from claude_notify.lines import LineRing
+    from claude_notify.options import OptionTracker
+    from claude_notify import metrics, recorder
+    from claude_notify.ratecontrol import RateController
+    from claude_notify.relay import PtyRelay, sync_window_size
+    from claude_notify.screen import PromptWatcher
+    from claude_notify.timers import IdleTimer
+
+    metrics.dump_at_exit()
+    old_tty = termios.tcgetattr(sys.stdin)
+    master_fd, slave_fd = pty.openpty()
+    rows, cols = sync_window_size(sys.stdin.fileno(), master_fd) or (24, 80)
+    process = subprocess.Popen([args.claude] + args.claude_args,
+                               stdin=slave_fd, stdout=slave_fd, stderr=slave_fd, close_fds=True)
+    os.close(slave_fd)
+    dispatcher = get_dispatcher()
+    output_lines = LineRing()
+    menu = OptionTracker()
+    watcher = PromptWatcher(get_detector(args.rules), rows, cols)
+    transcript = recorder.from_env(rows=rows, cols=cols, command=' '.join([args.claude] + args.claude_args))
+    new_size = None
+    waiting = False
+
+    def on_winch(signum, frame):
+        nonlocal new_size
+        new_size = sync_window_size(sys.stdin.fileno(), master_fd)
+
+    def on_input(data):
+        nonlocal waiting
+        waiting = False
+        dispatcher.cancel('waiting')
+        rate.reset()
+
+    def notify_waiting(prompt):
+        nonlocal waiting
+        if not waiting:
+            waiting = True
+            if transcript:
+                transcript.marker(prompt)
+            rate.offer(prompt, '\n'.join(output_lines.tail(20)), menu.texts)
+
+    def send_notice(notice):
+        if 'desktop' in names:
+            # Through the relay's queue: a direct write to the non-blocking stdout can fail
+            relay.write_local(b'\a')
+        dispatcher.submit('notify', deliver, names, notice, key='waiting')
+
+    def on_output(data):
+        nonlocal new_size
+        with profiler.span('lines'):
+            menu.feed(output_lines.feed(data))
+        if transcript:
+            transcript.output(data)
+        if new_size:
+            watcher.screen.resize(*new_size)
+            if transcript:
+                transcript.resize(*new_size)
+            new_size = None
+        prompt = watcher.feed(data)
+        if idle:
+            idle.touch(watcher.current)
+        elif prompt:
+            notify_waiting(prompt)
+
+    signal.signal(signal.SIGWINCH, on_winch)
+    try:
+        tty.setraw(sys.stdin.fileno())
+        relay = PtyRelay(master_fd, sys.stdin.fileno(), sys.stdout.fileno(),
+                         on_output=on_output, on_input=on_input)
+        idle = IdleTimer(relay.timers, args.idle, notify_waiting) if args.idle > 0 else None
+        rate = RateController('notify', send_notice, timers=relay.timers)
+        relay.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        termios.tcsetattr(sys.stdin, termios.TCSADRAIN, old_tty)
+        try:
+            os.close(master_fd)
+        except OSError:
+            pass
+        if process.poll() is None:
+            process.terminate()
+        if transcript:
+            transcript.close()
+    return process.wait()
+
+
+def main(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    profiler.from_argv(argv)
+    args = parse_args(argv)
+    if args.list:
+        list_backends()
+        return 0
+    names = backends.enabled(args.backends)
+    if not names:
+        print("No notification backend configured; see --list", file=sys.stderr)
+        return 2
+    if args.test:
+        return send_test(names)
+    return run(args, names)
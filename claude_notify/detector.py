@@ -0,0 +1,204 @@
+r"""Compiled waiting-for-input detection shared by every wrapper.
+
+Each wrapper used to keep its own list of checks, and some ran two large
+alternation regexes per line. A WaitingDetector folds a whole rule set into
+one compiled alternation and runs one search per line:
+
+    (?P<neg>\A(?:anchored negatives)|floating negatives)
+        |\A(?:anchored positives)|floating positives
+
+Anchored rules sit behind a single \A test, so at every position after the
+first they cost one opcode instead of one attempt per rule. At any position
+the negative branches are tried first. A positive hit at position i therefore
+already rules out negatives starting at or before i, and only a hit pays for
+a scan of the rest of the line for a later negative. The name of the rule
+that fired is resolved only on hits.
+
+Rule sets are plain data. RULE_SETS holds the behaviour each script had
+before, and CLAUDE_NOTIFY_RULES can point at a JSON file that replaces them:
+
+    {"positive": [{"name": "prompt", "pattern": "^>$"},
+                  {"name": "continue", "pattern": "continue\\?", "ignorecase": true}, ...],
+     "negative": [{"name": "code", "pattern": "```"}]}
+
+Rules are case-sensitive unless they set ignorecase, in a file and in Rule() alike.
+"""
+
+import json
+import os
+import re
+from collections import namedtuple
+
+from claude_notify import metrics
+
+Rule = namedtuple('Rule', 'name pattern negative ignorecase')
+# Case-sensitive by default; load_rules() uses the same default
+Rule.__new__.__defaults__ = (False, False)
+
+RULE_SETS = {
+    # ClaudeMonitor in claude-notify.py
+    'monitor': [
+        Rule('code_block', r'```', negative=True),
+        Rule('comment', r'^\s*#', negative=True),
+        Rule('line_comment', r'^\s*//', negative=True),
+        Rule('log_message', r'Error:|Warning:|Info:', negative=True, ignorecase=True),
+        Rule('simple_prompt', r'^>+\s*$'),
+        Rule('fancy_prompt', r'^❯+\s*$'),
+        Rule('shell_prompt', r'^\$\s*$'),
+        Rule('conversation', r'^(?:Human|User|You):\s*$', ignorecase=True),
+        Rule('explicit_wait', r'waiting for (?:input|response|you)', ignorecase=True),
+        Rule('input_request', r'(?:Type|Enter|Input|Provide).*:?\s*$', ignorecase=True),
+        Rule('empty_bracket', r'^\s*\[\s*\]\s*$'),
+        Rule('continue', r'continue\?', ignorecase=True),
+        Rule('short_prompt', r'^(?=.{1,3}$).*[>$:?❯]'),
+    ],
+    # Last-line checks of claude-notify-simple.py
+    'prompt': [
+        Rule('bare_prompt', r'^[>❯$]$'),
+        Rule('trailing_colon_or_question', r'[:?]$'),
+        Rule('waiting', r'waiting', ignorecase=True),
+        Rule('enter_colon', r'enter.*:|:.*enter', ignorecase=True),
+        Rule('short_prompt', r'^(?=.{1,4}$).*[>$:?❯]'),
+    ],
+    # claude-remote-notify.py
+    'remote': [
+        Rule('bare_prompt', r'^[>❯$]$'),
+        Rule('short_colon', r'^(?=.{1,49}$).*:$'),
+        Rule('waiting', r'waiting', ignorecase=True),
+        Rule('conversation', r'^(?:Human|You|User):$'),
+    ],
+    # claude-teams-simple.py, claude-pushover-notify.py, claude-secure-notify.py
+    'strict': [
+        Rule('bare_prompt', r'^(?:[>❯$]|Human:|You:)$'),
+        Rule('short_colon', r'^(?=.{1,19}$).*:$'),
+    ],
+    # claude-teams-notify.py
+    'teams': [
+        Rule('bare_prompt', r'^(?:[>❯$]|Human:|User:|You:)$'),
+        Rule('human_colon', r'^(?=.{1,19}$).*Human.*:$'),
+        Rule('waiting', r'^(?=.{1,19}$).*waiting', ignorecase=True),
+        Rule('repeated_prompt', r'^(?=.{1,19}$)(?:>+|❯+|\$)\s*$'),
+    ],
+    # claude-notify-visual.py
+    'visual': [
+        Rule('short_prompt', r'^(?=.{1,9}$).*(?:[>❯$]|Human:|You:)'),
+    ],
+}
+
+
+def _is_anchored(pattern):
+    """True if pattern starts with ^ and has no top-level alternation"""
+    if not pattern.startswith('^'):
+        return False
+    depth = 0
+    in_class = escaped = False
+    for c in pattern:
+        if escaped:
+            escaped = False
+        elif c == '\\':
+            escaped = True
+        elif in_class:
+            in_class = c != ']'
+        elif c == '[':
+            in_class = True
+        elif c == '(':
+            depth += 1
+        elif c == ')':
+            depth -= 1
+        elif c == '|' and depth == 0:
+            return False
+    return True
+
+
+def _alternation(rules):
+    anchored = []
+    floating = []
+    for rule in rules:
+        flags = 'i' if rule.ignorecase else ''
+        if _is_anchored(rule.pattern):
+            anchored.append(f'(?{flags}:{rule.pattern[1:]})')
+        else:
+            floating.append(f'(?{flags}:{rule.pattern})')
+    parts = []
+    if anchored:
+        parts.append(r'\A(?:' + '|'.join(anchored) + ')')
+    parts.extend(floating)
+    return '|'.join(parts)
+
+
+class WaitingDetector:
+    """Classify stripped output lines with a single compiled pattern"""
+
+    def __init__(self, rules, name='custom'):
+        self.name = name
+        self.rules = list(rules)
+        negative = [r for r in self.rules if r.negative]
+        self.positive = [r for r in self.rules if not r.negative]
+        parts = []
+        if negative:
+            parts.append(f'(?P<neg>{_alternation(negative)})')
+        if self.positive:
+            parts.append(_alternation(self.positive))
+        self._regex = re.compile('|'.join(parts) or '(?!)', re.DOTALL)
+        self._negative = re.compile(_alternation(negative), re.DOTALL) if negative else None
+        self._per_rule = [
+            (r.name, re.compile(r.pattern, re.DOTALL | (re.IGNORECASE if r.ignorecase else 0)))
+            for r in self.positive
+        ]
+        self.evaluations = 0
+        self.hits = 0
+
+    def _hit(self, stripped):
+        self.evaluations += 1
+        m = self._regex.search(stripped)
+        if m is None or m.lastgroup == 'neg':
+            return False
+        if self._negative is not None and self._negative.search(stripped, m.start() + 1):
+            return False
+        self.hits += 1
+        return True
+
+    def is_waiting(self, line):
+        stripped = line.strip()
+        return bool(stripped) and self._hit(stripped)
+
+    def match(self, line):
+        """Return the name of the positive rule that fired, or None"""
+        stripped = line.strip()
+        if not stripped or not self._hit(stripped):
+            return None
+        for name, regex in self._per_rule:
+            if regex.search(stripped):
+                return name
+        return self.positive[0].name
+
+
+def load_rules(path):
+    """Read a rule set from a JSON file with "positive" and "negative" lists"""
+    with open(path) as f:
+        spec = json.load(f)
+    rules = []
+    for kind in ('negative', 'positive'):
+        for i, item in enumerate(spec.get(kind, [])):
+            if isinstance(item, str):
+                item = {'pattern': item}
+            rules.append(Rule(
+                item.get('name', f'{kind}{i}'),
+                item['pattern'],
+                negative=(kind == 'negative'),
+                ignorecase=item.get('ignorecase', False),
+            ))
+    return rules
+
+
+def get_detector(name='monitor'):
+    """Detector for a named rule set, unless CLAUDE_NOTIFY_RULES overrides it"""
+    path = os.environ.get('CLAUDE_NOTIFY_RULES')
+    if path:
+        detector = WaitingDetector(load_rules(path), name=os.path.basename(path))
+    else:
+        detector = WaitingDetector(RULE_SETS[name], name=name)
+    # Its own counters are read at scrape time; nothing is added per line
+    metrics.DETECTOR_EVALUATIONS.set_function(lambda: detector.evaluations, detector.name)
+    metrics.DETECTOR_HITS.set_function(lambda: detector.hits, detector.name)
+    return detector
@@ -0,0 +1,214 @@
+"""Long-lived notification dispatcher with a bounded queue and fixed workers.
+
+The wrappers used to start a new thread for every notification, and the
+simple wrapper started a whole python3 interpreter. Dispatcher keeps a fixed
+pool of worker threads behind a bounded queue. Each channel (desktop, teams,
+sms, ...) can have its own concurrency limit, so a slow Teams webhook cannot
+occupy every worker. A job submitted with a key supersedes any job with the
+same key that has not started yet, and cancel(key) drops those jobs
+explicitly, for example when the user starts typing.
+"""
+
+import queue
+import threading
+import time
+from collections import defaultdict, deque
+
+from claude_notify import metrics
+from claude_notify.profiler import span
+
+DEFAULT_WORKERS = 4
+DEFAULT_QUEUE_SIZE = 256
+# Recent samples kept per channel for latency percentiles
+LATENCY_SAMPLES = 512
+
+
+class Job:
+    __slots__ = ('channel', 'fn', 'args', 'kwargs', 'key', 'enqueued', 'started',
+                 'finished', 'cancelled', 'result', 'error', 'done')
+
+    def __init__(self, channel, fn, args, kwargs, key):
+        self.channel = channel
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.key = key
+        self.enqueued = time.monotonic()
+        self.started = None
+        self.finished = None
+        self.cancelled = False
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+    def wait(self, timeout=None):
+        """Block until the job ran or was dropped; return its result"""
+        self.done.wait(timeout)
+        return self.result
+
+
+def _percentile(samples, pct):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class Dispatcher:
+    def __init__(self, workers=DEFAULT_WORKERS, max_queue=DEFAULT_QUEUE_SIZE, channel_limits=None):
+        self.channel_limits = dict(channel_limits or {})
+        self._queue = queue.Queue(max_queue)
+        self._lock = threading.Lock()
+        self._pending_by_key = {}
+        self._active = defaultdict(int)
+        self._deferred = defaultdict(deque)
+        self._wait_times = defaultdict(lambda: deque(maxlen=LATENCY_SAMPLES))
+        self._run_times = defaultdict(lambda: deque(maxlen=LATENCY_SAMPLES))
+        self.counters = defaultdict(int)
+        self._workers = [
+            threading.Thread(target=self._work, name=f'dispatch-{i}', daemon=True)
+            for i in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, channel, fn, *args, key=None, **kwargs):
+        """Queue fn(*args, **kwargs) on channel; returns the Job, or None if the queue is full"""
+        job = Job(channel, fn, args, kwargs, key)
+        with self._lock:
+            if key is not None:
+                stale = self._pending_by_key.get(key)
+                if stale is not None and stale.started is None:
+                    self._drop(stale)
+                self._pending_by_key[key] = job
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                self.counters['rejected'] += 1
+                if key is not None and self._pending_by_key.get(key) is job:
+                    del self._pending_by_key[key]
+            job.done.set()
+            return None
+        with self._lock:
+            self.counters['submitted'] += 1
+        return job
+
+    def cancel(self, key):
+        """Drop the queued job for key if it has not started; return True if one was dropped"""
+        with self._lock:
+            job = self._pending_by_key.pop(key, None)
+            if job is None or job.started is not None:
+                return False
+            self._drop(job)
+            return True
+
+    def _drop(self, job):
+        # Caller holds self._lock; the worker discards the job when it dequeues it
+        job.cancelled = True
+        self.counters['cancelled'] += 1
+        job.done.set()
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            with self._lock:
+                job = self._claim(job)
+            while job is not None:
+                self._run(job)
+                with self._lock:
+                    job = self._finish(job)
+
+    def _claim(self, job):
+        # Caller holds self._lock
+        if job.cancelled:
+            return None
+        limit = self.channel_limits.get(job.channel)
+        if limit is not None and self._active[job.channel] >= limit:
+            # Park it; the worker that frees the channel runs it next
+            self._deferred[job.channel].append(job)
+            return None
+        self._active[job.channel] += 1
+        job.started = time.monotonic()
+        if job.key is not None and self._pending_by_key.get(job.key) is job:
+            del self._pending_by_key[job.key]
+        return job
+
+    def _run(self, job):
+        try:
+            with span('job', channel=job.channel):
+                job.result = job.fn(*job.args, **job.kwargs)
+        except Exception as e:
+            job.error = e
+        job.finished = time.monotonic()
+        job.done.set()
+
+    def _finish(self, job):
+        # Caller holds self._lock; returns the next parked job for the channel, claimed
+        self._active[job.channel] -= 1
+        self.counters['failed' if job.error else 'completed'] += 1
+        self._wait_times[job.channel].append(job.started - job.enqueued)
+        metrics.DISPATCH_WAIT.labels(job.channel).observe(job.started - job.enqueued)
+        self._run_times[job.channel].append(job.finished - job.started)
+        parked = self._deferred[job.channel]
+        while parked:
+            nxt = self._claim(parked.popleft())
+            if nxt is not None:
+                return nxt
+        return None
+
+    def queue_depth(self):
+        with self._lock:
+            parked = sum(len(d) for d in self._deferred.values())
+        return self._queue.qsize() + parked
+
+    def stats(self):
+        """Queue depth, counters and per-channel dispatch latency in milliseconds"""
+        with self._lock:
+            channels = {}
+            for channel in set(self._wait_times) | set(self._run_times):
+                waits = list(self._wait_times[channel])
+                runs = list(self._run_times[channel])
+                channels[channel] = {
+                    'active': self._active[channel],
+                    'queue_wait_p50_ms': _ms(_percentile(waits, 50)),
+                    'queue_wait_p99_ms': _ms(_percentile(waits, 99)),
+                    'send_p50_ms': _ms(_percentile(runs, 50)),
+                    'send_p99_ms': _ms(_percentile(runs, 99)),
+                }
+            counters = dict(self.counters)
+        return {'queue_depth': self.queue_depth(), 'counters': counters, 'channels': channels}
+
+    def shutdown(self, timeout=5.0):
+        """Let queued jobs finish (up to timeout) and stop the workers"""
+        deadline = time.monotonic() + timeout
+        for _ in self._workers:
+            try:
+                self._queue.put(None, timeout=max(deadline - time.monotonic(), 0))
+            except queue.Full:
+                break
+        for worker in self._workers:
+            worker.join(max(deadline - time.monotonic(), 0))
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 2)
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def get_dispatcher():
+    """Process-wide dispatcher shared by every notifier in a wrapper"""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = Dispatcher(channel_limits={'desktop': 1, 'sms': 1, 'teams': 2})
+            dispatcher = _default
+            metrics.DISPATCH_QUEUE.set_function(dispatcher.queue_depth)
+            for result in ('submitted', 'rejected', 'cancelled', 'completed', 'failed'):
+                metrics.DISPATCH_JOBS.set_function(lambda result=result: dispatcher.counters[result], result)
+        return _default
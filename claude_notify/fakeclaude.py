@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""A stand-in claude that replays a session through whatever terminal it gets.
+
+Nothing exercised the wrappers without the real claude binary, so every
+change to detection or passthrough was checked by hand. Point CLAUDE_PATH
+at this file and the wrappers run it instead:
+
+    CLAUDE_PATH=$PWD/claude_notify/fakeclaude.py CLAUDE_FAKE_SPEED=4 ./claude-notify-simple.py
+
+The wrappers pass their own arguments through to claude, so settings come
+from the environment:
+
+    CLAUDE_FAKE_SCRIPT       asciicast to replay: a .cast file, or recorder
+                             segments (.cast.gz, .cast.zst), ':' separated.
+                             Default: a synthetic session (see synthetic())
+    CLAUDE_FAKE_SPEED        time multiplier; 2 plays twice as fast, 0 without pauses (default 1)
+    CLAUDE_FAKE_IDLE_LIMIT   longest pause taken from a recording, in seconds (default 2)
+    CLAUDE_FAKE_SEED         seed of the synthetic session (default 1)
+    CLAUDE_FAKE_TURNS        turns in the synthetic session (default 10)
+    CLAUDE_FAKE_BURST        bytes written at full speed in each turn (default 65536)
+    CLAUDE_FAKE_ANSWER       seconds to wait at a prompt before going on alone (default: forever)
+    CLAUDE_FAKE_LOG          file to append the timeline to, as JSON lines
+
+The synthetic session draws what claude draws: the framed input box with
+the cursor parked in it, permission dialogs, spinner redraws with erase
+sequences, streamed prose and code, and lines that look like prompts but
+are followed straight away by more output. In a recording, the "m" markers
+the recorder wrote when a wrapper saw a prompt count as prompts.
+
+At a prompt the fake waits for a byte on stdin, as claude does, with stdin
+in raw mode when it is a terminal. The log holds the ground truth that
+claude_notify.benchmarks.bench_replay measures against:
+
+    {"time": 1760870400.51, "event": "prompt", "id": 3, "kind": "input", "text": ">"}
+    {"time": 1760870400.87, "event": "answer", "id": 3}
+    {"time": 1760870401.02, "event": "burst", "id": 2, "size": 65536}
+    {"time": 1760870403.40, "event": "exit"}
+
+A burst ends with the OSC string BURST_END % id, so a reader downstream
+can tell when all of it got through. Only the standard library is used
+(plus zstandard for .zst), so the file runs without the package on the path.
+"""
+
+import gzip
+import json
+import os
+import random
+import select
+import sys
+import time
+
+BURST_END = '\x1b]1337;fake-burst-%d\x07'
+WIDTH = 72
+
+SPINNER = '·✢✳✶✻✽'
+REQUESTS = [
+    "add a --verbose flag to the CLI",
+    "why does test_parse_dates fail on CI?",
+    "refactor the cache into its own module",
+    "update the README for the new config format",
+    "fix the off-by-one in the pagination helper",
+]
+PROSE = [
+    "I'll start by looking at how the parser is wired up.",
+    "The failure comes from the timezone being dropped in `parse_dates`.",
+    "This keeps the public API unchanged, so callers don't need updating.",
+    "Let me check where the cache is invalidated before moving it.",
+    "\x1b[1mSummary of changes\x1b[0m",
+    "  - Moved `Cache` and `CacheEntry` into `app/cache.py`",
+    "  - Added tests for the expiry edge cases",
+]
+CODE = [
+    "def paginate(items, page, per_page=20):",
+    "    start = (page - 1) * per_page",
+    "    return items[start:start + per_page]",
+    "",
+    "class Cache:",
+    "    def __init__(self, ttl=300):",
+    "        self.ttl = ttl",
+    "        self._entries = {}",
+    "",
+    "    def get(self, key, default=None):",
+    "        entry = self._entries.get(key)",
+    "        if entry is None or entry.expired():",
+    "            return default",
+    "        return entry.value",
+]
+TOOL_OUTPUT = [
+    "  ⎿  Read 214 lines (ctrl+r to expand)",
+    "  ⎿  Found 7 files",
+    "  ⎿  \x1b[32m148 passed\x1b[0m, 2 skipped in 3.41s",
+    "  ⎿  Updated app/cache.py with 42 additions and 17 removals",
+]
+# Lines that end like a prompt while claude is still working
+DISTRACTORS = [
+    "Here's what I changed:",
+    "Why did it only fail on CI?",
+    "Enter the following in your shell:",
+    "  $ npm test",
+    "Waiting for the build to finish",
+    "Summary:",
+]
+COMMANDS = ["npm test", "pytest -q tests/", "git diff --stat", "rm -rf build/"]
+
+
+def _frame(rows):
+    """Rows inside a rounded box as wide as the synthetic terminal"""
+    inner = WIDTH - 4
+    lines = ['╭' + '─' * (WIDTH - 2) + '╮']
+    lines += [f"│ {row}{' ' * max(0, inner - len(row))} │" for row in rows]
+    lines.append('╰' + '─' * (WIDTH - 2) + '╯')
+    return lines
+
+
+def _input_box():
+    """The idle input box, with the cursor moved back up onto its '>' row"""
+    box = _frame(['>'])
+    return '\r\n' + '\r\n'.join(box) + '\r\n  ? for shortcuts\x1b[2A\x1b[5G', 1
+
+
+def _permission(command):
+    box = _frame(['Bash command', '', f'  {command}', '', 'Do you want to proceed?', '❯ 1. Yes',
+                  f"  2. Yes, and don't ask again for {command.split()[0]} commands",
+                  '  3. No, and tell Claude what to do differently (esc)'])
+    return '\r\n'.join(box), len(box) - 1
+
+
+def synthetic(seed=1, turns=10, burst=65536):
+    """Steps of a made-up session: (delay, 'o', text), (delay, 'p', (text, kind, label, erase)) or (delay, 'b', size)"""
+    rng = random.Random(seed)
+    steps = [(0, 'o', '\r\n'.join(_frame(['✻ Welcome to Claude Code!', '', '  cwd: /home/dev/project'])) + '\r\n')]
+    for turn in range(turns):
+        # The turn starts at the input box or, for variety, a bare line prompt
+        if turn % 3 == 2:
+            steps.append((0.05, 'p', ('\r\n> ', 'line', '>', 0)))
+        else:
+            box, up = _input_box()
+            steps.append((0.05, 'p', (box, 'input', '>', up)))
+        steps.append((0, 'o', f"> {rng.choice(REQUESTS)}\r\n\r\n"))
+        for i in range(rng.randrange(10, 30)):
+            steps.append((0.1, 'o', f"\r\x1b[2K\x1b[38;5;174m{SPINNER[i % len(SPINNER)]}\x1b[0m "
+                                    f"Thinking… ({i // 10}s · esc to interrupt)"))
+        steps.append((0.1, 'o', '\r\x1b[2K'))
+        for _ in range(rng.randrange(20, 60)):
+            roll = rng.random()
+            if roll < 0.06:
+                steps.append((rng.uniform(0.01, 0.03), 'o', rng.choice(DISTRACTORS) + '\r\n'))
+            elif roll < 0.5:
+                steps.append((rng.uniform(0.01, 0.03), 'o', f"● {rng.choice(PROSE)}\r\n"))
+            elif roll < 0.6:
+                steps.append((rng.uniform(0.05, 0.2), 'o', rng.choice(TOOL_OUTPUT) + '\r\n'))
+            else:
+                steps.append((0.005, 'o', f"\x1b[38;5;246m{rng.choice(CODE)}\x1b[0m\r\n"))
+        if rng.random() < 0.5:
+            command = rng.choice(COMMANDS)
+            steps.append((0.02, 'o', f"● Bash({command})\r\n"))
+            box, up = _permission(command)
+            steps.append((0.05, 'p', (box, 'permission', 'Do you want to proceed?', up)))
+            steps.append((0, 'o', "  ⎿  Running…\r\n"))
+        if burst:
+            steps.append((0.02, 'o', "● Write(app/cache.py)\r\n"))
+            steps.append((0, 'b', burst))
+        steps.append((0.02, 'o', f"● {rng.choice(PROSE)}\r\n"))
+    steps.append((0.05, 'o', "\r\nGoodbye!\r\n"))
+    return steps
+
+
+def _open_cast(path):
+    if path.endswith('.zst'):
+        import io
+        import zstandard
+        return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(open(path, 'rb')), encoding='utf-8')
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    return open(path, encoding='utf-8')
+
+
+def from_cast(paths, idle_limit=2.0):
+    """Steps replaying asciicast files in order; "m" markers become prompts"""
+    steps = []
+    last = None
+    for path in paths:
+        with _open_cast(path) as f:
+            header = json.loads(f.readline())
+            base = header.get('timestamp', 0)
+            for line in f:
+                if not line.strip():
+                    continue
+                when, kind, data = json.loads(line)
+                when += base
+                delay = 0 if last is None else min(max(when - last, 0), idle_limit)
+                last = when
+                if kind == 'o':
+                    steps.append((delay, 'o', data))
+                elif kind == 'm':
+                    steps.append((delay, 'p', ('', 'marker', data, 0)))
+    return steps
+
+
+class Player:
+    def __init__(self, speed=1.0, answer=None, log=None, out=1, inp=0):
+        self.speed = speed
+        self.answer = answer
+        self.out = out
+        self.inp = inp
+        self.log_fd = os.open(log, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600) if log else None
+        self.prompts = 0
+        self.bursts = 0
+
+    def log(self, event, **fields):
+        if self.log_fd is not None:
+            os.write(self.log_fd, (json.dumps(dict(time=time.time(), event=event, **fields)) + '\n').encode())
+
+    def write(self, text):
+        data = text.encode()
+        while data:
+            data = data[os.write(self.out, data):]
+
+    def drain_input(self):
+        """Drop keystrokes typed while claude was busy"""
+        while select.select([self.inp], [], [], 0)[0]:
+            if not os.read(self.inp, 4096):
+                return
+
+    def wait_answer(self):
+        ready, _, _ = select.select([self.inp], [], [], self.answer)
+        if ready:
+            os.read(self.inp, 4096)
+        return bool(ready)
+
+    def burst(self, size):
+        self.bursts += 1
+        lines = ''.join(f"\x1b[38;5;246m{i:5d}\x1b[0m  {line}\r\n" for i, line in enumerate(CODE * 8))
+        chunk = (lines * (65536 // len(lines) + 1))[:65536]
+        self.log('burst', id=self.bursts, size=size)
+        left = size
+        while left > 0:
+            self.write(chunk[:left])
+            left -= min(left, len(chunk))
+        self.write(BURST_END % self.bursts)
+
+    def play(self, steps):
+        self.log('start', pid=os.getpid())
+        deadline = time.monotonic()
+        for delay, op, payload in steps:
+            if self.speed:
+                deadline += delay / self.speed
+                pause = deadline - time.monotonic()
+                if pause > 0:
+                    time.sleep(pause)
+            if op == 'o':
+                self.write(payload)
+            elif op == 'b':
+                self.burst(payload)
+            else:
+                text, kind, label, erase = payload
+                self.drain_input()
+                self.prompts += 1
+                # Logged as the prompt starts to draw, so no notification can precede it
+                self.log('prompt', id=self.prompts, kind=kind, text=label)
+                self.write(text)
+                answered = self.wait_answer()
+                self.log('answer' if answered else 'timeout', id=self.prompts)
+                if erase:
+                    # Claude clears the box or dialog once it is answered
+                    self.write(f"\r\x1b[{erase}A\x1b[J")
+                elif text:
+                    self.write('\r\n')
+                # The answer (or the wait) restarts the clock
+                deadline = time.monotonic()
+        self.log('exit')
+
+
+def main():
+    env = os.environ.get
+    speed = float(env('CLAUDE_FAKE_SPEED', '1'))
+    answer = float(env('CLAUDE_FAKE_ANSWER')) if env('CLAUDE_FAKE_ANSWER') else None
+    if env('CLAUDE_FAKE_SCRIPT'):
+        steps = from_cast(env('CLAUDE_FAKE_SCRIPT').split(':'), float(env('CLAUDE_FAKE_IDLE_LIMIT', '2')))
+    else:
+        steps = synthetic(int(env('CLAUDE_FAKE_SEED', '1')), int(env('CLAUDE_FAKE_TURNS', '10')),
+                          int(env('CLAUDE_FAKE_BURST', '65536')))
+    player = Player(speed, answer, env('CLAUDE_FAKE_LOG'))
+    saved = None
+    if os.isatty(0):
+        import termios
+        import tty
+        saved = termios.tcgetattr(0)
+        tty.setraw(0)
+    try:
+        player.play(steps)
+    except (BrokenPipeError, KeyboardInterrupt):
+        pass
+    finally:
+        if saved is not None:
+            termios.tcsetattr(0, termios.TCSADRAIN, saved)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
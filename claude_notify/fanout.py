@@ -0,0 +1,119 @@
+"""Parallel delivery of one notification across several channels.
+
+The notifiers used to walk their channels one after another, each with a
+10 s timeout. Time-to-phone was therefore the sum of every channel ahead of
+the one that got through. fan_out() starts the primary channels together on
+a small shared thread pool. It returns as soon as the completion policy is
+met:
+
+    FIRST   the first channel that reports success
+    ALL     every started channel finished, failed or hit its timeout
+
+A channel with hedge_after set is a fallback. It starts when no channel has
+succeeded that many seconds in, or at once if every running channel has
+already failed. Each channel has its own timeout; a channel that overruns it
+counts as TIMED_OUT and its late result is ignored.
+
+    fan_out([Channel('pushover', send_pushover, timeout=10),
+             Channel('telegram', send_telegram, timeout=10, hedge_after=2)],
+            policy=FIRST)
+
+Given detected, the wall-clock time of the prompt, each channel records
+detection-to-send when it starts; every channel records its send time and
+outcome (see claude_notify.metrics).
+"""
+
+import queue
+import threading
+import time
+from collections import namedtuple
+
+from claude_notify import metrics
+from claude_notify.profiler import span
+
+FIRST = 'first'
+ALL = 'all'
+TIMED_OUT = 'timeout'
+
+POOL_SIZE = 8
+
+Channel = namedtuple('Channel', 'name send timeout hedge_after')
+Channel.__new__.__defaults__ = (10.0, None)
+
+# winner: first channel that succeeded or None; results: name -> True, False or TIMED_OUT
+FanoutResult = namedtuple('FanoutResult', 'winner results elapsed')
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _executor():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            from concurrent.futures import ThreadPoolExecutor
+            _pool = ThreadPoolExecutor(max_workers=POOL_SIZE, thread_name_prefix='fanout')
+        return _pool
+
+
+def _call(channel, done):
+    start = time.monotonic()
+    try:
+        with span('send', channel=channel.name):
+            ok = bool(channel.send())
+    except Exception:
+        ok = False
+    metrics.SEND.labels(channel.name.lower(), 'ok' if ok else 'failed').observe(time.monotonic() - start)
+    done.put((channel.name, ok))
+
+
+def fan_out(channels, policy=ALL, clock=time.monotonic, detected=None):
+    """Send on every channel concurrently and return a FanoutResult"""
+    start = clock()
+    done = queue.Queue()
+    primaries = [c for c in channels if c.hedge_after is None]
+    fallbacks = sorted((c for c in channels if c.hedge_after is not None), key=lambda c: c.hedge_after)
+    deadlines = {}
+    results = {}
+    winner = None
+
+    def launch(channel):
+        deadlines[channel.name] = clock() + channel.timeout
+        if detected is not None:
+            metrics.DETECT_TO_SEND.labels(channel.name.lower()).observe(max(time.time() - detected, 0))
+        _executor().submit(_call, channel, done)
+
+    for channel in primaries:
+        launch(channel)
+
+    while True:
+        if winner is not None and policy == FIRST:
+            break
+        now = clock()
+        # Hedge: bring in fallbacks that are due, or all of them in turn once nothing is running
+        while winner is None and fallbacks and (not deadlines or start + fallbacks[0].hedge_after <= now):
+            launch(fallbacks.pop(0))
+        if not deadlines:
+            break
+
+        wake = min(deadlines.values())
+        if winner is None and fallbacks:
+            wake = min(wake, start + fallbacks[0].hedge_after)
+        try:
+            name, ok = done.get(timeout=max(wake - now, 0))
+        except queue.Empty:
+            now = clock()
+            for name, deadline in list(deadlines.items()):
+                if deadline <= now:
+                    del deadlines[name]
+                    results[name] = TIMED_OUT
+            continue
+
+        if name not in deadlines:
+            continue  # Finished after its timeout; already reported
+        del deadlines[name]
+        results[name] = ok
+        if ok and winner is None:
+            winner = name
+
+    return FanoutResult(winner, results, clock() - start)
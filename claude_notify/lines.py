@@ -0,0 +1,92 @@
+"""Streaming line assembly for PTY output analysis.
+
+The wrappers used to append every decoded chunk to a string, split the whole
+string to find the last line, and re-slice it to bound its size. That costs
+work proportional to the buffer on every chunk. It also corrupts multibyte
+characters that straddle two reads, because each chunk was decoded on its own.
+LineRing decodes incrementally and keeps the last N complete lines in a
+fixed-capacity deque, so a chunk costs only its own length.
+"""
+
+import codecs
+import re
+from collections import deque
+
+DEFAULT_CAPACITY = 50
+# Longest unfinished line we keep; beyond this only the tail matters for prompts
+DEFAULT_MAX_LINE = 4096
+
+_ESCAPES = re.compile(r'\x1b\[[0-?]*[ -/]*[@-~]|\x1b\][^\x07\x1b]*(?:\x07|\x1b\\)?|\x1b[ -/]*[0-~]|[\x00-\x08\x0b-\x1f\x7f]')
+
+
+def strip_escapes(text):
+    """text without terminal escape sequences and control characters (newlines kept)"""
+    return _ESCAPES.sub('', text)
+
+
+def _visible(line):
+    """Approximate a bare carriage return overwriting the start of the line"""
+    line = line.rstrip('\r')
+    cr = line.rfind('\r')
+    return line[cr + 1:] if cr >= 0 else line
+
+
+class LineRing:
+    """The last `capacity` complete lines of a byte stream plus the current partial line"""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, max_line=DEFAULT_MAX_LINE, encoding='utf-8'):
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        self.lines = deque(maxlen=capacity)
+        self.partial = ''
+        self.max_line = max_line
+        self.total_lines = 0
+
+    def feed(self, data):
+        """Add a chunk of raw bytes and return the lines it completed"""
+        text = self._decoder.decode(data)
+        if not text:
+            return []
+        pieces = text.split('\n')
+        if len(pieces) == 1:
+            self.partial += text
+            if len(self.partial) > self.max_line:
+                self.partial = self.partial[-self.max_line:]
+            return []
+
+        completed = [_visible(self.partial + pieces[0])]
+        completed.extend(_visible(p) for p in pieces[1:-1])
+        self.lines.extend(completed)
+        self.total_lines += len(completed)
+        self.partial = pieces[-1][-self.max_line:]
+        return completed
+
+    def current_line(self):
+        """The line being written right now, without waiting for its newline"""
+        return _visible(self.partial)
+
+    def last_line(self):
+        """Last non-blank line, counting the partial line"""
+        current = self.current_line()
+        if current.strip():
+            return current
+        for line in reversed(self.lines):
+            if line.strip():
+                return line
+        return ''
+
+    def tail(self, n):
+        """Up to n most recent lines, ending with the partial line if it has text"""
+        current = self.current_line()
+        take = n - 1 if current else n
+        recent = list(self.lines)[-take:] if take > 0 else []
+        if current:
+            recent.append(current)
+        return recent
+
+    def text(self):
+        """Everything retained, as one string for notification context"""
+        return '\n'.join(self.tail(len(self.lines) + 1))
+
+    def clear(self):
+        self.lines.clear()
+        self.partial = ''
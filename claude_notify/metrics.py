@@ -0,0 +1,218 @@
+"""Process-wide counters, gauges and histograms, in the Prometheus text format.
+
+There was no way to tell whether a wrapper was slowing the terminal down or
+missing prompts. The signals were a few print()s and the queue_size on
+/health. The relay, detector, dispatcher and fan-out now record into the
+metrics below. The webhook servers serve them on /metrics, and
+CLAUDE_NOTIFY_METRICS=path writes them to that file when the wrapper exits:
+
+    claude_notify_relay_bytes_total{direction}         bytes copied (output, input)
+    claude_notify_relay_stall_seconds{queue}           time a write queue waited on a full descriptor
+    claude_notify_relay_queue_bytes{queue}             bytes waiting in the relay's write queues
+    claude_notify_detector_evaluations_total{detector} lines checked for a prompt
+    claude_notify_detector_hits_total{detector}        lines that were one
+    claude_notify_dispatch_queue_depth                 jobs queued or parked in the dispatcher
+    claude_notify_dispatch_jobs_total{result}          submitted, rejected, cancelled, completed, failed
+    claude_notify_dispatch_wait_seconds{channel}       submit -> a worker picks the job up
+    claude_notify_detect_to_send_seconds{channel}      prompt detected -> its backend send starts
+    claude_notify_send_seconds{channel,outcome}        backend send started -> acknowledged or failed
+    claude_notify_outbox_pending{outbox}               notifications waiting in an outbox
+
+Instruments are made once at import and bound to their labels with
+labels() outside the hot path, so recording costs one locked add. Gauges
+for queue depths are functions read at scrape time, not values pushed on
+every change. Only the standard library is used, so this costs nothing
+when no one scrapes.
+"""
+
+import atexit
+import bisect
+import os
+import threading
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# Seconds: sub-millisecond stalls up to minute-long outbox retries
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+class _Value:
+    __slots__ = ('value', 'lock')
+
+    def __init__(self):
+        self.value = 0.0
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+    def set(self, value):
+        self.value = value
+
+
+class _Buckets:
+    __slots__ = ('bounds', 'counts', 'sum', 'lock')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.bounds, value)
+        with self.lock:
+            self.counts[i] += 1
+            self.sum += value
+
+
+class Metric:
+    """One named metric; labels(*values) gives the child to record into"""
+
+    def __init__(self, kind, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.kind = kind
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._children = {}
+        self._functions = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        values = tuple(str(v) for v in values)
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} takes labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(
+                    values, _Buckets(self.buckets) if self.kind == 'histogram' else _Value())
+        return child
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def set(self, value):
+        self.labels().set(value)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def set_function(self, fn, *values):
+        """Read the value from fn() at scrape time; the last fn set for these labels wins"""
+        self._functions[tuple(str(v) for v in values)] = fn
+
+    def samples(self):
+        """(suffix, labels dict, value) for every child"""
+        out = []
+        for values, child in sorted(self._children.items()):
+            labels = dict(zip(self.labelnames, values))
+            if self.kind != 'histogram':
+                out.append(('', labels, child.value))
+                continue
+            with child.lock:
+                counts = list(child.counts)
+                total = child.sum
+            running = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                running += count
+                out.append(('_bucket', dict(labels, le=_number(bound)), running))
+            out.append(('_sum', labels, total))
+            out.append(('_count', labels, running))
+        for values, fn in sorted(self._functions.items()):
+            try:
+                value = fn()
+            except Exception:
+                continue
+            if value is not None:
+                out.append(('', dict(zip(self.labelnames, values)), value))
+        return out
+
+
+def _metric(kind, name, help, labelnames, **kwargs):
+    with _registry_lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = _registry[name] = Metric(kind, name, help, labelnames, **kwargs)
+        return metric
+
+
+def counter(name, help, labelnames=()):
+    return _metric('counter', name, help, labelnames)
+
+
+def gauge(name, help, labelnames=()):
+    return _metric('gauge', name, help, labelnames)
+
+
+def histogram(name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return _metric('histogram', name, help, labelnames, buckets=buckets)
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render():
+    """Every metric in the Prometheus text exposition format"""
+    with _registry_lock:
+        metrics = sorted(_registry.values(), key=lambda m: m.name)
+    lines = []
+    for metric in metrics:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for suffix, labels, value in metric.samples():
+            label_text = ','.join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+            lines.append(f"{metric.name}{suffix}{{{label_text}}} {_number(value)}" if label_text
+                         else f"{metric.name}{suffix} {_number(value)}")
+    return '\n'.join(lines) + '\n'
+
+
+def dump(path):
+    """Write render() to path, atomically"""
+    path = os.path.expanduser(path)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w') as f:
+        f.write(render())
+    os.replace(tmp, path)
+
+
+def dump_at_exit(path=None):
+    """Write the metrics to path (default $CLAUDE_NOTIFY_METRICS) when the process exits"""
+    path = path or os.environ.get('CLAUDE_NOTIFY_METRICS')
+    if not path:
+        return None
+
+    def write():
+        try:
+            dump(path)
+        except OSError as e:
+            print(f"⚠️  Could not write metrics to {path}: {e}")
+    atexit.register(write)
+    return path
+
+
+# The instruments shared by the wrappers; each is fed where the work happens
+RELAY_BYTES = counter('claude_notify_relay_bytes_total', 'Bytes copied between terminal and claude', ('direction',))
+RELAY_STALL = histogram('claude_notify_relay_stall_seconds',
+                        'Time a write queue waited on a descriptor that would not take more', ('queue',))
+RELAY_QUEUE = gauge('claude_notify_relay_queue_bytes', "Bytes waiting in the relay's write queues", ('queue',))
+DETECTOR_EVALUATIONS = counter('claude_notify_detector_evaluations_total', 'Lines checked for a prompt', ('detector',))
+DETECTOR_HITS = counter('claude_notify_detector_hits_total', 'Lines that were a prompt', ('detector',))
+DISPATCH_QUEUE = gauge('claude_notify_dispatch_queue_depth', 'Jobs queued or parked in the dispatcher')
+DISPATCH_JOBS = counter('claude_notify_dispatch_jobs_total', 'Dispatcher jobs by result', ('result',))
+DISPATCH_WAIT = histogram('claude_notify_dispatch_wait_seconds', 'Submit to a worker picking the job up', ('channel',))
+DETECT_TO_SEND = histogram('claude_notify_detect_to_send_seconds',
+                           'Prompt detected to its backend send starting', ('channel',))
+SEND = histogram('claude_notify_send_seconds', 'Backend send started to acknowledged or failed', ('channel', 'outcome'))
+OUTBOX_PENDING = gauge('claude_notify_outbox_pending', 'Notifications waiting in an outbox', ('outbox',))
@@ -0,0 +1,396 @@
+"""Local stand-ins for the notification services.
+
+Teams, Pushover, Telegram, Twilio, Pipedream, Azure Logic Apps and AWS API
+Gateway are not reachable from CI. Even when they are, a live endpoint
+cannot be made slow, flaky or throttled on demand. MockServices is one
+stdlib HTTP server that answers each service's API under its own path
+prefix. For each service it checks what that API checks and answers with
+its status codes and response bodies:
+
+    /teams/...                                      200 "1"              summary, text or attachments
+    /pushover/1/messages.json                       200 {"status": 1}    form: token, user, message
+    /telegram/bot<token>/sendMessage                200 {"ok": true}     chat_id, text
+    /twilio/2010-04-01/Accounts/<sid>/Messages.json 201 {"sid": "SM.."}  basic auth; Body, From, To
+    /pipedream/...                                  200 {"success": true}
+    /logicapp/workflows/<id>/triggers/<t>/paths/invoke  202 (empty)
+    /apigateway/<stage>/...                         200 {"message": "ok"}  x-api-key header
+
+Each service can be given latency (plus random jitter), an error rate
+answered with that service's 5xx, and a token-bucket rate limit answered
+with its 429 and Retry-After. Throttling is checked first, then errors,
+then the request itself, the order a gateway in front of the real thing
+would use. Accepted requests are kept with their arrival time, so a caller
+can match them against what it sent.
+
+    with MockServices(latency=0.08, error_rate=0.01, services={'teams': {'rate': 4}}) as mocks:
+        os.environ.update(mocks.env())    # before the backends are imported
+        ...
+        print(mocks.stats())
+
+Standalone, it prints the exports that point a wrapper at it:
+
+    python3 -m claude_notify.mockservices [--port 8025] [--latency-ms 80] [--jitter-ms 40]
+                                          [--error-rate 0.02] [--rate 5] [--real-limits]
+"""
+
+import argparse
+import base64
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from collections import defaultdict, namedtuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+Behaviour = namedtuple('Behaviour', 'latency jitter error_rate rate burst')
+Behaviour.__new__.__defaults__ = (0.0, 0.0, 0.0, None, None)
+
+Request = namedtuple('Request', 'path match headers body fields')
+Delivery = namedtuple('Delivery', 'time service path body')
+
+# Approximate published per-endpoint limits: requests per second, burst
+REAL_LIMITS = {
+    'teams': (4, 4),        # incoming webhooks: about 4 requests per second
+    'telegram': (1, 20),    # one message per second to the same chat, short bursts allowed
+    'twilio': (1, 10),      # one SMS per second from a long code; excess is refused here, queued there
+}
+
+
+class TokenBucket:
+    def __init__(self, rate, burst=None, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = burst or max(1, rate)
+        self.tokens = self.capacity
+        self.clock = clock
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def take(self):
+        """0 if a request may pass now, else seconds until one may"""
+        with self._lock:
+            now = self.clock()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+
+# Each service: path pattern, check(request) -> None or (status, reason), and
+# the responses for success, a failed check, throttling and an injected error.
+# Responses are (status, body) with body a dict (JSON), str (text) or None.
+Service = namedtuple('Service', 'name pattern check ok invalid throttled error')
+
+
+def _require(fields, *names):
+    missing = [n for n in names if not fields.get(n)]
+    return (400, f"{missing[0]} is required") if missing else None
+
+
+def _request_id():
+    return str(uuid.uuid4())
+
+
+def _teams_check(req):
+    if not any(req.fields.get(k) for k in ('summary', 'text', 'attachments')):
+        return 400, 'Summary or Text is required.'
+    return None
+
+
+def _pushover_check(req):
+    problem = _require(req.fields, 'token', 'user', 'message')
+    if problem is None and len(req.fields['message']) > 1024:
+        problem = 400, 'message cannot be longer than 1024 characters'
+    return problem
+
+
+def _telegram_check(req):
+    problem = _require(req.fields, 'chat_id', 'text')
+    if problem is None and len(str(req.fields['text'])) > 4096:
+        problem = 400, 'message is too long'
+    return problem
+
+
+def _telegram_ok(req):
+    return 200, {'ok': True, 'result': {
+        'message_id': random.randrange(1, 2**31), 'date': int(time.time()),
+        'chat': {'id': req.fields.get('chat_id')}, 'text': req.fields.get('text')}}
+
+
+def _twilio_check(req):
+    auth = req.headers.get('Authorization', '')
+    try:
+        user = base64.b64decode(auth[len('Basic '):]).decode().split(':', 1)[0] if auth.startswith('Basic ') else ''
+    except ValueError:
+        user = ''
+    if user != req.match.group('sid'):
+        return 401, 'Authenticate'
+    problem = _require(req.fields, 'To', 'From', 'Body')
+    if problem is None and len(req.fields['Body']) > 1600:
+        problem = 400, 'The concatenated message body exceeds the 1600 character limit'
+    return problem
+
+
+def _twilio_ok(req):
+    return 201, {'sid': 'SM' + uuid.uuid4().hex, 'account_sid': req.match.group('sid'), 'status': 'queued',
+                 'to': req.fields['To'], 'from': req.fields['From'], 'body': req.fields['Body']}
+
+
+def _twilio_error(status, message):
+    codes = {401: 20003, 404: 20404, 429: 20429, 500: 20500}
+    return status, {'code': codes.get(status, 21602), 'message': message, 'status': status}
+
+
+def _json_object(req):
+    return None if req.fields else (400, 'a JSON object body is required')
+
+
+def _api_key(req):
+    return None if req.headers.get('x-api-key') else (403, 'Forbidden')
+
+
+def _azure_error(status, code, message):
+    return status, {'error': {'code': code, 'message': message}}
+
+
+SERVICES = [
+    Service('teams', r'/teams/.+', _teams_check,
+            lambda req: (200, '1'),
+            lambda status, reason: (status, reason),
+            lambda retry: (429, 'Microsoft Teams endpoint returned HTTP error 429'),
+            lambda: (502, 'Webhook message delivery failed with error: Microsoft Teams endpoint returned HTTP error 502')),
+    Service('pushover', r'/pushover/1/messages\.json', _pushover_check,
+            lambda req: (200, {'status': 1, 'request': _request_id()}),
+            lambda status, reason: (status, {'errors': [reason], 'status': 0, 'request': _request_id()}),
+            lambda retry: (429, {'errors': ['too many requests'], 'status': 0, 'request': _request_id()}),
+            lambda: (500, {'errors': ['internal error'], 'status': 0, 'request': _request_id()})),
+    Service('telegram', r'/telegram/bot(?P<token>[^/]+)/sendMessage', _telegram_check, _telegram_ok,
+            lambda status, reason: (status, {'ok': False, 'error_code': status, 'description': f'Bad Request: {reason}'}),
+            lambda retry: (429, {'ok': False, 'error_code': 429, 'description': f'Too Many Requests: retry after {retry}',
+                                 'parameters': {'retry_after': retry}}),
+            lambda: (502, {'ok': False, 'error_code': 502, 'description': 'Bad Gateway'})),
+    Service('twilio', r'/twilio/2010-04-01/Accounts/(?P<sid>[^/]+)/Messages\.json', _twilio_check, _twilio_ok,
+            _twilio_error,
+            lambda retry: _twilio_error(429, 'Too Many Requests'),
+            lambda: _twilio_error(500, 'Internal Server Error')),
+    Service('pipedream', r'/pipedream(/.*)?', _json_object,
+            lambda req: (200, {'success': True}),
+            lambda status, reason: (status, {'success': False, 'error': reason}),
+            lambda retry: (429, 'Too Many Requests'),
+            lambda: (500, {'success': False, 'error': 'Internal Server Error'})),
+    Service('logicapp', r'/logicapp/workflows/[^/]+/triggers/[^/]+/paths/invoke', _json_object,
+            lambda req: (202, None),
+            lambda status, reason: _azure_error(status, 'InvalidRequestContent', reason),
+            lambda retry: _azure_error(429, 'WorkflowRequestsThrottled', 'The workflow trigger was throttled.'),
+            lambda: _azure_error(502, 'BadGateway', 'The workflow is temporarily unavailable.')),
+    Service('apigateway', r'/apigateway/[^/]+/.+', _api_key,
+            lambda req: (200, {'message': 'ok'}),
+            lambda status, reason: (status, {'message': reason}),
+            lambda retry: (429, {'message': 'Too Many Requests'}),
+            lambda: (502, {'message': 'Internal server error'})),
+]
+_ROUTES = [(re.compile(s.pattern + '$'), s) for s in SERVICES]
+
+
+def _fields(content_type, body):
+    if not body:
+        return {}
+    if 'json' in content_type:
+        try:
+            value = json.loads(body)
+        except ValueError:
+            return None
+        return value if isinstance(value, dict) else None
+    if 'x-www-form-urlencoded' in content_type:
+        return dict(parse_qsl(body.decode('utf-8', 'replace')))
+    return {}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    mocks = None
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        path = urlsplit(self.path).path
+        for pattern, service in _ROUTES:
+            match = pattern.match(path)
+            if match:
+                break
+        else:
+            return self._respond(404, {'error': 'no such endpoint'})
+        request = Request(path, match, self.headers, body, _fields(self.headers.get('Content-Type', ''), body))
+        status, payload, retry = self.mocks._handle(service, request)
+        self._respond(status, payload, retry)
+
+    def _respond(self, status, payload, retry=None):
+        if payload is None:
+            data, content_type = b'', 'text/plain'
+        elif isinstance(payload, str):
+            data, content_type = payload.encode(), 'text/plain; charset=utf-8'
+        else:
+            data, content_type = json.dumps(payload).encode(), 'application/json'
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        if retry:
+            self.send_header('Retry-After', str(retry))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, fmt, *args):
+        if self.mocks.verbose:
+            super().log_message(fmt, *args)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class MockServices:
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, jitter=0.0, error_rate=0.0,
+                 rate=None, burst=None, services=None, seed=None, verbose=False):
+        default = Behaviour(latency, jitter, error_rate, rate, burst)
+        self.behaviour = {s.name: default._replace(**(services or {}).get(s.name, {})) for s in SERVICES}
+        self.buckets = {name: TokenBucket(b.rate, b.burst) for name, b in self.behaviour.items() if b.rate}
+        self.host = host
+        self.port = port
+        self.verbose = verbose
+        self.rng = random.Random(seed)
+        self.counts = defaultdict(lambda: defaultdict(int))
+        self.accepted = []
+        self._lock = threading.Lock()
+        self._server = None
+
+    def start(self):
+        handler = type('Handler', (_Handler,), {'mocks': self})
+        self._server = _Server((self.host, self.port), handler)
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, name='mockservices', daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _handle(self, service, request):
+        """(status, body, retry-after) for one request, after the configured delay"""
+        behaviour = self.behaviour[service.name]
+        delay = behaviour.latency + (self.rng.uniform(0, behaviour.jitter) if behaviour.jitter else 0)
+        bucket = self.buckets.get(service.name)
+        wait = bucket.take() if bucket else 0
+        retry = None
+        if wait:
+            outcome, retry = 'throttled', max(1, math.ceil(wait))
+            status, payload = service.throttled(retry)
+        elif behaviour.error_rate and self.rng.random() < behaviour.error_rate:
+            outcome = 'failed'
+            status, payload = service.error()
+        else:
+            problem = service.check(request) if request.fields is not None else (400, 'a JSON object body is required')
+            if problem:
+                outcome = 'invalid'
+                status, payload = service.invalid(*problem)
+            else:
+                outcome = 'accepted'
+                status, payload = service.ok(request)
+        if delay:
+            time.sleep(delay)
+        with self._lock:
+            self.counts[service.name][outcome] += 1
+            if outcome == 'accepted':
+                self.accepted.append(Delivery(time.time(), service.name, request.path, request.body))
+        return status, payload, retry
+
+    def base_url(self):
+        return f'http://{self.host}:{self.port}'
+
+    def env(self):
+        """Environment that points every backend and wrapper at these mocks"""
+        base = self.base_url()
+        return {
+            'TEAMS_WEBHOOK_URL': f'{base}/teams/webhookb2/mock',
+            'PUSHOVER_API_BASE': f'{base}/pushover',
+            'PUSHOVER_USER_KEY': 'mock-user',
+            'PUSHOVER_APP_TOKEN': 'mock-token',
+            'TELEGRAM_API_BASE': f'{base}/telegram',
+            'TELEGRAM_BOT_TOKEN': 'mock-bot',
+            'TELEGRAM_CHAT_ID': '42',
+            'TWILIO_API_BASE': f'{base}/twilio',
+            'TWILIO_ACCOUNT_SID': 'ACmock',
+            'TWILIO_AUTH_TOKEN': 'mock-token',
+            'TWILIO_FROM_NUMBER': '+15550000001',
+            'TWILIO_TO_NUMBER': '+15550000002',
+            'CLAUDE_NOTIFY_WEBHOOK_URL': f'{base}/pipedream/mock',
+            'PIPEDREAM_WEBHOOK_URL': f'{base}/pipedream/mock',
+            'AZURE_LOGIC_APP_URL': f'{base}/logicapp/workflows/mock/triggers/manual/paths/invoke?api-version=2016-10-01',
+            'AWS_API_GATEWAY_URL': f'{base}/apigateway/prod/notify',
+            'AWS_API_KEY': 'mock-key',
+        }
+
+    def deliveries(self, service=None):
+        """Accepted requests so far, oldest first"""
+        with self._lock:
+            return [d for d in self.accepted if service is None or d.service == service]
+
+    def stats(self):
+        """service -> {'accepted': n, 'throttled': n, 'failed': n, 'invalid': n}"""
+        with self._lock:
+            return {name: dict(counts) for name, counts in self.counts.items()}
+
+    def reset(self):
+        with self._lock:
+            self.counts.clear()
+            self.accepted.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8025)
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction answered with a 5xx')
+    parser.add_argument('--rate', type=float, help='requests per second per service before 429s')
+    parser.add_argument('--burst', type=int)
+    parser.add_argument('--real-limits', action='store_true', help='use REAL_LIMITS where a service has one')
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('-v', '--verbose', action='store_true', help='log every request')
+    args = parser.parse_args()
+
+    services = {}
+    if args.real_limits:
+        services = {name: {'rate': rate, 'burst': burst} for name, (rate, burst) in REAL_LIMITS.items()}
+    mocks = MockServices(args.host, args.port, args.latency_ms / 1000, args.jitter_ms / 1000, args.error_rate,
+                         args.rate, args.burst, services, args.seed, args.verbose).start()
+    for key, value in mocks.env().items():
+        print(f"export {key}='{value}'")
+    print(f"# serving on {mocks.base_url()}; Ctrl-C prints what arrived", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        mocks.stop()
+    for name, counts in sorted(mocks.stats().items()):
+        print(f"{name:<12}" + '  '.join(f"{k} {v}" for k, v in sorted(counts.items())))
+
+
+if __name__ == '__main__':
+    main()
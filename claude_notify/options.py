@@ -0,0 +1,160 @@
+"""The numbered menu Claude is showing, tracked as output streams past.
+
+Each wrapper found options by running a regex over the last twenty lines
+of output whenever a prompt was detected. The secure wrapper even
+imported re inside its read loop. The same lines were scanned again on
+every notification, and the scan had no idea which lines belonged
+together. A numbered list from an earlier answer, followed by a y/n
+prompt, went out as that prompt's options. Replies had the same gap: a
+'2' sent by SMS or Teams was typed into the terminal as it was, and only
+worked while Claude happened to be showing a selection menu.
+
+OptionTracker is fed each completed line once, from the list that
+LineRing.feed() already returns. It keeps the menu being shown:
+
+    Do you want to proceed?           <- question: the last text line before 1.
+    ❯ 1. Yes                          <- ❯ marks a live selection menu
+      2. Yes, and don't ask again
+      3. No, and tell Claude what to do differently
+
+An option numbered 1 starts a new menu. Each following number extends
+it. A question or a few lines of other output after the last option end
+it, as does reset() when the user answers. tracker.menu and tracker.texts are
+replaced whole when they change, so reading them is O(1) and safe from
+other threads. answer() maps a remote reply back to the menu. It sends a
+digit keystroke to a live selection menu, pastes the option's text
+for a plain numbered list, and passes anything else through unchanged.
+"""
+
+import re
+from collections import namedtuple
+
+from claude_notify.lines import strip_escapes
+
+Option = namedtuple('Option', 'number text')
+# generation changes when a different menu appears, not when one is redrawn
+Menu = namedtuple('Menu', 'question options selectable generation')
+
+MAX_OPTIONS = 10
+# Lines of other output after the last option that end the menu
+STALE_AFTER = 4
+
+_OPTION = re.compile(r'[ \t│┃]*(?P<cursor>[❯›>][ \t]*)?\[?(?P<number>\d{1,2})\]?[.)][ \t]+(?P<text>.*\S)')
+# What may come before an option's number. Most lines fail a cheap test on
+# the first character after it; only the rest pay for the regex and for
+# stripping escapes, which would cost more than all of feed_line() otherwise
+_LEAD = ' \t│┃❯›>'
+_CSI_LEAD = re.compile(r'(?:\x1b\[[0-?]*[ -/]*[@-~][ \t│┃❯›>]*)+')
+_REPLY = re.compile(r'\s*\[?(\d{1,2})\]?[.)]?\s*')
+_EDGE = ' \t\r\n│┃'
+_BORDER = ' \t│┃|╭╮╰╯┌┐└┘├┤─━═-'
+
+
+class OptionTracker:
+    def __init__(self, max_options=MAX_OPTIONS):
+        self.max_options = max_options
+        self.menu = None
+        self.texts = []
+        self._generation = 0
+        # The last menu published; a redraw of it keeps its generation
+        self._last = None
+        self._options = []
+        self._question = ''
+        self._selectable = False
+        self._after = 0
+        self._text = ''
+
+    def feed(self, lines):
+        """Track completed lines, e.g. what LineRing.feed() returned"""
+        for line in lines:
+            self.feed_line(line)
+
+    def feed_line(self, line):
+        head = line.lstrip(_LEAD)
+        if head[:1] == '\x1b':
+            lead = _CSI_LEAD.match(head)
+            if lead:
+                head = head[lead.end():]
+        if head[:1].isdigit() or head[:1] == '[':
+            if '\x1b' in line:
+                line = strip_escapes(line)
+            match = _OPTION.match(line)
+            if match:
+                number = int(match.group('number'))
+                if number == 1:
+                    self._options = []
+                    self._question = _clean(self._text)
+                    self._selectable = False
+                if number == len(self._options) + 1 <= self.max_options and self._after <= 1:
+                    self._options.append(Option(number, match.group('text').rstrip(_EDGE)))
+                    self._selectable = self._selectable or match.group('cursor') is not None
+                    self._after = 0
+                    self._publish()
+                    return
+        elif self._options and '\x1b' in line:
+            # Only an open menu cares whether this line is blank
+            line = strip_escapes(line)
+        text = line.strip(_EDGE)
+        if not text.strip(_BORDER):
+            return
+        self._text = text
+        if self._options:
+            self._after += 1
+            # A question after the options is a new prompt, not this menu's
+            if self._after > STALE_AFTER or '?' in text:
+                self._hide()
+
+    def _publish(self):
+        last = self._last
+        options = tuple(self._options)
+        if last is None or last.question != self._question or last.options[0] != options[0]:
+            self._generation += 1
+        self.menu = self._last = Menu(self._question, options, self._selectable, self._generation)
+        self.texts = [option.text for option in options]
+
+    def _hide(self):
+        # Scrolled away or a question came next, which is also how a redraw starts
+        self.menu = None
+        self.texts = []
+        self._options = []
+        self._after = 0
+
+    def reset(self):
+        """Forget the menu: it was answered, so showing it again makes a new generation"""
+        self._hide()
+        self._last = None
+
+    def resolve(self, reply):
+        """The Option a reply picks: its number, its text, or a unique prefix of it"""
+        return _resolve(self.menu, reply)
+
+    def answer(self, reply):
+        """(keys, text) to send for a remote reply: keys go to the child raw, text is pasted"""
+        menu = self.menu
+        option = _resolve(menu, reply)
+        if option is None:
+            return None, reply
+        if menu.selectable:
+            return str(option.number), None
+        return None, option.text
+
+
+def _clean(text):
+    return strip_escapes(text).strip(_EDGE) if '\x1b' in text else text
+
+
+def _resolve(menu, reply):
+    if menu is None or not reply:
+        return None
+    match = _REPLY.fullmatch(reply)
+    if match:
+        number = int(match.group(1))
+        return menu.options[number - 1] if 1 <= number <= len(menu.options) else None
+    wanted = reply.strip().lower()
+    for option in menu.options:
+        if option.text.lower() == wanted:
+            return option
+    if len(wanted) < 2:
+        return None
+    found = [option for option in menu.options if option.text.lower().startswith(wanted)]
+    return found[0] if len(found) == 1 else None
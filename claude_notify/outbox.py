@@ -0,0 +1,214 @@
+"""Disk-backed notification outbox.
+
+Before the outbox, a failed send was printed and forgotten. In the line-mode
+wrappers the send also ran on the output loop, so a dead webhook stalled
+Claude's output for up to 10 s per attempt.
+
+With the outbox, enqueue() only hands the payload to a background thread
+and never blocks. That thread appends the payload to a SQLite table and
+calls the handler registered for its endpoint. A handler that fails or
+raises is retried with jittered exponential backoff. While an endpoint's
+circuit breaker is open, its rows are deferred without being called.
+
+Rows survive a crash or restart and are replayed by the next wrapper that
+registers a handler for the same endpoint. Notifications older than max_age
+are dropped, because "Claude was waiting an hour ago" is noise. A handler
+may change its payload dict to record partial progress, such as the
+channels that already got through. The changed payload is saved with the
+retry.
+
+    outbox = Outbox({'teams': lambda p: send_teams_alert(p['message'], p['context'])})
+    outbox.enqueue('teams', {'message': ..., 'context': ...})
+    ...
+    outbox.close()
+"""
+
+import json
+import os
+import queue
+import random
+import sqlite3
+import threading
+import time
+
+from claude_notify import metrics
+from claude_notify.breaker import get_breaker
+
+DEFAULT_PATH = os.environ.get(
+    'CLAUDE_NOTIFY_OUTBOX', os.path.expanduser('~/.claude-notify/outbox.db'))
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 300.0
+MAX_ATTEMPTS = 8
+MAX_AGE = 3600.0
+# A claimed row is invisible to other wrappers sharing the file for this long
+LEASE = 60.0
+# Rows for endpoints nobody has registered yet are looked at again after this
+IDLE_POLL = 5.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    endpoint TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (endpoint, next_attempt);
+"""
+
+
+def backoff(attempts, base=BACKOFF_BASE, cap=BACKOFF_CAP):
+    """Delay before retry number `attempts`: half fixed, half random, doubling each time"""
+    delay = min(cap, base * (2 ** attempts))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class Outbox:
+    def __init__(self, handlers, path=DEFAULT_PATH, max_attempts=MAX_ATTEMPTS,
+                 max_age=MAX_AGE, max_pending=1024):
+        self.handlers = dict(handlers)
+        self.path = path
+        self.max_attempts = max_attempts
+        self.max_age = max_age
+        self.counters = {'enqueued': 0, 'delivered': 0, 'retried': 0,
+                         'dropped': 0, 'expired': 0, 'rejected': 0}
+        self._incoming = queue.Queue(max_pending)
+        for endpoint in self.handlers:
+            metrics.OUTBOX_PENDING.set_function(lambda endpoint=endpoint: self.pending(endpoint), endpoint)
+        self._closing = False
+        self._thread = threading.Thread(target=self._run, name='outbox', daemon=True)
+        self._thread.start()
+
+    def enqueue(self, endpoint, payload):
+        """Queue payload for endpoint without blocking; False if the hand-off queue is full"""
+        try:
+            self._incoming.put_nowait((endpoint, json.dumps(payload), time.time()))
+        except queue.Full:
+            self.counters['rejected'] += 1
+            return False
+        self.counters['enqueued'] += 1
+        return True
+
+    def close(self, timeout=5.0):
+        """Persist everything queued, try due rows once more, and stop"""
+        self._closing = True
+        self._incoming.put(None)
+        self._thread.join(timeout)
+
+    def _connect(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+        db = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+        # Payloads carry tokens and session context
+        os.chmod(self.path, 0o600)
+        db.execute('PRAGMA journal_mode=WAL')
+        db.execute('PRAGMA synchronous=NORMAL')
+        db.executescript(SCHEMA)
+        return db
+
+    def _run(self):
+        db = self._connect()
+        try:
+            while True:
+                wait = self._deliver_due(db)
+                if self._closing:
+                    self._drain(db, None)
+                    self._deliver_due(db)
+                    return
+                try:
+                    item = self._incoming.get(timeout=wait)
+                except queue.Empty:
+                    continue
+                self._drain(db, item)
+        finally:
+            db.close()
+
+    def _drain(self, db, first):
+        rows = [] if first is None else [first]
+        while True:
+            try:
+                item = self._incoming.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                rows.append(item)
+        if rows:
+            db.executemany(
+                'INSERT INTO outbox (endpoint, payload, created, next_attempt) VALUES (?, ?, ?, ?)',
+                [(endpoint, payload, created, created) for endpoint, payload, created in rows])
+
+    def _deliver_due(self, db):
+        """Deliver every due row for our endpoints; return seconds until the next one is due"""
+        if not self.handlers:
+            return IDLE_POLL
+        marks = ','.join('?' * len(self.handlers))
+        endpoints = list(self.handlers)
+        now = time.time()
+        due = db.execute(
+            f'SELECT id, endpoint, payload, created, attempts, next_attempt FROM outbox '
+            f'WHERE endpoint IN ({marks}) AND next_attempt <= ? ORDER BY id LIMIT 64',
+            endpoints + [now]).fetchall()
+        for row in due:
+            self._deliver(db, *row)
+            if not self._incoming.empty() and not self._closing:
+                break  # Persist fresh notifications before working through a backlog
+
+        nxt = db.execute(
+            f'SELECT MIN(next_attempt) FROM outbox WHERE endpoint IN ({marks})', endpoints).fetchone()[0]
+        if nxt is None:
+            return IDLE_POLL
+        return min(max(nxt - time.time(), 0), IDLE_POLL)
+
+    def _deliver(self, db, row_id, endpoint, payload, created, attempts, next_attempt):
+        now = time.time()
+        if now - created > self.max_age:
+            db.execute('DELETE FROM outbox WHERE id = ?', (row_id,))
+            self.counters['expired'] += 1
+            return
+
+        # Claim the row so another wrapper on the same file skips it meanwhile
+        claimed = db.execute(
+            'UPDATE outbox SET next_attempt = ? WHERE id = ? AND next_attempt = ?',
+            (now + LEASE, row_id, next_attempt)).rowcount
+        if not claimed:
+            return
+
+        breaker = get_breaker(endpoint)
+        if not breaker.allow():
+            db.execute('UPDATE outbox SET next_attempt = ? WHERE id = ?',
+                       (now + breaker.retry_in(), row_id))
+            return
+
+        error = None
+        data = json.loads(payload)
+        try:
+            ok = bool(self.handlers[endpoint](data))
+        except Exception as e:
+            ok = False
+            error = str(e)
+        breaker.record(ok)
+
+        if ok:
+            db.execute('DELETE FROM outbox WHERE id = ?', (row_id,))
+            self.counters['delivered'] += 1
+        elif attempts + 1 >= self.max_attempts:
+            db.execute('DELETE FROM outbox WHERE id = ?', (row_id,))
+            self.counters['dropped'] += 1
+        else:
+            db.execute(
+                'UPDATE outbox SET attempts = ?, next_attempt = ?, last_error = ?, payload = ? WHERE id = ?',
+                (attempts + 1, time.time() + backoff(attempts), error, json.dumps(data), row_id))
+            self.counters['retried'] += 1
+
+    def pending(self, endpoint=None):
+        """Rows waiting on disk for endpoint, or any endpoint (opens its own connection)"""
+        db = sqlite3.connect(self.path, timeout=5.0)
+        try:
+            if endpoint is None:
+                return db.execute('SELECT COUNT(*) FROM outbox').fetchone()[0]
+            return db.execute('SELECT COUNT(*) FROM outbox WHERE endpoint = ?', (endpoint,)).fetchone()[0]
+        finally:
+            db.close()
@@ -0,0 +1,64 @@
+"""Chunk-oriented passthrough for the line-mode wrappers.
+
+Iterating over a text-mode process.stdout only returns a line once its
+newline arrives. A prompt such as "> " with no newline after it reached
+neither the screen nor the detector until Claude printed something else.
+stream_lines() reads whatever bytes are available and writes them to the
+terminal at once. It yields complete lines as they finish. When the stream
+then goes quiet for `quiet` seconds with an unfinished line pending, it
+yields that partial tail once as well, so a bare prompt is detected about
+150 ms after it is drawn.
+"""
+
+import os
+import select
+import sys
+
+from claude_notify import metrics
+from claude_notify.lines import LineRing
+
+CHUNK_SIZE = 65536
+QUIET_INTERVAL = 0.15
+
+
+def _write_all(fd, data):
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+
+def stream_lines(pipe, out=None, quiet=QUIET_INTERVAL):
+    """Forward pipe's bytes to out and yield its lines.
+
+    Complete lines end with '\\n'. A partial tail that has been quiet for
+    `quiet` seconds is yielded once without one; if more text then
+    completes it, the full line is yielded again.
+    """
+    out = sys.stdout if out is None else out
+    fd = pipe.fileno()
+    out_fd = out.fileno()
+    ring = LineRing()
+    relayed = metrics.RELAY_BYTES.labels('output')
+    tail_pending = False
+    while True:
+        ready, _, _ = select.select([fd], [], [], quiet if tail_pending else None)
+        if not ready:
+            tail_pending = False
+            tail = ring.current_line()
+            if tail.strip():
+                yield tail
+            continue
+        data = os.read(fd, CHUNK_SIZE)
+        if not data:
+            break
+        # Anything the wrapper printed must land before Claude's next bytes
+        out.flush()
+        _write_all(out_fd, data)
+        relayed.inc(len(data))
+        for line in ring.feed(data):
+            yield line + '\n'
+        tail_pending = bool(ring.partial)
+
+    tail = ring.current_line()
+    if tail.strip():
+        yield tail
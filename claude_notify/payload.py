@@ -0,0 +1,192 @@
+"""Notification payloads: fitted context, one canonical serialization, sealed data.
+
+Context used to be cut with a blind tail slice like context[-500:]. The
+slice often began mid-line and spent half its budget on spinner redraws and
+box drawing, while the question Claude asked had scrolled out of it.
+fit_context() instead keeps the most informative lines that fit in a
+backend's byte budget, in their original order:
+
+    the last line (usually the prompt itself)        10
+    questions and confirmations                       8
+    numbered options                                  7
+    errors, warnings, tracebacks                      5
+    tool calls and results (● ⎿)                      3
+    anything else                                     1
+    blank lines, borders, spinners, repeats           dropped
+
+with later lines winning ties. Skipped runs are marked with a '…' line.
+
+The secure wrappers serialized each payload twice: once with
+json.dumps(sort_keys=True) to sign it and again inside requests to send
+it. A receiver could only check the signature by re-serializing what it
+parsed and hoping for the same bytes. encode() serializes once,
+canonically (sorted keys, no whitespace, UTF-8), and the HMAC is taken
+over exactly the bytes that go out as the body.
+
+seal() turns the sensitive part into canonical JSON, deflates it when that
+makes it smaller, and then Fernet-encrypts it. Fernet's base64 adds a
+third to whatever it is given, so compressing first more than pays for
+itself on terminal text. The envelope names the steps it took, for
+unseal():
+
+    {"encoding": "zlib+fernet", "data": "gAAAAAB..."}
+
+Compressing before encrypting lets the ciphertext length depend on the
+content. That matters only if an attacker can inject chosen text next to
+a secret and watch many sizes; do not seal data where they could.
+
+Only sealed payloads get the larger context budgets. A backend that sends
+the event as plain JSON keeps DEFAULT_BUDGET, whatever its name.
+"""
+
+import hashlib
+import hmac
+import json
+import re
+import zlib
+from collections import namedtuple
+
+from claude_notify.lines import strip_escapes
+
+# Context bytes per backend. Message-limited services keep their old sizes
+BUDGETS = {
+    'pushover': 300,     # the whole message is limited to 1024 characters
+    'telegram': 300,
+    'teams': 500,
+    'webhook': 500,
+    'pipedream': 500,    # signed, not sealed: a third party reads it
+}
+# Backends that seal() the event; used only when a cipher is present
+SEALED_BUDGETS = {
+    'azure': 2048,
+    'aws': 2048,
+}
+DEFAULT_BUDGET = 500
+
+Encoded = namedtuple('Encoded', 'body headers')
+
+# Box edges; the trailing one is stripped with the line's own whitespace
+_EDGES = re.compile(r'^[ \t]*[│┃] ?|[│┃][ \t]*$', re.MULTILINE)
+_BORDER = ' \t│┃|╭╮╰╯┌┐└┘├┤─━═-'
+_SPINNER = re.compile(r'\W\s*\w+…\s*\(')
+_OPTION = re.compile(r'\s*(?:[❯>]\s*)?\[?\d+\]?[.)]\s+\S')
+# Plain substring tests on the lowered line: a regex alternation under
+# IGNORECASE costs several microseconds per line
+_QUESTION_WORDS = ('proceed', 'continue', 'confirm', 'approve', 'allow', 'choose', 'select', 'y/n')
+_ERROR_WORDS = ('error', 'exception', 'traceback', 'fail', 'fatal', 'denied', 'warning')
+GAP = '…'
+
+
+def budget_for(backend, sealed=False):
+    """Context bytes for backend; the sealed budgets apply only when sealed is true"""
+    if sealed and backend in SEALED_BUDGETS:
+        return SEALED_BUDGETS[backend]
+    return BUDGETS.get(backend, DEFAULT_BUDGET)
+
+
+def _score(line):
+    lowered = line.lower()
+    if line.endswith('?') or any(word in lowered for word in _QUESTION_WORDS):
+        return 8
+    if _OPTION.match(line):
+        return 7
+    if any(word in lowered for word in _ERROR_WORDS):
+        return 5
+    if line.lstrip().startswith(('●', '⎿')):
+        return 3
+    return 1
+
+
+def _noise(line):
+    return (not line.strip(_BORDER) or 'esc to interrupt' in line
+            or '…' in line and _SPINNER.match(line) is not None)
+
+
+def _size(line):
+    return len(line.encode()) + 1
+
+
+def _tail_bytes(line, budget):
+    return line.encode()[-budget:].decode('utf-8', 'ignore') if budget > 0 else ''
+
+
+def fit_context(text, budget):
+    """The most informative lines of text within budget UTF-8 bytes, in order"""
+    text = strip_escapes(text or '')
+    if len(text.encode()) <= budget:
+        return text
+    lines = _EDGES.sub('', text).split('\n')
+    candidates = []
+    seen = set()
+    for i in range(len(lines) - 1, -1, -1):
+        line = lines[i].rstrip()
+        if line in seen or _noise(line):
+            continue
+        seen.add(line)
+        score = 10 if not candidates else _score(line)
+        candidates.append((score, i, line, _size(line)))
+    if not candidates:
+        return ''
+
+    # Highest score first, later lines first among equals
+    candidates.sort(key=lambda c: (-c[0], -c[1]))
+    if candidates[0][3] > budget:
+        return _tail_bytes(candidates[0][2], budget - 1)
+    gap = _size(GAP)
+    chosen = {}
+    used = 0
+    for score, i, line, size in candidates:
+        # Each line may bring a gap marker before it; one more may trail
+        if used + size + 2 * gap <= budget:
+            chosen[i] = line
+            used += size + gap
+
+    out = []
+    for _, i, line, _ in sorted(candidates, key=lambda c: c[1]):
+        if i in chosen:
+            out.append(line)
+        elif not out or out[-1] != GAP:
+            out.append(GAP)
+    return '\n'.join(out)
+
+
+def canonical(obj):
+    """The one serialization of obj: sorted keys, no spaces, UTF-8"""
+    return json.dumps(obj, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode()
+
+
+def sign(body, secret):
+    """Hex HMAC-SHA256 of the exact body bytes"""
+    return hmac.new(secret.encode() if isinstance(secret, str) else secret, body, hashlib.sha256).hexdigest()
+
+
+def encode(payload, secret=None, headers=None):
+    """Encoded(body, headers): payload serialized once, signed over the bytes that are sent"""
+    body = canonical(payload)
+    headers = dict(headers or {}, **{'Content-Type': 'application/json'})
+    if secret:
+        headers['X-Signature'] = sign(body, secret)
+    return Encoded(body, headers)
+
+
+def seal(data, cipher=None, level=6):
+    """{'encoding': ..., 'data': ...} for data; plain JSON without a cipher"""
+    if cipher is None:
+        return {'encoding': 'json', 'data': data}
+    raw = canonical(data)
+    encoding = 'fernet'
+    packed = zlib.compress(raw, level)
+    if len(packed) < len(raw):
+        raw, encoding = packed, 'zlib+fernet'
+    return {'encoding': encoding, 'data': cipher.encrypt(raw).decode()}
+
+
+def unseal(envelope, cipher=None):
+    """Inverse of seal(), for receivers and tests"""
+    encoding = envelope.get('encoding', 'json')
+    if encoding == 'json':
+        return envelope['data']
+    raw = cipher.decrypt(envelope['data'].encode())
+    if encoding == 'zlib+fernet':
+        raw = zlib.decompress(raw)
+    return json.loads(raw)
@@ -0,0 +1,222 @@
+"""Sampling profiler and span tracing for the wrappers.
+
+When a wrapper turns sluggish under a large diff dump, the cause could be
+regexes, decoding or a blocked write, and nothing said which. Every
+wrapper now accepts two flags. They are taken out of argv before claude
+sees it:
+
+    --profile[=PATH]   sample stacks while the wrapper uses CPU and write
+                       them as collapsed stacks, for flamegraph.pl,
+                       speedscope or inferno
+    --trace[=PATH]     record spans around each chunk the relay reads,
+                       line splitting, the prompt decision, dispatcher
+                       jobs and each channel send,
+                       as Chrome trace events for Perfetto or chrome://tracing
+
+CLAUDE_NOTIFY_PROFILE and CLAUDE_NOTIFY_TRACE (a path, or 1) do the
+same for wrappers started from scripts. Without a PATH, the files go to
+~/.claude-notify/profiles/. Both are written when the wrapper exits.
+
+The sampler uses ITIMER_PROF. The kernel sends SIGPROF for every
+`interval` of CPU the process uses, so an idle wrapper takes no samples.
+The handler records the stack of every thread, each under its thread's
+name, and leaves out threads parked in selectors, queues or locks. A line
+of output looks like:
+
+    MainThread;main (cli.py:201);run (relay.py:402);_read_child (relay.py:345);... 17
+
+Python runs signal handlers on the main thread between bytecodes. While
+the main thread sleeps in a select(), samples wait until it wakes, so
+worker threads burning CPU during a long idle spell are under-counted. At
+the default 200 samples per CPU-second a sample costs a few tens of
+microseconds, well under 1%.
+
+span(name) costs a single global lookup when tracing is off. Instrumented
+code calls it unconditionally.
+"""
+
+import atexit
+import contextlib
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+DEFAULT_INTERVAL = 0.005
+PROFILE_DIR = os.path.expanduser('~/.claude-notify/profiles')
+# Spans kept for the trace; the oldest are dropped past this
+MAX_SPANS = 200000
+# A thread whose innermost Python frame is in one of these is waiting, not working
+_IDLE_FILES = ('threading.py', 'queue.py', 'selectors.py', 'socketserver.py', 'thread.py')
+
+_NULL = contextlib.nullcontext()
+_tracer = None
+
+
+class Sampler:
+    """Count stacks on SIGPROF; write() them as collapsed stacks"""
+
+    def __init__(self, path, interval=DEFAULT_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.idle = 0
+        self._labels = {}
+        self._previous = None
+
+    def start(self):
+        """Install the handler and start the timer; call from the main thread"""
+        self._previous = signal.signal(signal.SIGPROF, self._sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        return self
+
+    def stop(self):
+        signal.setitimer(signal.ITIMER_PROF, 0, 0)
+        if self._previous is not None:
+            signal.signal(signal.SIGPROF, self._previous)
+            self._previous = None
+
+    def _label(self, frame):
+        code = frame.f_code
+        key = (code, frame.f_lineno)
+        label = self._labels.get(key)
+        if label is None:
+            label = self._labels[key] = f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+        return label
+
+    def _sample(self, signum, frame):
+        self.samples += 1
+        main = threading.main_thread().ident
+        for ident, top in sys._current_frames().items():
+            if ident == main:
+                # The handler's own frame sits on top; start from what it interrupted
+                top = frame
+            if top is None or os.path.basename(top.f_code.co_filename) in _IDLE_FILES:
+                self.idle += 1
+                continue
+            labels = []
+            while top is not None:
+                labels.append(self._label(top))
+                top = top.f_back
+            labels.append(_thread_name(ident))
+            self.stacks[';'.join(reversed(labels))] += 1
+
+    def write(self, path=None):
+        path = path or self.path
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+
+def _thread_name(ident):
+    # Not threading.enumerate(): its lock may be held by the frame this interrupted
+    thread = threading._active.get(ident)
+    return thread.name if thread is not None else f'thread-{ident}'
+
+
+class Tracer:
+    """Spans from span(); write() them as Chrome trace events"""
+
+    def __init__(self, path, max_spans=MAX_SPANS):
+        self.path = path
+        self.spans = deque(maxlen=max_spans)
+        self.origin = time.perf_counter()
+
+    def write(self, path=None):
+        path = path or self.path
+        pid = os.getpid()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        events = [{'name': name, 'ph': 'X', 'pid': pid, 'tid': tid,
+                   'ts': round((start - self.origin) * 1e6, 1), 'dur': round((end - start) * 1e6, 1),
+                   'args': args}
+                  for name, args, start, end, tid in list(self.spans)]
+        events += [{'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': name}}
+                   for tid, name in names.items()]
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+        return path
+
+
+class _Span:
+    __slots__ = ('tracer', 'name', 'args', 'start')
+
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        # deque.append is atomic, so spans from any thread need no lock
+        self.tracer.spans.append((self.name, self.args, self.start, time.perf_counter(), threading.get_ident()))
+
+
+def span(name, **args):
+    """Context manager timing a block as a trace span; a no-op unless tracing"""
+    tracer = _tracer
+    if tracer is None:
+        return _NULL
+    return _Span(tracer, name, args)
+
+
+def _default_path(suffix):
+    os.makedirs(PROFILE_DIR, mode=0o700, exist_ok=True)
+    return os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}{suffix}")
+
+
+def _take(argv, flag):
+    """Remove --flag or --flag=PATH from argv; None if absent, '' without a path"""
+    for i, arg in enumerate(argv):
+        if arg == '--':
+            break
+        if arg == flag or arg.startswith(flag + '='):
+            del argv[i]
+            return arg[len(flag) + 1:]
+    return None
+
+
+def from_argv(argv=None):
+    """Start profiling and tracing as --profile/--trace or the environment ask.
+
+    The flags are removed from argv (sys.argv by default) so they are not
+    passed on to claude. Output is written at exit.
+    """
+    global _tracer
+    argv = sys.argv if argv is None else argv
+    profile = _pop(argv, '--profile', 'CLAUDE_NOTIFY_PROFILE')
+    trace = _pop(argv, '--trace', 'CLAUDE_NOTIFY_TRACE')
+    sampler = None
+    if profile is not None:
+        sampler = Sampler(profile or _default_path('.folded')).start()
+    if trace is not None:
+        _tracer = Tracer(trace or _default_path('.trace.json'))
+    if sampler or _tracer:
+        atexit.register(_finish, sampler, _tracer)
+    return sampler, _tracer
+
+
+def _pop(argv, flag, env):
+    value = _take(argv, flag)
+    if value is None:
+        value = os.environ.get(env)
+        if value in ('1', 'true', 'yes'):
+            value = ''
+    return value
+
+
+def _finish(sampler, tracer):
+    written = []
+    if sampler is not None:
+        sampler.stop()
+        written.append(f"{sampler.write()} ({sampler.samples} samples)")
+    if tracer is not None:
+        written.append(f"{tracer.write()} ({len(tracer.spans)} spans)")
+    print(f"profile: {', '.join(written)}", file=sys.stderr)
@@ -0,0 +1,209 @@
+"""Central rate control for waiting notifications.
+
+Each wrapper used to keep its own cooldown (3, 5, 10, 30 or 60 s), so a
+prompt that flapped in and out of view still produced a burst of
+near-identical alerts once the cooldown ran out. A RateController sits
+between detection and delivery and applies these rules in order:
+
+    dedup      an event whose normalised text, context and options match one
+               sent in the last `dedup_window` seconds is dropped; reset()
+               ends the episode, so the same prompt after the user typed
+               goes out again
+    priority   a question with numbered options skips coalescing and goes
+               out at once, using its own small token bucket
+    leading    the first event after a quiet period goes out at once if the
+               channel's token bucket has a token, and opens a window
+    coalesce   events inside an open window are merged; when the window
+               closes they go out as one digest Notice with a count
+
+emit(notice) is called with a Notice. Its count is greater than 1 when it
+stands for several merged events, and lines holds their distinct texts.
+detected is the wall-clock time of the earliest of them, for the
+detection-to-send latency in claude_notify.metrics.
+Window deadlines run on the wrapper's timer queue (PtyRelay.timers) or on a
+shared TimerThread for the line-mode wrappers.
+"""
+
+import re
+import threading
+import time
+from collections import namedtuple
+
+from claude_notify.timers import TimerThread
+
+Notice = namedtuple('Notice', 'text context options count lines detected')
+Notice.__new__.__defaults__ = (None,)
+
+# Per-channel policy: seconds per token, bucket size, coalescing window.
+# The intervals are the cooldowns each wrapper had hard-coded before.
+CHANNEL_POLICIES = {
+    'desktop': (3.0, 1, 3.0),
+    'remote': (5.0, 2, 5.0),
+    'teams': (10.0, 2, 10.0),
+    'secure': (30.0, 2, 30.0),
+    'mobile': (60.0, 1, 30.0),
+    'sms': (60.0, 1, 60.0),
+}
+DEFAULT_POLICY = (10.0, 2, 10.0)
+DEDUP_WINDOW = 120.0
+# Distinct texts kept in one digest
+DIGEST_LINES = 5
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+class TokenBucket:
+    """`burst` tokens, refilled at one token per `interval` seconds"""
+
+    def __init__(self, interval, burst=1, clock=time.monotonic):
+        self.interval = interval
+        self.burst = burst
+        self.clock = clock
+        self.tokens = float(burst)
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        if self.interval > 0:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) / self.interval)
+        else:
+            self.tokens = self.burst
+        self.updated = now
+
+    def take(self):
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def wait_time(self):
+        """Seconds until a token is available"""
+        self._refill()
+        return max((1 - self.tokens) * self.interval, 0.0)
+
+
+def bucket_for(channel, clock=time.monotonic):
+    interval, burst, _ = CHANNEL_POLICIES.get(channel, DEFAULT_POLICY)
+    return TokenBucket(interval, burst, clock)
+
+
+def content_key(text, options=None, context=''):
+    """Hash of the event text, context and options, ignoring case and whitespace runs"""
+    normal = _WHITESPACE.sub(' ', text).strip().lower()
+    if context:
+        normal += '\0' + _WHITESPACE.sub(' ', context).strip().lower()
+    if options:
+        normal += '\0' + '\0'.join(options)
+    # Only compared within this process, so the builtin string hash will do
+    return hash(normal)
+
+
+_timer_thread = None
+_timer_lock = threading.Lock()
+
+
+def _shared_timers():
+    global _timer_thread
+    with _timer_lock:
+        if _timer_thread is None:
+            _timer_thread = TimerThread(name='ratecontrol')
+        return _timer_thread
+
+
+class RateController:
+    def __init__(self, channel, emit, timers=None, dedup_window=DEDUP_WINDOW, clock=time.monotonic):
+        interval, burst, window = CHANNEL_POLICIES.get(channel, DEFAULT_POLICY)
+        self.channel = channel
+        self.emit = emit
+        self.timers = timers if timers is not None else _shared_timers()
+        self.window = window
+        self.dedup_window = dedup_window
+        self.clock = clock
+        self.bucket = TokenBucket(interval, burst, clock)
+        self.priority_bucket = TokenBucket(interval / 2, burst + 1, clock)
+        self.counters = {'offered': 0, 'sent': 0, 'duplicate': 0, 'coalesced': 0, 'digests': 0}
+        self._seen = {}
+        self._pending = []
+        self._window_open = False
+        self._lock = threading.Lock()
+
+    def offer(self, text, context='', options=None):
+        """Submit a waiting event; returns 'sent', 'duplicate' or 'coalesced'"""
+        options = list(options or [])
+        detected = time.time()
+        notice = None
+        with self._lock:
+            self.counters['offered'] += 1
+            now = self.clock()
+            key = content_key(text, options, context)
+            seen = self._seen.get(key)
+            if seen is not None and now - seen < self.dedup_window:
+                self.counters['duplicate'] += 1
+                return 'duplicate'
+            self._seen[key] = now
+            if len(self._seen) > 256:
+                self._seen = {k: t for k, t in self._seen.items() if now - t < self.dedup_window}
+
+            if options and self.priority_bucket.take():
+                # Explicit question: send now and fold anything pending into it
+                merged = self._pending + [(text, context, options, detected)]
+                self._pending = []
+                notice = self._notice(merged)
+            elif not self._window_open and self.bucket.take():
+                notice = Notice(text, context, options, 1, [text], detected)
+                self._open_window(self.window)
+            else:
+                self._pending.append((text, context, options, detected))
+                if not self._window_open:
+                    self._open_window(max(self.window, self.bucket.wait_time()))
+                self.counters['coalesced'] += 1
+                return 'coalesced'
+            self.counters['sent'] += 1
+        self.emit(notice)
+        return 'sent'
+
+    def _open_window(self, delay):
+        self._window_open = True
+        self.timers.call_later(delay, self._close_window)
+
+    def _close_window(self):
+        with self._lock:
+            if not self._pending:
+                self._window_open = False
+                return
+            if not self.bucket.take():
+                self.timers.call_later(self.bucket.wait_time(), self._close_window)
+                return
+            notice = self._notice(self._pending)
+            self._pending = []
+            self.counters['sent'] += 1
+            self.counters['digests'] += 1
+            # Keep the window open so a continuing storm yields one digest per window
+            self.timers.call_later(self.window, self._close_window)
+        self.emit(notice)
+
+    def _notice(self, events):
+        text, context, options, _ = events[-1]
+        lines = []
+        for event_text, _, _, _ in events:
+            if event_text not in lines:
+                lines.append(event_text)
+        return Notice(text, context, options, len(events), lines[-DIGEST_LINES:], events[0][3])
+
+    def reset(self):
+        """End the waiting episode, e.g. when the user starts typing.
+
+        Pending events are dropped and dedup starts afresh: the next
+        turn's prompt is often the same '> ' as the last one.
+        """
+        with self._lock:
+            self._pending = []
+            self._seen = {}
+
+
+def describe(count, message):
+    """message, with a note on how many alerts a notice stands for"""
+    if count <= 1:
+        return message
+    return f"{message} ({count} alerts merged)"
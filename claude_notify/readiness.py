@@ -0,0 +1,108 @@
+"""Readiness probes and background startup tasks.
+
+The remote wrapper used to hold claude back for more than 5 s while it
+started ngrok and Flask behind fixed sleeps. Now each startup step runs as
+a BackgroundTask. wait_until() polls a probe, starting at 10 ms and
+doubling up to a cap. A step that is ready in 200 ms is noticed within a
+few milliseconds, and a slow one costs only a handful of probes. Tasks
+record when they became ready (or why they failed), so the wrapper can
+switch features on at that moment and report the timings afterwards.
+"""
+
+import socket
+import threading
+import time
+
+
+class NotReady(Exception):
+    pass
+
+
+def wait_until(probe, timeout=15.0, initial=0.01, factor=2.0, max_interval=0.5,
+               clock=time.monotonic, sleep=time.sleep):
+    """Call probe() until it returns something truthy and return that.
+
+    Raises NotReady after `timeout` seconds. Exceptions from the probe
+    propagate, so a probe can give up early (say, when the process it waits
+    for has exited).
+    """
+    deadline = clock() + timeout
+    interval = initial
+    while True:
+        value = probe()
+        if value:
+            return value
+        remaining = deadline - clock()
+        if remaining <= 0:
+            raise NotReady(f"not ready after {timeout:g} s")
+        sleep(min(interval, remaining))
+        interval = min(interval * factor, max_interval)
+
+
+def port_open(host, port, timeout=0.2):
+    """Probe: True once something accepts TCP connections on host:port"""
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+class BackgroundTask:
+    """Run fn() on a daemon thread; a truthy return value means ready"""
+
+    def __init__(self, name, fn, on_ready=None, clock=time.monotonic):
+        self.name = name
+        self.fn = fn
+        self.on_ready = on_ready
+        self.clock = clock
+        self.result = None
+        self.error = None
+        self.started = None
+        self.elapsed = None
+        self.done = threading.Event()
+
+    @property
+    def ok(self):
+        return self.done.is_set() and self.error is None
+
+    def start(self):
+        self.started = self.clock()
+        threading.Thread(target=self._run, name=self.name, daemon=True).start()
+        return self
+
+    def _run(self):
+        try:
+            self.result = self.fn()
+            if not self.result:
+                self.error = 'not available'
+        except Exception as e:
+            self.error = str(e) or type(e).__name__
+        self.elapsed = self.clock() - self.started
+        self.done.set()
+        if self.error is None and self.on_ready:
+            self.on_ready(self)
+
+    def wait(self, timeout=None):
+        self.done.wait(timeout)
+        return self.ok
+
+    def status(self):
+        if not self.done.is_set():
+            return {'state': 'pending'}
+        state = {'state': 'ready' if self.ok else 'failed', 'ms': round(self.elapsed * 1000)}
+        if self.error:
+            state['error'] = self.error
+        return state
+
+    def describe(self):
+        status = self.status()
+        if status['state'] == 'pending':
+            return f"{self.name}: still starting"
+        if status['state'] == 'ready':
+            return f"{self.name}: ready in {status['ms']} ms"
+        return f"{self.name}: failed after {status['ms']} ms ({self.error})"
+
+
+def report(tasks):
+    return '\n'.join(task.describe() for task in tasks)
@@ -0,0 +1,284 @@
+"""Compressed session transcripts in asciicast v2 format.
+
+The wrappers kept only the last few dozen lines of output, so the context
+behind a notification was gone by the time anyone looked. Recorder keeps
+everything, and asciinema can play it back:
+
+    rec = Recorder('~/.claude-notify/recordings', rows=rows, cols=cols)
+    rec.output(data)        # on the relay loop: a timestamp and a deque append
+    rec.marker('waiting')   # asciicast "m" event, e.g. when a prompt appears
+    rec.close()
+
+The relay loop only timestamps each chunk and appends it to a deque, without
+taking a lock. Nothing is decoded or encoded until a block is written. Then a
+background thread merges chunks that arrived within COALESCE of each other
+into one asciicast event and compresses every BLOCK_SIZE of output (or
+whatever arrived within FLUSH_INTERVAL) as an independent gzip member. It
+uses a zstd frame instead when the zstandard module is installed. Members
+appended to one file still form a valid .gz or .zst stream. Each block can also be decompressed on its own from its byte
+offset, and claude_notify.search relies on that.
+
+Segments rotate at SEGMENT_SIZE compressed bytes or SEGMENT_AGE seconds,
+checked as each block is written and again whenever the session is quiet.
+Every segment starts with its own header and event times relative to it,
+so each one plays on its own. When a segment is sealed, its block table
+(offset, length, time range) is written next to it as <segment>.blocks.
+Memory is bounded: if the writer falls MAX_PENDING bytes behind, new output
+is dropped and a marker records how much was lost.
+
+Set CLAUDE_NOTIFY_RECORD to a directory (or 1 for ~/.claude-notify/recordings)
+to record the PTY wrappers and supervisor sessions. Segments recorded that
+way are added to the search index in the same directory as they are sealed.
+"""
+
+import codecs
+import gzip
+import json
+import os
+import threading
+import time
+from collections import deque
+
+DEFAULT_DIR = os.path.expanduser('~/.claude-notify/recordings')
+BLOCK_SIZE = 256 * 1024
+# Output chunks closer together than this share one event: a burst is
+# decoded and JSON-encoded once instead of once per PTY read
+COALESCE = 0.01
+FLUSH_INTERVAL = 2.0
+SEGMENT_SIZE = 8 * 1024 * 1024
+SEGMENT_AGE = 3600.0
+MAX_PENDING = 8 * 1024 * 1024
+BLOCKS_SUFFIX = '.blocks'
+
+
+def _gzip(data):
+    return gzip.compress(data, compresslevel=6, mtime=0)
+
+
+def get_codec(name=None):
+    """(file suffix, compress function) for 'zstd', 'gzip' or the best available"""
+    if name in (None, 'zstd'):
+        try:
+            import zstandard
+        except ImportError:
+            if name == 'zstd':
+                raise
+        else:
+            return '.zst', zstandard.ZstdCompressor(level=3).compress
+    return '.gz', _gzip
+
+
+def _coalesce(events, window):
+    """events with each run of output chunks less than window apart merged into one"""
+    run = []
+    for event in events:
+        if event[1] == 'o':
+            if run and event[0] - run[0][0] >= window:
+                yield run[0][0], 'o', b''.join(chunk for _, _, chunk in run)
+                run = []
+            run.append(event)
+            continue
+        if run:
+            yield run[0][0], 'o', b''.join(chunk for _, _, chunk in run)
+            run = []
+        yield event
+    if run:
+        yield run[0][0], 'o', b''.join(chunk for _, _, chunk in run)
+
+
+def decompress_block(path, data):
+    """Inflate one block read from a segment at its recorded offset"""
+    if path.endswith('.zst'):
+        import zstandard
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+def recordings_dir():
+    """Directory named by CLAUDE_NOTIFY_RECORD, or None when recording is off"""
+    target = os.environ.get('CLAUDE_NOTIFY_RECORD', '')
+    if not target or target == '0':
+        return None
+    return DEFAULT_DIR if target == '1' else os.path.expanduser(target)
+
+
+def index_sealed(path, meta):
+    """on_seal hook: add the segment to the search index next to it"""
+    from claude_notify.search import Index
+    index = Index(directory=os.path.dirname(path))
+    try:
+        index.add_segment(path, meta)
+    finally:
+        index.close()
+
+
+def from_env(session=None, rows=24, cols=80, command=None):
+    """A Recorder if CLAUDE_NOTIFY_RECORD asks for one, else None"""
+    directory = recordings_dir()
+    if directory is None:
+        return None
+    return Recorder(directory, session, rows, cols, command, on_seal=index_sealed)
+
+
+class Recorder:
+    def __init__(self, directory, session=None, rows=24, cols=80, command=None, codec=None,
+                 block_size=BLOCK_SIZE, flush_interval=FLUSH_INTERVAL, segment_size=SEGMENT_SIZE,
+                 segment_age=SEGMENT_AGE, max_pending=MAX_PENDING, coalesce=COALESCE, on_seal=None):
+        self.directory = os.path.expanduser(directory)
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        self.session = session or f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        self.rows = rows
+        self.cols = cols
+        self.command = command
+        self.suffix, self._compress = get_codec(codec)
+        self.block_size = block_size
+        self.flush_interval = flush_interval
+        self.segment_size = segment_size
+        self.segment_age = segment_age
+        self.max_pending = max_pending
+        self.coalesce = coalesce
+        self.on_seal = on_seal
+        self.dropped = 0
+        self.segments = []
+        # Wall-clock time of monotonic zero, so event times never jump backwards
+        self._epoch = time.time() - time.monotonic()
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        # deque.append/popleft are atomic. _queued is only written by the
+        # producer and _written only by the writer, so neither needs a lock
+        self._events = deque()
+        self._append = self._events.append
+        self._queued = 0
+        self._written = 0
+        self._wake_at = block_size
+        self._wake = threading.Event()
+        self._reported_drops = 0
+        self._closed = False
+        self._file = None
+        self._seq = 0
+        self._thread = threading.Thread(target=self._run, name='recorder', daemon=True)
+        self._thread.start()
+
+    # Called from the relay loop, one thread at a time
+
+    def output(self, data, monotonic=time.monotonic):
+        queued = self._queued + len(data)
+        if queued - self._written > self.max_pending:
+            self.dropped += len(data)
+            return
+        self._append((monotonic(), 'o', data))
+        self._queued = queued
+        if queued >= self._wake_at:
+            self._wake.set()
+
+    def resize(self, rows, cols):
+        self._append((time.monotonic(), 'r', f"{cols}x{rows}".encode()))
+
+    def marker(self, label):
+        self._append((time.monotonic(), 'm', label.encode()))
+
+    def close(self, timeout=5.0):
+        """Write what is queued, seal the current segment and stop the writer"""
+        self._closed = True
+        self._wake.set()
+        self._thread.join(timeout)
+
+    # Writer thread
+
+    def _take(self):
+        events = []
+        size = 0
+        popleft = self._events.popleft
+        while True:
+            try:
+                event = popleft()
+            except IndexError:
+                break
+            events.append(event)
+            if event[1] == 'o':
+                size += len(event[2])
+                if size >= self.block_size:
+                    break
+        self._written += size
+        self._wake_at = self._written + self.block_size
+        return events
+
+    def _run(self):
+        while True:
+            closed = self._closed
+            if not closed and self._queued - self._written < self.block_size:
+                self._wake.wait(self.flush_interval)
+                self._wake.clear()
+            events = self._take()
+            dropped = self.dropped
+            if dropped > self._reported_drops:
+                events.append((time.monotonic(), 'm', f"recorder dropped {dropped - self._reported_drops} bytes".encode()))
+                self._reported_drops = dropped
+            if events:
+                self._write_block(events)
+            elif self._file and time.monotonic() - self._start > self.segment_age:
+                self._seal()
+            if closed and not self._events:
+                break
+        if self._file:
+            self._seal()
+
+    def _open_segment(self, now):
+        self._seq += 1
+        name = f"{self.session}.{self._seq:04d}.cast{self.suffix}"
+        self._path = os.path.join(self.directory, name)
+        self._file = open(self._path, 'wb')
+        os.chmod(self._path, 0o600)
+        # Whole seconds in the header; event times count from exactly that instant
+        self._timestamp = int(self._epoch + now)
+        self._start = self._timestamp - self._epoch
+        self._header = {'version': 2, 'width': self.cols, 'height': self.rows,
+                        'timestamp': self._timestamp, 'title': self.session}
+        if self.command:
+            self._header['command'] = self.command
+        self._blocks = []
+
+    def _write_block(self, events):
+        if self._file is not None and events[0][0] - self._start > self.segment_age:
+            self._seal()  # A session that never goes quiet still rotates
+        if self._file is None:
+            self._open_segment(events[0][0])
+        lines = [] if self._blocks else [json.dumps(self._header)]
+        for when, kind, data in _coalesce(events, self.coalesce):
+            if kind == 'o':
+                text = self._decoder.decode(data)
+                if not text:
+                    continue
+            else:
+                text = data.decode('utf-8', 'replace')
+                if kind == 'r':
+                    self.cols, self.rows = (int(n) for n in text.split('x'))
+            lines.append(json.dumps([round(when - self._start, 6), kind, text], ensure_ascii=False))
+        if not lines:
+            return
+        raw = ('\n'.join(lines) + '\n').encode()
+        block = self._compress(raw)
+        offset = self._file.tell()
+        self._file.write(block)
+        self._file.flush()
+        self._blocks.append({'offset': offset, 'length': len(block), 'raw': len(raw),
+                             'start': round(self._epoch + events[0][0], 3),
+                             'end': round(self._epoch + events[-1][0], 3)})
+        if offset + len(block) >= self.segment_size:
+            self._seal()
+
+    def _seal(self):
+        self._file.close()
+        self._file = None
+        meta = {'session': self.session, 'header': self._header, 'blocks': self._blocks}
+        tmp = self._path + BLOCKS_SUFFIX + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(meta, f)
+        os.chmod(tmp, 0o600)
+        # The block table appears atomically; its presence marks the segment sealed
+        os.replace(tmp, self._path + BLOCKS_SUFFIX)
+        self.segments.append(self._path)
+        if self.on_seal:
+            try:
+                self.on_seal(self._path, meta)
+            except Exception:
+                pass
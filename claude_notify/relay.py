@@ -0,0 +1,425 @@
+"""Event-driven relay between the user's terminal and a child's PTY.
+
+One selector (epoll on Linux, kqueue on macOS) waits on every descriptor, so
+an idle session costs no wakeups. Reads adapt their size to the output rate,
+and writes are non-blocking. Output queued for a slow terminal is coalesced
+into one writev call. When the queue reaches its byte limit, the relay stops
+reading from the child, which pushes back through the PTY instead of
+stalling the loop or buffering without bound.
+
+Other threads reach the loop through a Mailbox. A put() also signals an
+eventfd (or a self-pipe where there is none) that the selector watches, so
+a command posted from the webhook thread is handled at once instead of on
+the next polling tick.
+"""
+
+import errno
+import fcntl
+import os
+import queue
+import selectors
+import struct
+import termios
+import time
+from collections import deque
+from itertools import islice
+
+from claude_notify import metrics
+from claude_notify.profiler import span
+from claude_notify.timers import TimerQueue
+
+MIN_READ = 4 * 1024
+MAX_READ = 256 * 1024
+# Pending bytes after which we stop reading from the producer side
+DEFAULT_QUEUE_LIMIT = 4 * 1024 * 1024
+IOV_MAX = 1024
+# Bracketed paste (xterm): the child turns it on with PASTE_MODE_ON and then
+# treats text between PASTE_START and PASTE_END as pasted, not typed
+PASTE_MODE_ON = b'\x1b[?2004h'
+PASTE_MODE_OFF = b'\x1b[?2004l'
+PASTE_START = b'\x1b[200~'
+PASTE_END = b'\x1b[201~'
+PASTE_CHUNK = 4096
+
+
+def set_nonblocking(fd, enabled=True):
+    """Set O_NONBLOCK on fd and return the previous flags so they can be restored"""
+    flags = fcntl.fcntl(fd, fcntl.F_GETFL)
+    new_flags = flags | os.O_NONBLOCK if enabled else flags & ~os.O_NONBLOCK
+    if new_flags != flags:
+        fcntl.fcntl(fd, fcntl.F_SETFL, new_flags)
+    return flags
+
+
+def sync_window_size(src_fd, dst_fd):
+    """Copy the terminal size of src_fd onto dst_fd; return (rows, cols) or None"""
+    try:
+        packed = fcntl.ioctl(src_fd, termios.TIOCGWINSZ, b'\0' * 8)
+        fcntl.ioctl(dst_fd, termios.TIOCSWINSZ, packed)
+    except OSError:
+        return None
+    rows, cols = struct.unpack('HHHH', packed)[:2]
+    return (rows, cols) if rows and cols else None
+
+
+def set_window_size(fd, rows, cols):
+    """Set the terminal size of fd (a PTY master or terminal)"""
+    fcntl.ioctl(fd, termios.TIOCSWINSZ, struct.pack('HHHH', rows, cols, 0, 0))
+
+
+class Waker:
+    """A descriptor that becomes readable when another thread calls wake()"""
+
+    def __init__(self):
+        if hasattr(os, 'eventfd'):
+            self._read_fd = self._write_fd = os.eventfd(0, os.EFD_NONBLOCK | os.EFD_CLOEXEC)
+        else:
+            self._read_fd, self._write_fd = os.pipe()
+            set_nonblocking(self._read_fd)
+            set_nonblocking(self._write_fd)
+
+    def fileno(self):
+        return self._read_fd
+
+    def wake(self):
+        try:
+            os.write(self._write_fd, (1).to_bytes(8, 'little'))
+        except BlockingIOError:
+            pass  # Already signalled and not yet drained
+
+    def drain(self):
+        try:
+            while os.read(self._read_fd, 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def close(self):
+        os.close(self._read_fd)
+        if self._write_fd != self._read_fd:
+            os.close(self._write_fd)
+
+
+class Mailbox(queue.Queue):
+    """queue.Queue whose put() also wakes the relay loop watching it"""
+
+    def __init__(self, maxsize=0):
+        super().__init__(maxsize)
+        self.waker = Waker()
+
+    def _put(self, item):
+        super()._put(item)
+        self.waker.wake()
+
+    def fileno(self):
+        return self.waker.fileno()
+
+    def drain(self):
+        """Clear the wakeup, then return everything queued so far"""
+        self.waker.drain()
+        items = []
+        while True:
+            try:
+                items.append(self.get_nowait())
+            except queue.Empty:
+                return items
+
+
+class PasteMode:
+    """Follows the child's bracketed-paste switch and frames pasted text to suit"""
+
+    def __init__(self):
+        self.enabled = False
+        self._tail = b''
+
+    def feed(self, data):
+        # Keep a short tail so a mode switch split across reads is still seen
+        window = self._tail + data
+        on = window.rfind(PASTE_MODE_ON)
+        off = window.rfind(PASTE_MODE_OFF)
+        if on != off:
+            self.enabled = on > off
+        self._tail = window[-(len(PASTE_MODE_ON) - 1):]
+
+    def frame(self, text, submit=True):
+        """The chunks to write for pasting text, then Enter if submit.
+
+        While bracketed paste is on, the text is framed so its newlines stay
+        part of the input instead of each one submitting it. Any end marker
+        inside the text is removed so it cannot break out of the frame.
+        """
+        data = text.encode() if isinstance(text, str) else bytes(text)
+        if self.enabled:
+            data = PASTE_START + data.replace(PASTE_END, b'') + PASTE_END
+        chunks = [data[start:start + PASTE_CHUNK] for start in range(0, len(data), PASTE_CHUNK)]
+        if submit:
+            chunks.append(b'\r')
+        return chunks
+
+
+class WriteQueue:
+    """Bounded queue of bytes for a non-blocking descriptor.
+
+    Given a histogram child as stall, it records how long each spell of
+    the descriptor refusing writes lasted, from the first refusal until
+    the queue drains.
+    """
+
+    def __init__(self, fd, limit=DEFAULT_QUEUE_LIMIT, stall=None):
+        self.fd = fd
+        self.limit = limit
+        self.chunks = deque()
+        self.pending = 0
+        self.stall = stall
+        self._stalled = None
+
+    @property
+    def full(self):
+        return self.pending >= self.limit
+
+    def push(self, data):
+        if data:
+            self.chunks.append(bytes(data))
+            self.pending += len(data)
+
+    def flush(self):
+        """Write as much as the descriptor accepts; return True once drained"""
+        while self.chunks:
+            batch = list(islice(self.chunks, IOV_MAX))
+            try:
+                written = os.writev(self.fd, batch)
+            except BlockingIOError:
+                if self._stalled is None and self.stall is not None:
+                    self._stalled = time.monotonic()
+                return False
+            except InterruptedError:
+                continue
+            except OSError as e:
+                if e.errno != errno.EIO:
+                    raise
+                # The PTY's other side is gone; nothing queued can be written now,
+                # and the read side will see the same EIO and end the loop
+                self.chunks.clear()
+                self.pending = 0
+                self._stalled = None
+                return True
+            self.pending -= written
+            while written:
+                head = self.chunks[0]
+                if written >= len(head):
+                    written -= len(head)
+                    self.chunks.popleft()
+                else:
+                    self.chunks[0] = head[written:]
+                    written = 0
+        if self._stalled is not None:
+            self.stall.observe(time.monotonic() - self._stalled)
+            self._stalled = None
+        return True
+
+
+class PtyRelay:
+    """Copy stdin to the PTY master and the PTY master to stdout until EOF.
+
+    on_output(data) sees every chunk the child writes and on_input(data)
+    every chunk the user types. Both run on the relay loop, so they must be
+    quick. on_tick() runs every tick_interval seconds if one is given.
+    Deadlines scheduled on self.timers run on the loop as well, as do
+    handlers for mailboxes added with watch() and functions passed to
+    call_soon() from other threads. Otherwise the loop only wakes when
+    there is I/O.
+    """
+
+    def __init__(self, master_fd, stdin_fd=0, stdout_fd=1, on_output=None,
+                 on_input=None, on_tick=None, tick_interval=None,
+                 queue_limit=DEFAULT_QUEUE_LIMIT):
+        self.master_fd = master_fd
+        self.stdin_fd = stdin_fd
+        self.stdout_fd = stdout_fd
+        self.on_output = on_output
+        self.on_input = on_input
+        self.on_tick = on_tick
+        self.tick_interval = tick_interval
+        self.read_size = MIN_READ
+        self.to_stdout = WriteQueue(stdout_fd, queue_limit, stall=metrics.RELAY_STALL.labels('stdout'))
+        self.to_child = WriteQueue(master_fd, queue_limit, stall=metrics.RELAY_STALL.labels('child'))
+        self._output_bytes = metrics.RELAY_BYTES.labels('output')
+        self._input_bytes = metrics.RELAY_BYTES.labels('input')
+        metrics.RELAY_QUEUE.set_function(lambda: self.to_stdout.pending, 'stdout')
+        metrics.RELAY_QUEUE.set_function(lambda: self.to_child.pending, 'child')
+        self.selector = selectors.DefaultSelector()
+        self.timers = TimerQueue()
+        self._registered = {}
+        self._saved_flags = {}
+        self._running = False
+        self._mailboxes = {}
+        self._calls = Mailbox()
+        self.watch(self._calls, lambda fn: fn())
+        self.paste_mode = PasteMode()
+
+    def write_local(self, data):
+        """Queue bytes for the user's terminal, in order with child output"""
+        self.to_stdout.push(data)
+        self._update_interest()
+
+    def write_child(self, data):
+        """Queue bytes for the child as if the user had typed them"""
+        self.to_child.push(data)
+        self._update_interest()
+
+    def paste(self, text, submit=True):
+        """Queue text for the child as a single paste, then Enter if submit.
+
+        The bytes go out in PASTE_CHUNK pieces through the non-blocking
+        child queue, so a large paste is fed as fast as the PTY accepts it
+        without blocking the loop.
+        """
+        for chunk in self.paste_mode.frame(text, submit):
+            self.to_child.push(chunk)
+        self._update_interest()
+
+    def watch(self, mailbox, handler):
+        """Call handler(item) on the loop for every item put on mailbox"""
+        self._mailboxes[mailbox.fileno()] = (mailbox, handler)
+        if self._running:
+            self.selector.register(mailbox.fileno(), selectors.EVENT_READ)
+
+    def call_soon(self, fn, *args):
+        """Run fn(*args) on the loop; safe to call from any thread"""
+        self._calls.put(lambda: fn(*args))
+
+    def stop(self):
+        self._running = False
+
+    def _timeout(self):
+        timeout = self.timers.next_timeout()
+        if self.tick_interval is not None and (timeout is None or timeout > self.tick_interval):
+            timeout = self.tick_interval
+        return timeout
+
+    def _want(self, fd, events):
+        current = self._registered.get(fd, 0)
+        if events == current:
+            return
+        if not events:
+            self.selector.unregister(fd)
+            del self._registered[fd]
+        elif current:
+            self.selector.modify(fd, events)
+            self._registered[fd] = events
+        else:
+            self.selector.register(fd, events)
+            self._registered[fd] = events
+
+    def _update_interest(self):
+        if not self._running:
+            return
+        master = selectors.EVENT_WRITE if self.to_child.pending else 0
+        # Backpressure: stop reading the child while the terminal is behind
+        if not self.to_stdout.full:
+            master |= selectors.EVENT_READ
+        self._want(self.master_fd, master)
+        if self.stdin_fd is not None:
+            self._want(self.stdin_fd, 0 if self.to_child.full else selectors.EVENT_READ)
+        self._want(self.stdout_fd, selectors.EVENT_WRITE if self.to_stdout.pending else 0)
+
+    def _read(self, fd, size):
+        try:
+            return os.read(fd, size)
+        except (BlockingIOError, InterruptedError):
+            return None
+        except OSError as e:
+            # Linux reports EIO on the master once the child side is closed
+            if e.errno == errno.EIO:
+                return b""
+            raise
+
+    def _read_child(self):
+        data = self._read(self.master_fd, self.read_size)
+        if data is None:
+            return True
+        if not data:
+            return False
+        # Grow the buffer while reads come back full, shrink when they trickle
+        if len(data) == self.read_size and self.read_size < MAX_READ:
+            self.read_size *= 2
+        elif len(data) < self.read_size // 4 and self.read_size > MIN_READ:
+            self.read_size //= 2
+        self._output_bytes.inc(len(data))
+        self.to_stdout.push(data)
+        # Try the write straight away; most of the time it drains immediately
+        self.to_stdout.flush()
+        self.paste_mode.feed(data)
+        if self.on_output:
+            with span('output', bytes=len(data)):
+                self.on_output(data)
+        return True
+
+    def _read_user(self):
+        data = self._read(self.stdin_fd, MIN_READ)
+        if not data:
+            if data is not None:
+                # stdin closed: keep relaying output but stop watching input
+                self._want(self.stdin_fd, 0)
+                self.stdin_fd = None
+            return
+        self._input_bytes.inc(len(data))
+        self.to_child.push(data)
+        self.to_child.flush()
+        if self.on_input:
+            self.on_input(data)
+
+    def run(self):
+        """Relay until the child closes the PTY or stop() is called"""
+        # A fixed order, each fd once: stdin and stdout are often the same tty
+        for fd in (self.stdin_fd, self.stdout_fd, self.master_fd):
+            if fd is not None and fd not in self._saved_flags:
+                self._saved_flags[fd] = set_nonblocking(fd)
+        self._running = True
+        try:
+            for fd in self._mailboxes:
+                self.selector.register(fd, selectors.EVENT_READ)
+            self._update_interest()
+            while self._running:
+                for key, events in self.selector.select(self._timeout()):
+                    fd = key.fd
+                    if events & selectors.EVENT_READ:
+                        if fd == self.master_fd:
+                            if not self._read_child():
+                                self._running = False
+                                break
+                        elif fd == self.stdin_fd:
+                            self._read_user()
+                        elif fd in self._mailboxes:
+                            mailbox, handler = self._mailboxes[fd]
+                            for item in mailbox.drain():
+                                handler(item)
+                    if events & selectors.EVENT_WRITE:
+                        if fd == self.stdout_fd:
+                            self.to_stdout.flush()
+                        elif fd == self.master_fd:
+                            self.to_child.flush()
+                self.timers.run_due()
+                if self.on_tick:
+                    self.on_tick()
+                self._update_interest()
+            self._drain_stdout()
+        finally:
+            self._running = False
+            self.selector.close()
+            # Reverse order: stdin and stdout often share one open file
+            # description, so the first saved flags are the true originals
+            for fd, flags in reversed(list(self._saved_flags.items())):
+                try:
+                    fcntl.fcntl(fd, fcntl.F_SETFL, flags)
+                except OSError:
+                    pass
+
+    def _drain_stdout(self):
+        """Flush whatever the terminal has not taken yet before returning"""
+        if not self.to_stdout.pending:
+            return
+        with selectors.DefaultSelector() as sel:
+            sel.register(self.stdout_fd, selectors.EVENT_WRITE)
+            while not self.to_stdout.flush():
+                sel.select(1.0)
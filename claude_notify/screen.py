@@ -0,0 +1,433 @@
+"""In-memory VT100/ANSI screen for prompt detection.
+
+Claude's TUI redraws its prompt with cursor movement and colour escapes, so
+raw PTY bytes rarely contain a clean '>' line. Matching them either misses
+the prompt or fires on stale fragments. Screen runs an incremental escape
+sequence parser over the output and keeps the visible grid. It also records
+which rows each chunk touched, so prompt detection runs only on rows that
+changed and its cost follows the size of the redraw, not the volume of output.
+
+Only what affects the visible text is modelled: cursor movement, erase,
+insert/delete, scrolling regions, the alternate screen and wide characters.
+SGR colours, modes and OSC titles are parsed and dropped.
+"""
+
+import codecs
+import re
+import unicodedata
+
+from claude_notify.profiler import span
+
+# Runs of plain printable text, handled without the per-character state machine
+_TEXT_RUN = re.compile(r'[^\x00-\x1f\x7f-\x9f]+')
+# Frame characters the TUI draws around its input box
+BOX_CHARS = ' │┃║|╭╮╰╯┌┐└┘─━═'
+
+GROUND, ESCAPE, ESCAPE_INTERMEDIATE, CSI, OSC, STRING = range(6)
+
+
+def char_width(c):
+    if c.isascii():
+        return 1
+    if unicodedata.combining(c):
+        return 0
+    return 2 if unicodedata.east_asian_width(c) in ('W', 'F') else 1
+
+
+class Screen:
+    """A rows x cols character grid driven by terminal output"""
+
+    def __init__(self, rows=24, cols=80):
+        self.rows = rows
+        self.cols = cols
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self.reset()
+
+    def reset(self):
+        self.grid = [[' '] * self.cols for _ in range(self.rows)]
+        self.x = 0
+        self.y = 0
+        self.top = 0
+        self.bottom = self.rows - 1
+        self.wrap_pending = False
+        self.saved_cursor = (0, 0)
+        self.saved_main = None
+        self.damage = set(range(self.rows))
+        self._state = GROUND
+        self._params = ''
+        self._string_esc = False
+
+    def resize(self, rows, cols):
+        self.grid = self._refit(self.grid, rows, cols)
+        if self.saved_main is not None:
+            # The main screen behind the alternate one must match the new size too
+            grid, x, y = self.saved_main
+            self.saved_main = (self._refit(grid, rows, cols), min(x, cols - 1), min(y, rows - 1))
+        self.rows, self.cols = rows, cols
+        self.top, self.bottom = 0, rows - 1
+        self.saved_cursor = (min(self.saved_cursor[0], cols - 1), min(self.saved_cursor[1], rows - 1))
+        self._clamp()
+        self.damage = set(range(rows))
+
+    def _refit(self, grid, rows, cols):
+        """grid cut or padded to rows x cols, keeping its bottom rows"""
+        fitted = [[' '] * cols for _ in range(rows)]
+        keep = min(rows, self.rows)
+        for y in range(keep):
+            src = grid[self.rows - keep + y]
+            fitted[y][:min(cols, self.cols)] = src[:min(cols, self.cols)]
+        return fitted
+
+    def _clamp(self):
+        """Pull the cursor back onto the grid after a restore or resize"""
+        self.x = min(max(self.x, 0), self.cols - 1)
+        self.y = min(max(self.y, 0), self.rows - 1)
+
+    # -- queries ---------------------------------------------------------
+
+    def row_text(self, y):
+        return ''.join(self.grid[y]).rstrip()
+
+    def take_damage(self):
+        """Rows changed since the last call, in screen order"""
+        damaged = sorted(self.damage)
+        self.damage = set()
+        return damaged
+
+    def prompt_row(self):
+        """Row of the last non-blank text at or above the cursor"""
+        for y in range(self.y, -1, -1):
+            if self.row_text(y).strip(BOX_CHARS):
+                return y
+        return None
+
+    def prompt_line(self):
+        """Text of prompt_row() with any input-box frame stripped"""
+        y = self.prompt_row()
+        return '' if y is None else self.row_text(y).strip(BOX_CHARS)
+
+    def text(self):
+        """The visible screen down to the cursor, trailing blank rows removed"""
+        lines = [self.row_text(y) for y in range(self.y + 1)]
+        while lines and not lines[-1]:
+            lines.pop()
+        return '\n'.join(lines)
+
+    # -- output ----------------------------------------------------------
+
+    def feed(self, data):
+        """Apply a chunk of output (bytes or str); returns rows changed since take_damage()"""
+        if isinstance(data, (bytes, bytearray)):
+            data = self._decoder.decode(data)
+        i = 0
+        n = len(data)
+        while i < n:
+            if self._state == GROUND:
+                m = _TEXT_RUN.match(data, i)
+                if m:
+                    self._draw(m.group())
+                    i = m.end()
+                    continue
+            self._control(data[i])
+            i += 1
+        return self.damage
+
+    def _draw(self, text):
+        if text.isascii():
+            while text:
+                if self.wrap_pending:
+                    self._newline(carriage=True)
+                room = self.cols - self.x
+                part, text = text[:room], text[room:]
+                row = self.grid[self.y]
+                row[self.x:self.x + len(part)] = part
+                self.damage.add(self.y)
+                self.x += len(part)
+                if self.x >= self.cols:
+                    self.x = self.cols - 1
+                    self.wrap_pending = True
+            return
+        for c in text:
+            self._put(c)
+
+    def _put(self, c):
+        width = char_width(c)
+        if width == 0:
+            # Combining mark: attach to the previous cell
+            px = self.x if self.wrap_pending else max(self.x - 1, 0)
+            self.grid[self.y][px] += c
+            self.damage.add(self.y)
+            return
+        if self.wrap_pending or self.x + width > self.cols:
+            self._newline(carriage=True)
+        row = self.grid[self.y]
+        row[self.x] = c
+        if width == 2 and self.x + 1 < self.cols:
+            row[self.x + 1] = ''
+        self.damage.add(self.y)
+        self.x += width
+        if self.x >= self.cols:
+            self.x = self.cols - 1
+            self.wrap_pending = True
+
+    def _newline(self, carriage=False):
+        self.wrap_pending = False
+        if carriage:
+            self.x = 0
+        if self.y == self.bottom:
+            self._scroll_up(1)
+        elif self.y < self.rows - 1:
+            self.y += 1
+
+    def _blank_row(self):
+        return [' '] * self.cols
+
+    def _scroll_up(self, count):
+        count = min(count, self.bottom - self.top + 1)
+        del self.grid[self.top:self.top + count]
+        for _ in range(count):
+            self.grid.insert(self.bottom - count + 1, self._blank_row())
+        self.damage.update(range(self.top, self.bottom + 1))
+
+    def _scroll_down(self, count):
+        count = min(count, self.bottom - self.top + 1)
+        del self.grid[self.bottom - count + 1:self.bottom + 1]
+        for _ in range(count):
+            self.grid.insert(self.top, self._blank_row())
+        self.damage.update(range(self.top, self.bottom + 1))
+
+    # -- escape sequence state machine -----------------------------------
+
+    def _control(self, c):
+        state = self._state
+        if state == GROUND:
+            self._execute(c)
+        elif state == ESCAPE:
+            self._escape(c)
+        elif state == ESCAPE_INTERMEDIATE:
+            # ESC ( B and friends: one designator byte follows
+            self._state = GROUND
+        elif state == CSI:
+            if '\x40' <= c <= '\x7e':
+                self._state = GROUND
+                self._csi(self._params, c)
+            elif c == '\x1b':
+                self._state = ESCAPE
+            elif c < ' ':
+                self._execute(c)
+            else:
+                self._params += c
+        elif state in (OSC, STRING):
+            # Terminated by BEL (OSC only) or ST (ESC \)
+            if c == '\x07' and state == OSC:
+                self._state = GROUND
+            elif self._string_esc:
+                self._string_esc = False
+                self._state = GROUND if c == '\\' else ESCAPE
+                if c != '\\':
+                    self._escape(c)
+            elif c == '\x1b':
+                self._string_esc = True
+
+    def _execute(self, c):
+        if c == '\x1b':
+            self._state = ESCAPE
+        elif c == '\r':
+            self.x = 0
+            self.wrap_pending = False
+        elif c in '\n\x0b\x0c':
+            self._newline()
+        elif c == '\b':
+            self.wrap_pending = False
+            self.x = max(self.x - 1, 0)
+        elif c == '\t':
+            self.x = min((self.x // 8 + 1) * 8, self.cols - 1)
+        elif c == '\x9b':
+            self._state, self._params = CSI, ''
+        elif c == '\x9d':
+            self._state = OSC
+
+    def _escape(self, c):
+        self._state = GROUND
+        if c == '[':
+            self._state, self._params = CSI, ''
+        elif c == ']':
+            self._state = OSC
+        elif c in 'PX^_':
+            self._state = STRING
+        elif c in '()*+#%':
+            self._state = ESCAPE_INTERMEDIATE
+        elif c == 'D':
+            self._newline()
+        elif c == 'E':
+            self._newline(carriage=True)
+        elif c == 'M':
+            if self.y == self.top:
+                self._scroll_down(1)
+            elif self.y > 0:
+                self.y -= 1
+        elif c == '7':
+            self.saved_cursor = (self.x, self.y)
+        elif c == '8':
+            self.x, self.y = self.saved_cursor
+            self._clamp()
+            self.wrap_pending = False
+        elif c == 'c':
+            self.reset()
+
+    def _csi(self, raw, final):
+        private = raw[:1] in ('?', '>', '<', '=')
+        body = raw[1:] if private else raw
+        try:
+            # A negative parameter is as good as a missing one: the default
+            params = [max(int(p), 0) if p else 0 for p in body.split(';')] if body else []
+        except ValueError:
+            return  # Sub-parameters or garbage: ignore the sequence
+        n = params[0] if params and params[0] else 1
+
+        if private:
+            if final in 'hl' and any(p in (47, 1047, 1049) for p in params):
+                self._alternate_screen(final == 'h')
+            return
+        self.wrap_pending = False
+        if final == 'A':
+            self.y = max(self.y - n, self.top if self.y >= self.top else 0)
+        elif final in 'Be':
+            self.y = min(self.y + n, self.bottom if self.y <= self.bottom else self.rows - 1)
+        elif final in 'Ca':
+            self.x = min(self.x + n, self.cols - 1)
+        elif final == 'D':
+            self.x = max(self.x - n, 0)
+        elif final == 'E':
+            self.x, self.y = 0, min(self.y + n, self.rows - 1)
+        elif final == 'F':
+            self.x, self.y = 0, max(self.y - n, 0)
+        elif final in 'G`':
+            self.x = min(n - 1, self.cols - 1)
+        elif final == 'd':
+            self.y = min(n - 1, self.rows - 1)
+        elif final in 'Hf':
+            row = params[0] if params and params[0] else 1
+            col = params[1] if len(params) > 1 and params[1] else 1
+            self.y = min(row - 1, self.rows - 1)
+            self.x = min(col - 1, self.cols - 1)
+        elif final == 'J':
+            self._erase_display(params[0] if params else 0)
+        elif final == 'K':
+            self._erase_line(params[0] if params else 0)
+        elif final == 'X':
+            row = self.grid[self.y]
+            end = min(self.x + n, self.cols)
+            row[self.x:end] = [' '] * (end - self.x)
+            self.damage.add(self.y)
+        elif final == 'P':
+            row = self.grid[self.y]
+            del row[self.x:self.x + n]
+            row.extend([' '] * (self.cols - len(row)))
+            self.damage.add(self.y)
+        elif final == '@':
+            row = self.grid[self.y]
+            row[self.x:self.x] = [' '] * min(n, self.cols - self.x)
+            del row[self.cols:]
+            self.damage.add(self.y)
+        elif final in 'LM':
+            if self.top <= self.y <= self.bottom:
+                saved_top, self.top = self.top, self.y
+                if final == 'L':
+                    self._scroll_down(n)
+                else:
+                    self._scroll_up(n)
+                self.top = saved_top
+                self.x = 0
+        elif final == 'S':
+            self._scroll_up(n)
+        elif final == 'T':
+            self._scroll_down(n)
+        elif final == 'r':
+            top = params[0] if params and params[0] else 1
+            bottom = params[1] if len(params) > 1 and params[1] else self.rows
+            if top < bottom <= self.rows:
+                self.top, self.bottom = top - 1, bottom - 1
+                self.x, self.y = 0, 0
+        elif final == 's':
+            self.saved_cursor = (self.x, self.y)
+        elif final == 'u':
+            self.x, self.y = self.saved_cursor
+            self._clamp()
+
+    def _erase_line(self, mode):
+        row = self.grid[self.y]
+        if mode == 0:
+            row[self.x:] = [' '] * (self.cols - self.x)
+        elif mode == 1:
+            row[:self.x + 1] = [' '] * (self.x + 1)
+        else:
+            row[:] = [' '] * self.cols
+        self.damage.add(self.y)
+
+    def _erase_display(self, mode):
+        if mode == 0:
+            self._erase_line(0)
+            rows = range(self.y + 1, self.rows)
+        elif mode == 1:
+            self._erase_line(1)
+            rows = range(0, self.y)
+        else:
+            rows = range(self.rows)
+        for y in rows:
+            self.grid[y] = self._blank_row()
+        self.damage.update(rows)
+
+    def _alternate_screen(self, enter):
+        if enter and self.saved_main is None:
+            self.saved_main = (self.grid, self.x, self.y)
+            self.grid = [self._blank_row() for _ in range(self.rows)]
+        elif not enter and self.saved_main is not None:
+            self.grid, self.x, self.y = self.saved_main
+            self.saved_main = None
+            self._clamp()
+        self.damage.update(range(self.rows))
+
+
+class PromptWatcher:
+    """Run a WaitingDetector on the prompt row only when a redraw touched it"""
+
+    def __init__(self, detector, rows=24, cols=80):
+        self.detector = detector
+        self.screen = Screen(rows, cols)
+        self.last_prompt = None
+        # Prompt text while the prompt row currently looks like it is waiting
+        self.current = None
+
+    def feed(self, data):
+        """Return the prompt text when new output leaves a fresh prompt on screen"""
+        with span('detect', bytes=len(data)):
+            return self._feed(data)
+
+    def _feed(self, data):
+        self.screen.feed(data)
+        damaged = self.screen.take_damage()
+        if not damaged:
+            return None
+        y = self.screen.prompt_row()
+        if y is None:
+            self.current = None
+            return None
+        if y not in damaged:
+            return None
+        line = self.screen.prompt_line()
+        if not self.detector.is_waiting(line):
+            self.last_prompt = None
+            self.current = None
+            return None
+        self.current = line
+        # The same prompt redrawn in place (cursor blink, spinner) is not new
+        key = (y, line)
+        if key == self.last_prompt:
+            return None
+        self.last_prompt = key
+        return line
+
+    def reset(self):
+        """Forget the last prompt so an identical one reports again"""
+        self.last_prompt = None
@@ -0,0 +1,277 @@
+"""Full-text search over recorded session transcripts.
+
+Grepping the compressed transcripts meant inflating every segment for
+every question. Index keeps an SQLite FTS5 table with one row per recorder
+block (about 256 KB of output). The table is contentless: it holds the
+inverted index, not a second copy of the text. Each row points at its
+segment, byte offset and time range. A query is answered from the index
+alone, and only the blocks that match are read and decompressed to pick
+out the lines and their times.
+
+Segments are indexed as they are sealed while CLAUDE_NOTIFY_RECORD is set.
+sync() picks up any that were missed, and the CLI runs it first.
+
+    python3 -m claude_notify.search 'which file' --since 2d
+    python3 -m claude_notify.search 'edit NEAR/3 file' --session 20261019-101500-s3 --limit 5
+
+Queries use FTS5 syntax (AND, OR, NOT, "phrases", NEAR, prefix*). Input
+that is not valid FTS5 is searched as plain words.
+"""
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime
+
+from claude_notify.lines import strip_escapes
+from claude_notify.recorder import BLOCKS_SUFFIX, DEFAULT_DIR, decompress_block, recordings_dir
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS segments (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    session TEXT NOT NULL,
+    base REAL NOT NULL,
+    start REAL NOT NULL,
+    end REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS blocks (
+    id INTEGER PRIMARY KEY,
+    segment INTEGER NOT NULL REFERENCES segments (id),
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    start REAL NOT NULL,
+    end REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS blocks_time ON blocks (start);
+CREATE VIRTUAL TABLE IF NOT EXISTS block_text USING fts5 (body, content='', tokenize='unicode61');
+"""
+
+_WORD = re.compile(r'\w+')
+_OPERATORS = {'AND', 'OR', 'NOT', 'NEAR'}
+_EXCLUDED = re.compile(r'\bNOT\s+(?:"[^"]*"|\([^)]*\)|\S+)')
+
+Hit = namedtuple('Hit', 'time session path offset text')
+
+
+def _events(lines):
+    """Decode asciicast event lines in one json.loads; a header line is skipped"""
+    lines = [line for line in lines if line.startswith('[')]
+    return json.loads('[' + ','.join(lines) + ']')
+
+
+def plain_lines(lines, base):
+    """(epoch time, text) for each line on screen in a run of event lines"""
+    found = []
+    current, started = '', None
+    for when, kind, data in _events(lines):
+        when += base
+        if kind == 'm':
+            found.append((when, f"» {data}"))
+            continue
+        if kind != 'o':
+            continue
+        pieces = strip_escapes(data.replace('\r\n', '\n')).split('\n')
+        for i, piece in enumerate(pieces):
+            if started is None:
+                started = when
+            current += piece
+            if i < len(pieces) - 1:
+                if current.strip():
+                    found.append((started, current.strip()))
+                current, started = '', None
+    if current.strip():
+        found.append((started, current.strip()))
+    return found
+
+
+def block_text(raw):
+    """Text of a block for the index: output with escapes removed, and markers"""
+    parts = []
+    for _, kind, data in _events(raw.decode('utf-8', 'replace').split('\n')):
+        if kind == 'o':
+            parts.append(data)
+        elif kind == 'm':
+            parts.append(f"\n{data}\n")
+    return strip_escapes(''.join(parts).replace('\r\n', '\n'))
+
+
+def _mentioned(text, terms, test):
+    """Numbers of the lines in text that pass test() over the terms, located with str.find"""
+    anchors = [max(terms, key=len)] if test is all else terms
+    found = set()
+    for anchor in anchors:
+        line_no, last = 0, 0
+        i = text.find(anchor)
+        while i >= 0:
+            start = text.rfind('\n', 0, i) + 1
+            end = text.find('\n', i)
+            if end < 0:
+                end = len(text)
+            line_no += text.count('\n', last, start)
+            last = start
+            line = text[start:end]
+            if test(term in line for term in terms):
+                found.add(line_no)
+            i = text.find(anchor, end)
+    return sorted(found)
+
+
+def _windows(numbers, context):
+    """Merged [start, end) ranges of lines around the given line numbers"""
+    windows = []
+    for i in numbers:
+        if windows and i - context <= windows[-1][1]:
+            windows[-1][1] = i + context + 1
+        else:
+            windows.append([max(0, i - context), i + context + 1])
+    return windows
+
+
+def matching_lines(raw, base, terms, context=8):
+    """Lines with every term (else any term), decoding only the events near a mention"""
+    if not terms:
+        return []
+    text = raw.decode('utf-8', 'replace')
+    lowered = text.lower()
+    lines = text.split('\n')
+    for test in (all, any):
+        found = [hit for start, end in _windows(_mentioned(lowered, terms, test), context)
+                 for hit in plain_lines(lines[start:end], base)]
+        matches = [(t, line) for t, line in found if test(term in line.lower() for term in terms)]
+        if matches:
+            return matches
+    # The terms only meet across events; fall back to the whole block
+    return [(t, line) for t, line in plain_lines(lines, base) if any(term in line.lower() for term in terms)]
+
+
+def parse_time(value):
+    """Epoch seconds from '90m', '2h', '3d' (ago) or an ISO date/time"""
+    if value is None:
+        return None
+    match = re.fullmatch(r'(\d+(?:\.\d+)?)([smhd])', value)
+    if match:
+        scale = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}[match.group(2)]
+        return time.time() - float(match.group(1)) * scale
+    return datetime.fromisoformat(value).timestamp()
+
+
+class Index:
+    def __init__(self, path=None, directory=DEFAULT_DIR):
+        self.directory = os.path.expanduser(directory)
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        self.path = path or os.path.join(self.directory, 'index.db')
+        self.db = sqlite3.connect(self.path, timeout=10)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def add_segment(self, path, meta=None):
+        """Index a sealed segment; returns the number of blocks added"""
+        path = os.path.abspath(path)
+        if self.db.execute('SELECT 1 FROM segments WHERE path = ?', (path,)).fetchone():
+            return 0
+        if meta is None:
+            with open(path + BLOCKS_SUFFIX) as f:
+                meta = json.load(f)
+        blocks = meta['blocks']
+        if not blocks:
+            return 0
+        with open(path, 'rb') as f, self.db:
+            cursor = self.db.execute(
+                'INSERT INTO segments (path, session, base, start, end) VALUES (?, ?, ?, ?, ?)',
+                (path, meta['session'], meta['header']['timestamp'], blocks[0]['start'], blocks[-1]['end']))
+            segment = cursor.lastrowid
+            for block in blocks:
+                f.seek(block['offset'])
+                raw = decompress_block(path, f.read(block['length']))
+                rowid = self.db.execute(
+                    'INSERT INTO blocks (segment, offset, length, start, end) VALUES (?, ?, ?, ?, ?)',
+                    (segment, block['offset'], block['length'], block['start'], block['end'])).lastrowid
+                self.db.execute('INSERT INTO block_text (rowid, body) VALUES (?, ?)', (rowid, block_text(raw)))
+        return len(blocks)
+
+    def sync(self):
+        """Index every sealed segment in the directory not indexed yet; returns blocks added"""
+        known = {row[0] for row in self.db.execute('SELECT path FROM segments')}
+        added = 0
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith(BLOCKS_SUFFIX):
+                continue
+            path = os.path.abspath(os.path.join(self.directory, name[:-len(BLOCKS_SUFFIX)]))
+            if path not in known and os.path.exists(path):
+                added += self.add_segment(path)
+        return added
+
+    def _matching_blocks(self, query, since, until, session, limit):
+        sql = ('SELECT s.path, s.session, s.base, b.offset, b.length FROM block_text '
+               'JOIN blocks b ON b.id = block_text.rowid JOIN segments s ON s.id = b.segment '
+               'WHERE block_text MATCH ? AND b.end >= ? AND b.start <= ? AND (? IS NULL OR s.session = ?) '
+               'ORDER BY b.start DESC LIMIT ?')
+        params = [since or 0, until or float('inf'), session, session, limit]
+        try:
+            return self.db.execute(sql, [query] + params).fetchall()
+        except sqlite3.OperationalError:
+            # Not valid FTS5; search for the words themselves
+            words = ' '.join(f'"{w}"' for w in _WORD.findall(query))
+            if not words:
+                return []
+            return self.db.execute(sql, [words] + params).fetchall()
+
+    def search(self, query, since=None, until=None, session=None, limit=20):
+        """Matching lines, newest first; only blocks the index points at are decompressed"""
+        terms = [w.lower() for w in _WORD.findall(_EXCLUDED.sub(' ', query)) if w not in _OPERATORS]
+        hits = []
+        for path, block_session, base, offset, length in self._matching_blocks(query, since, until, session, limit):
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                raw = decompress_block(path, f.read(length))
+            for when, text in reversed(matching_lines(raw, base, terms)):
+                if (since is None or when >= since) and (until is None or when <= until):
+                    hits.append(Hit(when, block_session, path, offset, text))
+            if len(hits) >= limit:
+                break
+        hits.sort(key=lambda hit: hit.time, reverse=True)
+        return hits[:limit]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python3 -m claude_notify.search', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('query', nargs='?')
+    parser.add_argument('--since', help="e.g. 2h, 3d or 2026-10-01")
+    parser.add_argument('--until')
+    parser.add_argument('--session')
+    parser.add_argument('--limit', type=int, default=20)
+    parser.add_argument('--dir', default=recordings_dir() or DEFAULT_DIR, help='recordings directory')
+    parser.add_argument('--index', help='index database (default: index.db in the recordings directory)')
+    parser.add_argument('-v', '--verbose', action='store_true', help='show segment and block offset')
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+
+    index = Index(args.index, args.dir)
+    try:
+        added = index.sync()
+        if args.verbose and added:
+            print(f"indexed {added} new blocks", file=sys.stderr)
+        if not args.query:
+            return 0
+        hits = index.search(args.query, parse_time(args.since), parse_time(args.until), args.session, args.limit)
+    finally:
+        index.close()
+    for hit in hits:
+        stamp = datetime.fromtimestamp(hit.time).strftime('%Y-%m-%d %H:%M:%S')
+        print(f"{stamp}  {hit.session}  {hit.text[:200]}")
+        if args.verbose:
+            print(f"    {hit.path} @ {hit.offset}")
+    return 0 if hits else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""Local stand-in for every notification service.
+
+Running a wrapper used to mean a Mac for the banners and live Teams,
+Pushover or Telegram endpoints for everything else. Set CLAUDE_NOTIFY_SINK
+to a file and nothing leaves the machine. Every request sent through
+claude_notify.transport, and every banner or sound the wrappers would
+play, is appended to that file as one JSON line and reported as delivered:
+
+    {"time": 1760870400.123, "pid": 4242, "channel": "desktop", "message": "Claude is waiting for your input"}
+    {"time": 1760870401.456, "pid": 4243, "channel": "hooks.example.com", "method": "POST", "url": "...", "body": {...}}
+
+Lines are written with O_APPEND in a single write, so several wrappers
+can share one sink. claude_notify.benchmarks.bench_replay reads it to time
+notifications against the prompts the fake claude wrote.
+"""
+
+import json
+import os
+import time
+from urllib.parse import urlsplit
+
+
+def path():
+    return os.environ.get('CLAUDE_NOTIFY_SINK', '')
+
+
+def capture(channel, **fields):
+    """Record a notification if the sink is set; True means it was captured instead of sent"""
+    target = path()
+    if not target:
+        return False
+    record = dict(time=time.time(), pid=os.getpid(), channel=channel, **fields)
+    line = (json.dumps(record, ensure_ascii=False, default=str) + '\n').encode()
+    fd = os.open(target, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+    try:
+        os.write(fd, line)
+    finally:
+        os.close(fd)
+    return True
+
+
+class Response:
+    """What the callers of transport.post look at on a requests.Response"""
+    status_code = 200
+    ok = True
+    text = 'captured'
+    sid = 'captured'
+
+    def json(self):
+        return {}
+
+    def raise_for_status(self):
+        pass
+
+
+def request(method, url, kwargs):
+    """Capture an HTTP request in place of sending it"""
+    body = kwargs.get('json', kwargs.get('data'))
+    if isinstance(body, bytes):
+        try:
+            body = json.loads(body)
+        except ValueError:
+            body = body.decode('utf-8', 'replace')
+    capture(urlsplit(url).netloc, method=method, url=url, body=body)
+    return Response()
+
+
+class _Messages:
+    def create(self, **fields):
+        capture('twilio', **fields)
+        return Response()
+
+
+class TwilioClient:
+    """Stands in for twilio.rest.Client; messages.create() is captured"""
+    messages = _Messages()
+
+
+def read(target):
+    """Records captured so far in a sink file"""
+    try:
+        with open(target) as f:
+            return [json.loads(line) for line in f if line.endswith('\n')]
+    except FileNotFoundError:
+        return []
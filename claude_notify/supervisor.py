@@ -0,0 +1,856 @@
+"""Resident supervisor that runs many Claude sessions behind one webhook.
+
+Separate remote wrappers each bound port 8888 and each restarted ngrok, so
+starting a second session broke the first. The supervisor runs every
+session's PTY in a single selector loop (no thread per session) with one
+webhook server and one tunnel. A remote command names the session it is for.
+Terminals attach to a session over a Unix socket and can detach with
+Ctrl-\\ while the session keeps running.
+
+    python3 -m claude_notify.supervisor serve [--backends teams,sms] [--no-tunnel]
+    python3 -m claude_notify.supervisor new [claude args...]
+    python3 -m claude_notify.supervisor attach ID
+    python3 -m claude_notify.supervisor list
+    python3 -m claude_notify.supervisor send ID TEXT
+
+`new` starts the supervisor in the background if it is not running yet.
+On the webhook, POST /command {"session": ID, "command": TEXT} injects TEXT
+into that session. Without "session" the command goes to the session that
+most recently asked for input. The tunnel makes the webhook public, so
+/command and /sessions require "Authorization: Bearer $CLAUDE_NOTIFY_TOKEN"
+and refuse every request while CLAUDE_NOTIFY_TOKEN is unset.
+
+The socket speaks one JSON request line, then one JSON reply line. For
+new/attach the supervisor then streams raw session output, and the client
+sends frames of (kind, length, payload): INPUT carries keystrokes and RESIZE
+carries rows and cols.
+"""
+
+import argparse
+import errno
+import json
+import os
+import pty
+import selectors
+import signal
+import socket
+import struct
+import subprocess
+import sys
+import time
+from collections import deque
+
+from claude_notify import metrics, recorder
+from claude_notify.cli import deliver
+from claude_notify.detector import get_detector
+from claude_notify.dispatch import get_dispatcher
+from claude_notify.lines import LineRing
+from claude_notify.options import OptionTracker
+from claude_notify.ratecontrol import RateController
+from claude_notify.relay import (Mailbox, PasteMode, Waker, WriteQueue,
+                                 set_nonblocking, set_window_size)
+from claude_notify.screen import PromptWatcher
+from claude_notify.timers import IdleTimer, TimerQueue
+
+SOCKET_PATH = os.path.expanduser(os.environ.get('CLAUDE_NOTIFY_SOCKET', '~/.claude-notify/supervisor.sock'))
+LOG_PATH = os.path.expanduser('~/.claude-notify/supervisor.log')
+WEBHOOK_PORT = int(os.environ.get('CLAUDE_NOTIFY_WEBHOOK_PORT', '8888'))
+CLAUDE_PATH = os.environ.get('CLAUDE_PATH', 'claude')
+# Shared secret for the webhook routes that drive or list sessions
+WEBHOOK_TOKEN = os.environ.get('CLAUDE_NOTIFY_TOKEN', '')
+READ_SIZE = 64 * 1024
+# Output replayed to a terminal that attaches to a running session
+SCROLLBACK = 64 * 1024
+# A client this far behind is dropped rather than allowed to stall its session
+CLIENT_QUEUE_LIMIT = 1024 * 1024
+MAX_REQUEST = 64 * 1024
+DETACH_KEY = b'\x1c'  # Ctrl-\
+
+FRAME = struct.Struct('!cI')
+INPUT = b'i'
+RESIZE = b'w'
+WINSIZE = struct.Struct('!HH')
+
+
+def frame(kind, payload):
+    return FRAME.pack(kind, len(payload)) + payload
+
+
+class Child:
+    """A forked session process: the part of Popen the supervisor uses"""
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.returncode = None
+
+    def poll(self):
+        if self.returncode is None:
+            try:
+                pid, status = os.waitpid(self.pid, os.WNOHANG)
+            except ChildProcessError:
+                self.returncode = -1  # Reaped elsewhere; the status is lost
+            else:
+                if pid:
+                    self.returncode = os.waitstatus_to_exitcode(status)
+        return self.returncode
+
+    def wait(self):
+        if self.returncode is None:
+            _, status = os.waitpid(self.pid, 0)
+            self.returncode = os.waitstatus_to_exitcode(status)
+        return self.returncode
+
+
+def spawn(argv, slave_fd, cwd):
+    """Run argv in a new session with the PTY slave_fd as its controlling terminal.
+
+    Without a controlling terminal ^C and ^Z from an attached client never
+    become signals, and anything claude runs that opens /dev/tty (ssh, git
+    credential prompts) fails with ENXIO. subprocess can only arrange that
+    from preexec_fn, and running Python between fork and exec can deadlock
+    on a lock that one of the supervisor's threads held at fork time. So
+    the program is looked up before forking, and the child only changes
+    directory, calls login_tty() and execs. An exec failure comes back over
+    a close-on-exec pipe, as it does with subprocess.
+    """
+    import shutil
+    path = argv[0] if os.sep in argv[0] else shutil.which(argv[0])
+    if path is None:
+        raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), argv[0])
+    error_r, error_w = os.pipe()
+    try:
+        pid = os.fork()
+        if pid == 0:
+            try:
+                os.chdir(cwd)
+                os.login_tty(slave_fd)
+                signal.signal(signal.SIGPIPE, signal.SIG_DFL)
+                os.execv(path, argv)
+            except OSError as e:
+                os.write(error_w, str(e.errno).encode())
+            finally:
+                os._exit(127)
+        os.close(error_w)
+        error_w = None
+        error = b''
+        while chunk := os.read(error_r, 32):
+            error += chunk
+    finally:
+        os.close(error_r)
+        if error_w is not None:
+            os.close(error_w)
+    child = Child(pid)
+    if error:
+        child.wait()
+        code = int(error)
+        raise OSError(code, os.strerror(code), argv[0])
+    return child
+
+
+class Session:
+    """One claude process on its own PTY, driven by the supervisor's loop"""
+
+    def __init__(self, supervisor, sid, argv, rows=24, cols=80, cwd=None):
+        self.supervisor = supervisor
+        self.sid = sid
+        self.argv = argv
+        self.cwd = cwd or os.getcwd()
+        master_fd, slave_fd = pty.openpty()
+        try:
+            set_window_size(master_fd, rows, cols)
+            # Own session with the PTY as its terminal: the child gets no signals
+            # meant for the supervisor, and the line discipline signals it instead
+            self.process = spawn(argv, slave_fd, self.cwd)
+        except Exception:
+            os.close(master_fd)
+            raise
+        finally:
+            os.close(slave_fd)
+        set_nonblocking(master_fd)
+        self.master_fd = master_fd
+        self.started = time.time()
+        self.to_child = WriteQueue(master_fd, stall=metrics.RELAY_STALL.labels('child'))
+        self.scrollback = deque()
+        self.scrollback_size = 0
+        self.clients = set()
+        self.lines = LineRing()
+        self.menu = OptionTracker()
+        self.watcher = PromptWatcher(supervisor.detector, rows, cols)
+        self.paste_mode = PasteMode()
+        # Timer callbacks run on the shared loop too, so they are isolated like the rest
+        self.rate = RateController('remote', lambda notice: supervisor.isolate(self, self._send_notice, notice),
+                                   timers=supervisor.timers)
+        self.idle = IdleTimer(supervisor.timers, supervisor.idle,
+                              lambda prompt: supervisor.isolate(self, self._waiting, prompt)
+                              ) if supervisor.idle > 0 else None
+        self.waiting = False
+        # Full transcript when CLAUDE_NOTIFY_RECORD is set
+        self.transcript = recorder.from_env(f"{time.strftime('%Y%m%d-%H%M%S')}-s{sid}",
+                                            rows, cols, ' '.join(argv))
+
+    def describe(self, public=False):
+        """Status for `list`; public leaves out what the webhook must not publish"""
+        status = {'session': self.sid, 'waiting': self.waiting,
+                  'clients': len(self.clients), 'started': int(self.started)}
+        if not public:
+            status.update(pid=self.process.pid, cwd=self.cwd, command=' '.join(self.argv))
+        return status
+
+    def resize(self, rows, cols):
+        if not rows or not cols:
+            return
+        set_window_size(self.master_fd, rows, cols)
+        self.watcher.screen.resize(rows, cols)
+        if self.transcript:
+            self.transcript.resize(rows, cols)
+
+    def write(self, data):
+        """Bytes from an attached terminal"""
+        metrics.RELAY_BYTES.labels('input').inc(len(data))
+        self.to_child.push(data)
+        self.to_child.flush()
+        self._answered()
+
+    def paste(self, text):
+        """A remote command: a menu choice as its digit, anything else one paste followed by Enter"""
+        keys, text = self.menu.answer(text)
+        if keys:
+            self.to_child.push(keys.encode())
+        else:
+            for chunk in self.paste_mode.frame(text):
+                self.to_child.push(chunk)
+        self.to_child.flush()
+        self.menu.reset()
+        self._answered()
+
+    def _answered(self):
+        self.waiting = False
+        self.supervisor.cancel_notice(self)
+        self.rate.reset()
+
+    def output(self, data):
+        metrics.RELAY_BYTES.labels('output').inc(len(data))
+        self.scrollback.append(data)
+        self.scrollback_size += len(data)
+        while self.scrollback_size - len(self.scrollback[0]) >= SCROLLBACK:
+            self.scrollback_size -= len(self.scrollback.popleft())
+        self.paste_mode.feed(data)
+        self.menu.feed(self.lines.feed(data))
+        if self.transcript:
+            self.transcript.output(data)
+        prompt = self.watcher.feed(data)
+        if self.idle:
+            self.idle.touch(self.watcher.current)
+        elif prompt:
+            self._waiting(prompt)
+
+    def _waiting(self, prompt):
+        if self.waiting:
+            return
+        self.waiting = True
+        self.supervisor.last_waiting = self.sid
+        if self.transcript:
+            self.transcript.marker(prompt)
+        self.rate.offer(prompt, '\n'.join(self.lines.tail(20)), self.menu.texts)
+
+    def _send_notice(self, notice):
+        self.supervisor.send_notice(self, notice)
+
+
+class Client:
+    """A connection on the control socket"""
+
+    def __init__(self, sock):
+        sock.setblocking(False)
+        self.sock = sock
+        self.fd = sock.fileno()
+        self.inbox = bytearray()
+        self.out = WriteQueue(self.fd, CLIENT_QUEUE_LIMIT, stall=metrics.RELAY_STALL.labels('client'))
+        self.request = None
+        self.session = None
+        self.closing = False
+
+    def reply(self, message, close=False):
+        self.out.push(json.dumps(message).encode() + b'\n')
+        self.closing = self.closing or close
+
+
+class Supervisor:
+    def __init__(self, socket_path=SOCKET_PATH, names=(), rules='remote', idle=0.0):
+        self.socket_path = socket_path
+        self.names = list(names)
+        self.detector = get_detector(rules)
+        self.idle = idle
+        self.selector = selectors.DefaultSelector()
+        self.timers = TimerQueue()
+        self.sessions = {}
+        self.clients = {}
+        self.last_waiting = None
+        self.public_url = None
+        self.tasks = []
+        # (session id, text) from the webhook thread
+        self.commands = Mailbox()
+        self._waker = Waker()
+        self._interest = {}
+        self._next_id = 1
+        self._exited = []
+        self._running = False
+
+    # Event loop
+
+    def _watch(self, fd, events, handler=None):
+        current = self._interest.get(fd)
+        if not events:
+            if current is not None:
+                self.selector.unregister(fd)
+                del self._interest[fd]
+            return
+        if current is None:
+            self.selector.register(fd, events, handler)
+        elif current != events:
+            self.selector.modify(fd, events, handler)
+        self._interest[fd] = events
+
+    def listen(self):
+        os.makedirs(os.path.dirname(self.socket_path), mode=0o700, exist_ok=True)
+        if os.path.exists(self.socket_path):
+            try:
+                connect(self.socket_path).close()
+                raise RuntimeError(f"a supervisor is already listening on {self.socket_path}")
+            except ConnectionRefusedError:
+                os.unlink(self.socket_path)  # Left behind by one that died
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o177)
+        try:
+            self.listener.bind(self.socket_path)
+        finally:
+            os.umask(old_umask)
+        self.listener.listen(64)
+        self.listener.setblocking(False)
+        self._watch(self.listener.fileno(), selectors.EVENT_READ, self._accept)
+        self._watch(self.commands.fileno(), selectors.EVENT_READ, self._run_commands)
+        self._watch(self._waker.fileno(), selectors.EVENT_READ, lambda events: self._waker.drain())
+
+    def serve_forever(self):
+        self._running = True
+        try:
+            while self._running:
+                for key, events in self.selector.select(self.timers.next_timeout()):
+                    key.data(events)
+                self.timers.run_due()
+                self._reap()
+        finally:
+            self.close()
+
+    def stop(self):
+        """Safe from a signal handler or another thread"""
+        self._running = False
+        self._waker.wake()
+
+    def close(self):
+        sessions = list(self.sessions.values())
+        for session in sessions:
+            self._hang_up(session)
+        for session in sessions:
+            if session.transcript:
+                session.transcript.close()
+        for client in list(self.clients.values()):
+            self._drop(client)
+        self.selector.close()
+        self.listener.close()
+        try:
+            os.unlink(self.socket_path)
+        except OSError:
+            pass
+
+    def _reap(self):
+        self._exited = [p for p in self._exited if p.poll() is None]
+
+    # Sessions
+
+    def start_session(self, argv, rows=24, cols=80, cwd=None):
+        sid = str(self._next_id)
+        session = Session(self, sid, argv, rows, cols, cwd)
+        self._next_id += 1
+        self.sessions[sid] = session
+        self._update_session(session)
+        return session
+
+    def isolate(self, session, fn, *args):
+        """Run fn(*args) on behalf of session; if it raises, close that session, not the loop"""
+        try:
+            return fn(*args)
+        except Exception:
+            import traceback
+            print(f"session {session.sid} failed; closing it", file=sys.stderr)
+            traceback.print_exc()
+            if self.sessions.get(session.sid) is session:
+                self._hang_up(session)
+
+    def _hang_up(self, session):
+        try:
+            os.killpg(session.process.pid, signal.SIGHUP)
+        except OSError:
+            pass
+        self._end_session(session)
+
+    def _update_session(self, session):
+        if self.sessions.get(session.sid) is not session:
+            return  # Ended while handling its last event
+        events = selectors.EVENT_READ
+        if session.to_child.pending:
+            events |= selectors.EVENT_WRITE
+        self._watch(session.master_fd, events, lambda ev: self.isolate(session, self._session_ready, session, ev))
+
+    def _session_ready(self, session, events):
+        if events & selectors.EVENT_WRITE:
+            session.to_child.flush()
+        if events & selectors.EVENT_READ:
+            try:
+                data = os.read(session.master_fd, READ_SIZE)
+            except (BlockingIOError, InterruptedError):
+                data = None
+            except OSError as e:
+                if e.errno != errno.EIO:
+                    raise
+                data = b''  # Linux: the child closed its side
+            if data == b'':
+                self._end_session(session)
+                return
+            if data:
+                for client in list(session.clients):
+                    self._send(client, data)
+                session.output(data)
+        self._update_session(session)
+
+    def _end_session(self, session):
+        self._watch(session.master_fd, 0)
+        os.close(session.master_fd)
+        self.sessions.pop(session.sid, None)
+        self.cancel_notice(session)
+        if session.idle:
+            session.idle.cancel()
+        if session.transcript:
+            # Sealing compresses the last block; let the writer finish it off the loop
+            session.transcript.close(timeout=0)
+        code = session.process.poll()
+        if code is None:
+            self._exited.append(session.process)
+        for client in list(session.clients):
+            client.session = None
+            self._send(client, f"\r\n[session {session.sid} exited]\r\n".encode(), close=True)
+
+    def _run_commands(self, events):
+        for sid, text in self.commands.drain():
+            session = self.sessions.get(sid)
+            if session is not None:
+                self.isolate(session, session.paste, text)
+                self._update_session(session)
+
+    def post_command(self, text, sid=None):
+        """Queue a remote command from any thread; returns the session id or None"""
+        sid = str(sid) if sid is not None else self.last_waiting
+        if sid not in self.sessions:
+            return None
+        self.commands.put((sid, text))
+        return sid
+
+    def send_notice(self, session, notice):
+        if self.names:
+            get_dispatcher().submit('notify', deliver, self.names, notice,
+                                    f"Claude session {session.sid} is waiting for your input",
+                                    key=f'waiting:{session.sid}')
+
+    def cancel_notice(self, session):
+        if self.names:
+            get_dispatcher().cancel(f'waiting:{session.sid}')
+
+    def describe(self, public=False):
+        return [session.describe(public) for session in list(self.sessions.values())]
+
+    # Control socket
+
+    def _accept(self, events):
+        while True:
+            try:
+                sock, _ = self.listener.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            client = Client(sock)
+            self.clients[client.fd] = client
+            self._update_client(client)
+
+    def _update_client(self, client):
+        events = 0 if client.closing else selectors.EVENT_READ
+        if client.out.pending:
+            events |= selectors.EVENT_WRITE
+        self._watch(client.fd, events, lambda ev: self._client_ready(client, ev))
+
+    def _send(self, client, data, close=False):
+        client.out.push(data)
+        client.closing = client.closing or close
+        self._flush(client)
+
+    def _flush(self, client):
+        if client.fd not in self.clients:
+            return
+        if client.out.full:
+            self._drop(client)  # Too slow; it can attach again
+            return
+        try:
+            drained = client.out.flush()
+        except OSError:
+            self._drop(client)
+            return
+        if drained and client.closing:
+            self._drop(client)
+        else:
+            self._update_client(client)
+
+    def _drop(self, client):
+        if self.clients.pop(client.fd, None) is None:
+            return
+        self._watch(client.fd, 0)
+        if client.session is not None:
+            client.session.clients.discard(client)
+        client.sock.close()
+
+    def _client_ready(self, client, events):
+        if events & selectors.EVENT_READ:
+            try:
+                data = client.sock.recv(READ_SIZE)
+            except (BlockingIOError, InterruptedError):
+                data = None
+            except OSError:
+                data = b''
+            if data == b'':
+                self._drop(client)
+                return
+            if data:
+                client.inbox += data
+                self._parse(client)
+        self._flush(client)
+
+    def _parse(self, client):
+        if client.request is None:
+            end = client.inbox.find(b'\n')
+            if end < 0:
+                if len(client.inbox) > MAX_REQUEST:
+                    client.reply({'error': 'request too long'}, close=True)
+                return
+            try:
+                client.request = json.loads(client.inbox[:end])
+            except ValueError:
+                client.reply({'error': 'bad request'}, close=True)
+                return
+            del client.inbox[:end + 1]
+            self._handle(client, client.request)
+        while client.session is not None and len(client.inbox) >= FRAME.size:
+            kind, length = FRAME.unpack_from(client.inbox)
+            if length > MAX_REQUEST:
+                self._drop(client)
+                return
+            if len(client.inbox) < FRAME.size + length:
+                return
+            payload = bytes(client.inbox[FRAME.size:FRAME.size + length])
+            del client.inbox[:FRAME.size + length]
+            session = client.session
+            if kind == INPUT:
+                self.isolate(session, session.write, payload)
+            elif kind == RESIZE and length == WINSIZE.size:
+                self.isolate(session, session.resize, *WINSIZE.unpack(payload))
+            self._update_session(session)
+
+    def _handle(self, client, request):
+        op = request.get('op')
+        if op == 'list':
+            client.reply({'sessions': self.describe(), 'public_url': self.public_url}, close=True)
+        elif op == 'send':
+            sid = self.post_command(request.get('text', ''), request.get('session'))
+            client.reply({'session': sid} if sid else {'error': 'no such session'}, close=True)
+        elif op in ('new', 'attach'):
+            rows, cols = request.get('rows') or 24, request.get('cols') or 80
+            if op == 'new':
+                try:
+                    session = self.start_session(request.get('argv') or [CLAUDE_PATH],
+                                                 rows, cols, request.get('cwd'))
+                except OSError as e:
+                    client.reply({'error': str(e)}, close=True)
+                    return
+            else:
+                session = self.sessions.get(str(request.get('session')))
+                if session is None:
+                    client.reply({'error': 'no such session'}, close=True)
+                    return
+                session.resize(rows, cols)
+            client.reply({'session': session.sid})
+            client.out.push(b''.join(session.scrollback))
+            client.session = session
+            session.clients.add(client)
+        else:
+            client.reply({'error': f"unknown op {op!r}"}, close=True)
+
+
+def create_app(supervisor, token=WEBHOOK_TOKEN):
+    """Flask app shared by every session; Flask is only imported when the server starts"""
+    import functools
+    import hmac
+
+    from flask import Flask, Response, jsonify, request
+    app = Flask(__name__)
+    expected = f"Bearer {token}".encode()
+
+    def requires_token(view):
+        @functools.wraps(view)
+        def checked(*args, **kwargs):
+            if not token:
+                return jsonify({"status": "error", "message": "CLAUDE_NOTIFY_TOKEN is not set"}), 503
+            supplied = request.headers.get('Authorization', '').encode()
+            if not hmac.compare_digest(supplied, expected):
+                return jsonify({"status": "error", "message": "Unauthorized"}), 401
+            return view(*args, **kwargs)
+        return checked
+
+    @app.route('/command', methods=['POST'])
+    @requires_token
+    def receive_command():
+        data = request.get_json(silent=True) or {}
+        command = data.get('command', '')
+        if not command:
+            return jsonify({"status": "error", "message": "No command provided"}), 400
+        sid = supervisor.post_command(command, data.get('session'))
+        if sid is None:
+            return jsonify({"status": "error", "message": "No such session"}), 404
+        return jsonify({"status": "received", "session": sid, "command": command})
+
+    @app.route('/sessions', methods=['GET'])
+    @requires_token
+    def sessions():
+        # Working directories and command lines stay on the local socket
+        # even for authorized callers
+        return jsonify(supervisor.describe(public=True))
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics_endpoint():
+        return Response(metrics.render(), mimetype=metrics.CONTENT_TYPE)
+
+    @app.route('/health', methods=['GET'])
+    def health_check():
+        return jsonify({"status": "healthy", "sessions": len(supervisor.sessions),
+                        "dispatch": get_dispatcher().stats(),
+                        "startup": {task.name: task.status() for task in supervisor.tasks}})
+
+    return app
+
+
+def start_remote_control(supervisor, port, tunnel=True):
+    """Webhook server and (optionally) tunnel as background tasks"""
+    import threading
+
+    from claude_notify.readiness import BackgroundTask, port_open, wait_until
+
+    def run_server():
+        import logging
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)
+        create_app(supervisor).run(host='0.0.0.0', port=port, debug=False, threaded=True)
+
+    def start_server():
+        thread = threading.Thread(target=run_server, daemon=True)
+        thread.start()
+
+        def listening():
+            if not thread.is_alive():
+                raise RuntimeError("webhook server exited (is Flask installed?)")
+            return port_open('127.0.0.1', port)
+        wait_until(listening, timeout=10)
+        return f"http://localhost:{port}"
+
+    def start_tunnel():
+        from claude_notify import tunnel
+        return tunnel.start_ngrok(port)
+
+    def published(task):
+        supervisor.public_url = task.result
+
+    supervisor.tasks.append(BackgroundTask('webhook server', start_server))
+    if tunnel:
+        supervisor.tasks.append(BackgroundTask('ngrok tunnel', start_tunnel, on_ready=published))
+    for task in supervisor.tasks:
+        task.start()
+
+
+# Clients
+
+def connect(path=SOCKET_PATH):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def request(message, path=SOCKET_PATH):
+    """Send one request; returns (reply, socket, bytes read past the reply)"""
+    sock = connect(path)
+    sock.sendall(json.dumps(message).encode() + b'\n')
+    data = b''
+    while b'\n' not in data:
+        chunk = sock.recv(READ_SIZE)
+        if not chunk:
+            raise ConnectionError("supervisor closed the connection")
+        data += chunk
+    line, rest = data.split(b'\n', 1)
+    return json.loads(line), sock, rest
+
+
+def ensure_running(path=SOCKET_PATH, timeout=10):
+    """Start a background supervisor unless one is already listening"""
+    from claude_notify.readiness import wait_until
+
+    def listening():
+        try:
+            connect(path).close()
+            return True
+        except OSError:
+            return False
+    if listening():
+        return
+    os.makedirs(os.path.dirname(LOG_PATH), mode=0o700, exist_ok=True)
+    with open(LOG_PATH, 'ab') as log:
+        subprocess.Popen([sys.executable, '-m', 'claude_notify.supervisor', 'serve', '--socket', path],
+                         stdin=subprocess.DEVNULL, stdout=log, stderr=log, start_new_session=True,
+                         cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    wait_until(listening, timeout=timeout)
+
+
+def attach(message, path=SOCKET_PATH):
+    """Start or join a session and relay this terminal to it until detach or exit"""
+    import select
+    import termios
+    import tty
+
+    stdin_fd, stdout_fd = sys.stdin.fileno(), sys.stdout.fileno()
+    size = os.get_terminal_size(stdout_fd)
+    reply, sock, pending = request(dict(message, rows=size.lines, cols=size.columns), path)
+    if 'error' in reply:
+        print(f"claude-notify: {reply['error']}", file=sys.stderr)
+        return 1
+    sid = reply['session']
+    resized = Waker()
+    old_handler = signal.signal(signal.SIGWINCH, lambda signum, frame: resized.wake())
+    old_tty = termios.tcgetattr(stdin_fd)
+    detached = False
+    try:
+        tty.setraw(stdin_fd)
+        if pending:
+            os.write(stdout_fd, pending)
+        while True:
+            ready, _, _ = select.select([stdin_fd, sock, resized], [], [])
+            if resized in ready:
+                resized.drain()
+                size = os.get_terminal_size(stdout_fd)
+                sock.sendall(frame(RESIZE, WINSIZE.pack(size.lines, size.columns)))
+            if sock in ready:
+                data = sock.recv(READ_SIZE)
+                if not data:
+                    break
+                os.write(stdout_fd, data)
+            if stdin_fd in ready:
+                data = os.read(stdin_fd, READ_SIZE)
+                if DETACH_KEY in data:
+                    data = data[:data.index(DETACH_KEY)]
+                    detached = True
+                if data:
+                    sock.sendall(frame(INPUT, data))
+                if detached or not data:
+                    break
+    finally:
+        termios.tcsetattr(stdin_fd, termios.TCSADRAIN, old_tty)
+        signal.signal(signal.SIGWINCH, old_handler)
+        sock.close()
+        resized.close()
+    if detached:
+        print(f"\r\n[detached from session {sid}; reattach with: python3 -m claude_notify.supervisor attach {sid}]")
+    return 0
+
+
+def list_sessions(path=SOCKET_PATH):
+    reply, sock, _ = request({'op': 'list'}, path)
+    sock.close()
+    if reply.get('public_url'):
+        print(f"webhook: {reply['public_url']}/command")
+    for s in reply['sessions']:
+        state = 'waiting' if s['waiting'] else 'running'
+        print(f"{s['session']:>4}  {state:<8}{s['clients']} attached  pid {s['pid']:<8}{s['cwd']}  {s['command']}")
+    return 0
+
+
+def serve(args):
+    from claude_notify import backends
+
+    names = backends.enabled(args.backends)
+    supervisor = Supervisor(args.socket, names, args.rules, args.idle)
+    supervisor.listen()
+    signal.signal(signal.SIGTERM, lambda signum, frame: supervisor.stop())
+    signal.signal(signal.SIGINT, lambda signum, frame: supervisor.stop())
+    # A session that exits is reaped on the next loop pass
+    signal.signal(signal.SIGCHLD, lambda signum, frame: supervisor._waker.wake())
+    if args.port:
+        if not WEBHOOK_TOKEN:
+            print("CLAUDE_NOTIFY_TOKEN is not set; the webhook will refuse remote commands", flush=True)
+        start_remote_control(supervisor, args.port, tunnel=not args.no_tunnel)
+    metrics.dump_at_exit()
+    print(f"supervisor listening on {args.socket}; notifying via {', '.join(names) or 'nothing'}", flush=True)
+    supervisor.serve_forever()
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python3 -m claude_notify.supervisor', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--socket', default=SOCKET_PATH)
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('serve', help='run the supervisor in the foreground')
+    p.add_argument('--backends', help='comma-separated backend names (default: every configured one)')
+    p.add_argument('--rules', default='remote', help='detector rule set (default: remote)')
+    p.add_argument('--idle', type=float, default=float(os.environ.get('CLAUDE_NOTIFY_IDLE', '0')))
+    p.add_argument('--port', type=int, default=WEBHOOK_PORT, help='webhook port; 0 disables the webhook')
+    p.add_argument('--no-tunnel', action='store_true', help='do not start or reuse an ngrok tunnel')
+    p.add_argument('--socket', default=argparse.SUPPRESS)
+    p = sub.add_parser('new', help='start a claude session and attach to it')
+    p.add_argument('claude_args', nargs=argparse.REMAINDER)
+    p = sub.add_parser('attach', help='attach this terminal to a session')
+    p.add_argument('session')
+    sub.add_parser('list', help='list sessions')
+    p = sub.add_parser('send', help='inject a command into a session')
+    p.add_argument('session')
+    p.add_argument('text')
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+
+    if args.command == 'serve':
+        return serve(args)
+    if args.command == 'new':
+        claude_args = args.claude_args[1:] if args.claude_args[:1] == ['--'] else args.claude_args
+        ensure_running(args.socket)
+        return attach({'op': 'new', 'argv': [CLAUDE_PATH] + claude_args, 'cwd': os.getcwd()}, args.socket)
+    try:
+        if args.command == 'attach':
+            return attach({'op': 'attach', 'session': args.session}, args.socket)
+        if args.command == 'list':
+            return list_sessions(args.socket)
+        reply, sock, _ = request({'op': 'send', 'session': args.session, 'text': args.text}, args.socket)
+        sock.close()
+        if 'error' in reply:
+            print(reply['error'], file=sys.stderr)
+            return 1
+        return 0
+    except (FileNotFoundError, ConnectionRefusedError):
+        print("No supervisor running; start one with: python3 -m claude_notify.supervisor serve",
+              file=sys.stderr)
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
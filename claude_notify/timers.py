@@ -0,0 +1,182 @@
+"""Deadline scheduling for the relay loop and the line-mode wrappers.
+
+All pending deadlines live in one heap. Cancelling a timer only flags it, and
+flagged entries are dropped when they reach the top of the heap or when they
+outnumber live ones. Scheduling therefore costs O(log n) and cancelling O(1),
+and no thread is created per deadline. IdleTimer goes further: pushing its
+deadline back only updates a float, so thousands of redraws per second cost
+no heap operations at all.
+"""
+
+import heapq
+import itertools
+import sys
+import threading
+import time
+
+
+class TimerHandle:
+    __slots__ = ('when', 'callback', 'args', 'cancelled')
+
+    def __init__(self, when, callback, args):
+        self.when = when
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class TimerQueue:
+    """Heap of deadlines driven by an external loop (see PtyRelay)"""
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._heap = []
+        self._seq = itertools.count()
+        self._cancelled = 0
+
+    def __len__(self):
+        return len(self._heap) - self._cancelled
+
+    def call_at(self, when, callback, *args):
+        handle = TimerHandle(when, callback, args)
+        heapq.heappush(self._heap, (when, next(self._seq), handle))
+        return handle
+
+    def call_later(self, delay, callback, *args):
+        return self.call_at(self.clock() + delay, callback, *args)
+
+    def cancel(self, handle):
+        if not handle.cancelled:
+            handle.cancel()
+            self._cancelled += 1
+            # Rebuild once dead entries dominate so the heap stays small
+            if self._cancelled > 64 and self._cancelled * 2 > len(self._heap):
+                self._heap = [e for e in self._heap if not e[2].cancelled]
+                heapq.heapify(self._heap)
+                self._cancelled = 0
+
+    def _prune(self):
+        while self._heap and self._heap[0][2].cancelled:
+            heapq.heappop(self._heap)
+            self._cancelled = max(self._cancelled - 1, 0)
+
+    def next_timeout(self):
+        """Seconds until the earliest live deadline, or None if there is none"""
+        self._prune()
+        if not self._heap:
+            return None
+        return max(self._heap[0][0] - self.clock(), 0)
+
+    def pop_due(self):
+        """Remove and return every live handle whose deadline has passed"""
+        now = self.clock()
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            _, _, handle = heapq.heappop(self._heap)
+            if handle.cancelled:
+                self._cancelled = max(self._cancelled - 1, 0)
+            else:
+                due.append(handle)
+        return due
+
+    def run_due(self):
+        due = self.pop_due()
+        for handle in due:
+            if not handle.cancelled:
+                handle.callback(*handle.args)
+        return len(due)
+
+
+class TimerThread:
+    """A TimerQueue served by one background thread, for loops that block on reads"""
+
+    def __init__(self, name='timers'):
+        self._queue = TimerQueue()
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    @property
+    def clock(self):
+        return self._queue.clock
+
+    def call_at(self, when, callback, *args):
+        with self._cond:
+            handle = self._queue.call_at(when, callback, *args)
+            self._cond.notify()
+        return handle
+
+    def call_later(self, delay, callback, *args):
+        return self.call_at(self._queue.clock() + delay, callback, *args)
+
+    def cancel(self, handle):
+        with self._cond:
+            self._queue.cancel(handle)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait(self._queue.next_timeout())
+                due = self._queue.pop_due()
+            for handle in due:
+                if not handle.cancelled:
+                    try:
+                        handle.callback(*handle.args)
+                    except Exception:
+                        # Say so, but keep serving every later deadline
+                        _report(handle.callback)
+
+
+def _report(callback):
+    import traceback
+    try:
+        print(f"timer callback {getattr(callback, '__qualname__', callback)!r} failed:", file=sys.stderr)
+        traceback.print_exc()
+    except OSError:
+        pass
+
+
+class IdleTimer:
+    """Call on_idle(value) once output has been quiet for `delay` seconds.
+
+    Call touch(value) on every burst of output: a truthy value (for example
+    the prompt text on screen) arms or pushes back the deadline, a falsy one
+    disarms it. An early wakeup simply re-arms for the remaining time.
+    """
+
+    def __init__(self, timers, delay, on_idle):
+        self.timers = timers
+        self.delay = delay
+        self.on_idle = on_idle
+        self.deadline = None
+        self.value = None
+        self._handle = None
+        self._lock = threading.Lock()
+
+    def touch(self, value):
+        with self._lock:
+            if not value:
+                self.deadline = None
+                self.value = None
+                return
+            self.deadline = self.timers.clock() + self.delay
+            self.value = value
+            if self._handle is None:
+                self._handle = self.timers.call_at(self.deadline, self._expire)
+
+    def cancel(self):
+        self.touch(None)
+
+    def _expire(self):
+        with self._lock:
+            self._handle = None
+            if self.deadline is None:
+                return
+            if self.timers.clock() < self.deadline:
+                self._handle = self.timers.call_at(self.deadline, self._expire)
+                return
+            value, self.deadline, self.value = self.value, None, None
+        self.on_idle(value)
@@ -0,0 +1,247 @@
+"""Shared HTTP transport for every notification backend.
+
+A bare requests.post() builds a throwaway Session, so each notification paid
+for a DNS lookup and a fresh TCP and TLS handshake to the same handful of
+hosts. This module keeps one client per scheme and host and reuses its
+connection pool across calls and threads. When httpx and h2 are installed,
+HTTPS hosts get an HTTP/2 client that multiplexes concurrent sends over one
+connection. Otherwise they get a requests.Session whose adapter keeps a
+few connections alive, and without requests a small pool of stdlib
+http.client connections does the same. Twilio clients are cached the same
+way; with TWILIO_API_BASE set, messages are posted straight to the REST API
+at that address instead of through the twilio package.
+
+    from claude_notify.transport import post
+    post(url, json=card, timeout=10)
+
+With CLAUDE_NOTIFY_SINK set, posts and Twilio messages are captured by
+claude_notify.sink instead of leaving the machine.
+"""
+
+import base64
+import json
+import os
+import threading
+from urllib.parse import urlencode, urlsplit
+
+from claude_notify import sink
+
+# Connections kept alive per host; the dispatcher never runs more sends than this
+POOL_SIZE = 4
+# Set CLAUDE_NOTIFY_HTTP2=0 to force HTTP/1.1 keep-alive even with httpx installed
+HTTP2_ENABLED = os.environ.get('CLAUDE_NOTIFY_HTTP2', '1') != '0'
+# Twilio REST API root, e.g. a local claude_notify.mockservices server
+TWILIO_API_BASE = os.environ.get('TWILIO_API_BASE', '')
+
+_clients = {}
+_twilio_clients = {}
+_lock = threading.Lock()
+
+
+def _http2_available():
+    if not HTTP2_ENABLED:
+        return False
+    try:
+        import httpx  # noqa: F401
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _new_client(scheme):
+    if scheme == 'https' and _http2_available():
+        import httpx
+        limits = httpx.Limits(max_connections=POOL_SIZE, max_keepalive_connections=POOL_SIZE)
+        return httpx.Client(http2=True, limits=limits)
+
+    try:
+        import requests
+        from requests.adapters import HTTPAdapter
+    except ImportError:
+        return StdlibClient(scheme)
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE, max_retries=0)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+class StdlibResponse:
+    """The parts of requests.Response the callers use"""
+
+    def __init__(self, status_code, headers, content):
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.headers = headers
+        self.content = content
+        self.text = content.decode('utf-8', 'replace')
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise OSError(f"HTTP {self.status_code}: {self.text[:200]}")
+
+
+class StdlibClient:
+    """Kept-alive http.client connections for one host, for when requests is missing"""
+
+    def __init__(self, scheme):
+        self.scheme = scheme
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _connection(self, netloc, timeout):
+        import http.client
+        if self.scheme == 'https':
+            return http.client.HTTPSConnection(netloc, timeout=timeout)
+        return http.client.HTTPConnection(netloc, timeout=timeout)
+
+    def request(self, method, url, data=None, json=None, headers=None, timeout=None, auth=None, params=None):
+        import http.client
+        parts = urlsplit(url)
+        target = (parts.path or '/') + ('?' + parts.query if parts.query else '')
+        if params:
+            target += ('&' if parts.query else '?') + urlencode(params)
+        headers = dict(headers or {})
+        body = None
+        if json is not None:
+            body = _json_bytes(json)
+            headers.setdefault('Content-Type', 'application/json')
+        elif isinstance(data, dict):
+            body = urlencode(data).encode()
+            headers.setdefault('Content-Type', 'application/x-www-form-urlencoded')
+        elif data is not None:
+            body = data.encode() if isinstance(data, str) else data
+        if auth:
+            token = base64.b64encode(f'{auth[0]}:{auth[1]}'.encode()).decode()
+            headers['Authorization'] = f'Basic {token}'
+
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        reused = conn is not None
+        while True:
+            if conn is None:
+                conn = self._connection(parts.netloc, timeout)
+            conn.timeout = timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(timeout)
+            try:
+                conn.request(method, target, body, headers)
+                response = conn.getresponse()
+                content = response.read()
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                conn.close()
+                if not reused:
+                    raise
+                # The server dropped a kept-alive connection; retry once on a new one
+                conn, reused = None, False
+            except BaseException:
+                conn.close()
+                raise
+        if response.will_close:
+            conn.close()
+        else:
+            with self._lock:
+                if len(self._idle) < POOL_SIZE:
+                    self._idle.append(conn)
+                    conn = None
+            if conn is not None:
+                conn.close()
+        return StdlibResponse(response.status, dict(response.getheaders()), content)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+def _json_bytes(payload):
+    # StdlibClient.request's json argument shadows the module there
+    return json.dumps(payload).encode()
+
+
+def get_client(url):
+    """Pooled client for the scheme and host of url, created on first use"""
+    parts = urlsplit(url)
+    key = (parts.scheme, parts.netloc)
+    client = _clients.get(key)
+    if client is None:
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                client = _clients[key] = _new_client(parts.scheme)
+    return client
+
+
+def post(url, **kwargs):
+    """requests.post() over a kept-alive connection to the same host"""
+    if sink.path():
+        return sink.request('POST', url, kwargs)
+    return get_client(url).post(url, **kwargs)
+
+
+def get(url, **kwargs):
+    return get_client(url).get(url, **kwargs)
+
+
+class TwilioMessage:
+    def __init__(self, fields):
+        self.sid = fields.get('sid')
+        self.status = fields.get('status')
+
+
+class _TwilioMessages:
+    def __init__(self, account_sid, auth_token, base):
+        self.auth = (account_sid, auth_token)
+        self.url = f"{base.rstrip('/')}/2010-04-01/Accounts/{account_sid}/Messages.json"
+
+    def create(self, body, from_, to, **fields):
+        data = dict(fields, Body=body, From=from_, To=to)
+        response = post(self.url, data=data, auth=self.auth, timeout=10)
+        if response.status_code >= 300:
+            raise OSError(f"Twilio HTTP {response.status_code}: {response.text[:200]}")
+        return TwilioMessage(response.json())
+
+
+class TwilioRestClient:
+    """messages.create() over transport.post, for a Twilio-compatible API at TWILIO_API_BASE"""
+
+    def __init__(self, account_sid, auth_token, base):
+        self.messages = _TwilioMessages(account_sid, auth_token, base)
+
+
+def get_twilio_client(account_sid, auth_token):
+    """Twilio REST client reused across messages so its HTTP session stays warm"""
+    if sink.path():
+        return sink.TwilioClient()
+    if TWILIO_API_BASE:
+        return TwilioRestClient(account_sid, auth_token, TWILIO_API_BASE)
+    key = (account_sid, auth_token)
+    client = _twilio_clients.get(key)
+    if client is None:
+        with _lock:
+            client = _twilio_clients.get(key)
+            if client is None:
+                from twilio.rest import Client
+                client = _twilio_clients[key] = Client(account_sid, auth_token)
+    return client
+
+
+def close_all():
+    """Close every pooled connection (tests and benchmarks)"""
+    with _lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
+        _twilio_clients.clear()
@@ -0,0 +1,58 @@
+"""Public HTTPS tunnel to a local port, shared rather than fought over.
+
+Each remote wrapper used to `pkill ngrok` and start its own tunnel, so a
+second session silently took the first one's tunnel away. start_ngrok()
+first asks any running ngrok agent (its local API sits on 4040 or, when that
+is taken, on the next free port) whether it already forwards the port. If
+one does, that tunnel is reused; otherwise a new agent is started next to
+the existing ones.
+"""
+
+import shutil
+import subprocess
+
+from claude_notify import transport
+from claude_notify.readiness import wait_until
+
+API_PORTS = range(4040, 4050)
+
+
+def _forwards(tunnel, port):
+    addr = tunnel.get('config', {}).get('addr', '')
+    return addr.rsplit(':', 1)[-1].rstrip('/') == str(port)
+
+
+def find_tunnel(port):
+    """Public https URL of a running ngrok tunnel to port, or None"""
+    for api_port in API_PORTS:
+        try:
+            response = transport.get(f'http://127.0.0.1:{api_port}/api/tunnels', timeout=0.5)
+            tunnels = response.json()['tunnels']
+        except Exception:
+            continue  # No agent here, or not ngrok
+        for tunnel in tunnels:
+            if tunnel.get('proto') == 'https' and _forwards(tunnel, port):
+                return tunnel['public_url']
+    return None
+
+
+def start_ngrok(port, timeout=15):
+    """Public URL for port, reusing a running tunnel or starting one.
+
+    Blocks until ngrok publishes the tunnel, so call it from a background
+    task. Raises if ngrok is missing or exits.
+    """
+    url = find_tunnel(port)
+    if url:
+        return url
+    if not shutil.which('ngrok'):
+        raise RuntimeError("ngrok not found. Install with: brew install ngrok")
+    agent = subprocess.Popen(['ngrok', 'http', str(port)],
+                             stdout=subprocess.DEVNULL,
+                             stderr=subprocess.DEVNULL)
+
+    def published():
+        if agent.poll() is not None:
+            raise RuntimeError(f"ngrok exited with status {agent.returncode}")
+        return find_tunnel(port)
+    return wait_until(published, timeout=timeout)
@@ -0,0 +1,81 @@
+"""CircuitBreaker state transitions and guarded()"""
+
+from claude_notify.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, get_breaker, guarded
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def make(threshold=3, reset=30.0):
+    clock = FakeClock()
+    return CircuitBreaker('test', failure_threshold=threshold, reset_timeout=reset, clock=clock), clock
+
+
+def test_opens_after_threshold_consecutive_failures():
+    breaker, _ = make()
+    breaker.record(False)
+    breaker.record(False)
+    breaker.record(True)  # a success resets the run
+    breaker.record(False)
+    breaker.record(False)
+    assert breaker.state == CLOSED and breaker.allow()
+    breaker.record(False)
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert breaker.retry_in() == 30.0
+
+
+def test_half_open_lets_one_trial_through():
+    breaker, clock = make()
+    for _ in range(3):
+        breaker.record(False)
+    clock.now += 29.9
+    assert not breaker.allow()
+    clock.now += 0.1
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()  # only the one trial
+
+
+def test_successful_trial_closes():
+    breaker, clock = make()
+    for _ in range(3):
+        breaker.record(False)
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record(True)
+    assert breaker.state == CLOSED and breaker.failures == 0
+    assert breaker.allow()
+
+
+def test_failed_trial_opens_for_another_period():
+    breaker, clock = make()
+    for _ in range(3):
+        breaker.record(False)
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record(False)
+    assert breaker.state == OPEN
+    assert breaker.retry_in() == 30.0
+    clock.now += 30
+    assert breaker.allow()
+
+
+def test_guarded_refuses_while_open():
+    calls = []
+
+    def send():
+        calls.append(1)
+        return False
+    call = guarded('test-guarded', send)
+    breaker = get_breaker('test-guarded')
+    for _ in range(breaker.failure_threshold):
+        assert call() is False
+    assert breaker.state == OPEN
+    assert call() is False
+    assert len(calls) == breaker.failure_threshold
@@ -0,0 +1,19 @@
+"""Rule sets from a file behave like the same rules built in code"""
+
+import json
+
+from claude_notify.detector import Rule, WaitingDetector, load_rules
+
+
+def test_file_rules_use_the_rule_default_case(tmp_path):
+    path = tmp_path / 'rules.json'
+    path.write_text(json.dumps({'positive': [{'name': 'proceed', 'pattern': r'Proceed\?'},
+                                             {'name': 'continue', 'pattern': r'continue\?', 'ignorecase': True}]}))
+    loaded = load_rules(str(path))
+    built = [Rule('proceed', r'Proceed\?'), Rule('continue', r'continue\?', ignorecase=True)]
+    assert loaded == built
+    for rules in (loaded, built):
+        detector = WaitingDetector(rules)
+        assert detector.is_waiting('Proceed?')
+        assert not detector.is_waiting('PROCEED?')
+        assert detector.is_waiting('CONTINUE?')
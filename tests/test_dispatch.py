@@ -0,0 +1,119 @@
+"""Dispatcher: keyed jobs that can be superseded or cancelled, per-channel limits"""
+
+import threading
+import time
+
+import pytest
+
+from claude_notify.dispatch import Dispatcher
+
+
+@pytest.fixture
+def dispatcher():
+    made = []
+
+    def make(**kwargs):
+        made.append(Dispatcher(**kwargs))
+        return made[-1]
+    yield make
+    for d in made:
+        d.shutdown(timeout=1)
+
+
+def block(d, channel='busy'):
+    """Occupy a worker until the returned event is set"""
+    release = threading.Event()
+    started = threading.Event()
+
+    def hold():
+        started.set()
+        release.wait(5)
+    d.submit(channel, hold)
+    assert started.wait(5)
+    return release
+
+
+def test_cancel_drops_a_queued_job(dispatcher):
+    d = dispatcher(workers=1)
+    release = block(d)
+    calls = []
+    job = d.submit('desktop', calls.append, 'sent', key='waiting')
+    assert d.cancel('waiting')
+    assert not d.cancel('waiting')
+    release.set()
+    assert job.done.wait(5) and job.cancelled
+    d.shutdown(timeout=5)
+    assert calls == []
+    assert d.counters['cancelled'] == 1
+
+
+def test_same_key_supersedes_the_queued_job(dispatcher):
+    d = dispatcher(workers=1)
+    release = block(d)
+    calls = []
+    first = d.submit('desktop', calls.append, 'first', key='waiting')
+    second = d.submit('desktop', calls.append, 'second', key='waiting')
+    release.set()
+    second.wait(5)
+    assert first.cancelled and not second.cancelled
+    d.shutdown(timeout=5)
+    assert calls == ['second']
+
+
+def test_cancel_does_not_touch_a_running_job(dispatcher):
+    d = dispatcher(workers=1)
+    release = threading.Event()
+    started = threading.Event()
+
+    def send():
+        started.set()
+        release.wait(5)
+        return 'done'
+    job = d.submit('desktop', send, key='waiting')
+    assert started.wait(5)
+    assert not d.cancel('waiting')
+    release.set()
+    assert job.wait(5) == 'done'
+
+
+def test_channel_limit_caps_concurrency(dispatcher):
+    d = dispatcher(workers=4, channel_limits={'teams': 1})
+    lock = threading.Lock()
+    running = []
+    peak = []
+
+    def send():
+        with lock:
+            running.append(1)
+            peak.append(len(running))
+        time.sleep(0.02)
+        with lock:
+            running.pop()
+    jobs = [d.submit('teams', send) for _ in range(5)]
+    fast = d.submit('desktop', lambda: 'quick')
+    assert fast.wait(5) == 'quick'
+    d.shutdown(timeout=5)
+    assert all(job.done.is_set() for job in jobs)
+    assert max(peak) == 1
+    assert d.counters['completed'] == 6
+
+
+def test_full_queue_rejects(dispatcher):
+    d = dispatcher(workers=1, max_queue=1)
+    release = block(d)
+    assert d.submit('desktop', lambda: None) is not None
+    assert d.submit('desktop', lambda: None) is None
+    assert d.counters['rejected'] == 1
+    release.set()
+
+
+def test_failures_are_recorded_not_raised(dispatcher):
+    d = dispatcher(workers=1)
+
+    def fail():
+        raise RuntimeError('webhook down')
+    job = d.submit('teams', fail)
+    job.done.wait(5)
+    assert isinstance(job.error, RuntimeError)
+    d.shutdown(timeout=5)
+    assert d.counters['failed'] == 1
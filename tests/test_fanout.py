@@ -0,0 +1,74 @@
+"""fan_out: FIRST and ALL completion, timeouts and hedged fallbacks"""
+
+import time
+
+from claude_notify.fanout import ALL, FIRST, TIMED_OUT, Channel, fan_out
+
+
+def after(seconds, ok=True, calls=None, name=None):
+    def send():
+        if calls is not None:
+            calls.append(name)
+        time.sleep(seconds)
+        return ok
+    return send
+
+
+def test_all_waits_for_every_channel():
+    result = fan_out([Channel('teams', after(0.05)), Channel('sms', after(0.01, ok=False))], policy=ALL)
+    assert result.results == {'teams': True, 'sms': False}
+    assert result.winner == 'teams'
+
+
+def test_first_returns_on_the_first_success():
+    result = fan_out([Channel('slow', after(1.0)), Channel('fast', after(0.01))], policy=FIRST)
+    assert result.winner == 'fast'
+    assert 'slow' not in result.results
+    assert result.elapsed < 0.5
+
+
+def test_channels_run_concurrently():
+    start = time.monotonic()
+    fan_out([Channel(f'c{i}', after(0.2)) for i in range(4)], policy=ALL)
+    assert time.monotonic() - start < 0.6
+
+
+def test_a_channel_past_its_timeout_is_timed_out():
+    result = fan_out([Channel('stuck', after(1.0), timeout=0.05), Channel('ok', after(0.01))], policy=ALL)
+    assert result.results == {'stuck': TIMED_OUT, 'ok': True}
+    assert result.elapsed < 0.5
+
+
+def test_exception_counts_as_failure():
+    def boom():
+        raise RuntimeError('refused')
+    result = fan_out([Channel('teams', boom)], policy=ALL)
+    assert result.results == {'teams': False}
+    assert result.winner is None
+
+
+def test_hedge_is_skipped_when_the_primary_succeeds_in_time():
+    calls = []
+    result = fan_out([Channel('pushover', after(0.01)),
+                      Channel('telegram', after(0.01, calls=calls, name='telegram'), hedge_after=0.5)],
+                     policy=FIRST)
+    assert result.winner == 'pushover'
+    assert calls == []
+
+
+def test_hedge_starts_when_the_primary_is_slow():
+    result = fan_out([Channel('pushover', after(1.0)),
+                      Channel('telegram', after(0.01), hedge_after=0.05)], policy=FIRST)
+    assert result.winner == 'telegram'
+    assert result.elapsed < 0.5
+
+
+def test_hedge_starts_at_once_when_the_primary_fails():
+    result = fan_out([Channel('pushover', after(0.01, ok=False)),
+                      Channel('telegram', after(0.01), hedge_after=5)], policy=FIRST)
+    assert result.results == {'pushover': False, 'telegram': True}
+    assert result.elapsed < 1
+
+
+def test_nothing_to_send():
+    assert fan_out([], policy=ALL).results == {}
@@ -0,0 +1,50 @@
+"""LineRing: complete lines out of arbitrary byte chunks"""
+
+from claude_notify.lines import LineRing, strip_escapes
+
+
+def feed_bytes(ring, data, size):
+    completed = []
+    for i in range(0, len(data), size):
+        completed += ring.feed(data[i:i + size])
+    return completed
+
+
+def test_multibyte_characters_split_across_chunks():
+    data = 'héllo ❯ wörld\n界面 ready\n'.encode()
+    for size in range(1, 6):
+        ring = LineRing()
+        assert feed_bytes(ring, data, size) == ['héllo ❯ wörld', '界面 ready']
+        assert ring.current_line() == ''
+
+
+def test_partial_line_is_kept_until_its_newline():
+    ring = LineRing()
+    assert ring.feed(b'Do you want to proceed? ') == []
+    assert ring.current_line() == 'Do you want to proceed? '
+    assert ring.last_line() == 'Do you want to proceed? '
+    assert ring.feed(b'(y/n)\nnext') == ['Do you want to proceed? (y/n)']
+    assert ring.tail(2) == ['Do you want to proceed? (y/n)', 'next']
+
+
+def test_carriage_return_overwrites_the_line():
+    ring = LineRing()
+    assert ring.feed(b'Thinking\rDone    \r\n') == ['Done    ']
+
+
+def test_capacity_and_max_line_bound_memory():
+    ring = LineRing(capacity=3, max_line=10)
+    ring.feed(b''.join(b'line %d\n' % i for i in range(10)))
+    assert list(ring.lines) == ['line 7', 'line 8', 'line 9']
+    assert ring.total_lines == 10
+    ring.feed(b'x' * 100)
+    assert ring.current_line() == 'x' * 10
+
+
+def test_invalid_utf8_is_replaced_not_raised():
+    ring = LineRing()
+    assert ring.feed(b'bad \xff byte\n') == ['bad � byte']
+
+
+def test_strip_escapes_keeps_text_and_newlines():
+    assert strip_escapes('\x1b[1;32mok\x1b[0m\n\x1b]0;title\x07next') == 'ok\nnext'
@@ -0,0 +1,106 @@
+"""OptionTracker: the menu on screen and how remote replies map onto it"""
+
+from claude_notify.options import STALE_AFTER, Option, OptionTracker
+
+SELECTION = [
+    '\x1b[1m╭──────────────────────────────────────╮\x1b[0m',
+    '│ Do you want to make this edit to app.py? │',
+    '│ \x1b[36m❯ 1. Yes\x1b[0m                          │',
+    "│   2. Yes, and don't ask again this session │",
+    '│   3. No, and tell Claude what to do differently │',
+    '╰──────────────────────────────────────╯',
+]
+
+
+def tracker(lines):
+    menu = OptionTracker()
+    menu.feed(lines)
+    return menu
+
+
+def test_selection_menu_is_tracked():
+    menu = tracker(SELECTION)
+    assert menu.texts == ['Yes', "Yes, and don't ask again this session",
+                          'No, and tell Claude what to do differently']
+    assert menu.menu.question == 'Do you want to make this edit to app.py?'
+    assert menu.menu.selectable
+
+
+def test_plain_numbered_list():
+    menu = tracker(['Which database should I use?', '1) Postgres', '2) SQLite', '[3]. DuckDB'])
+    assert menu.texts == ['Postgres', 'SQLite', 'DuckDB']
+    assert menu.menu.question == 'Which database should I use?'
+    assert not menu.menu.selectable
+
+
+def test_numbers_out_of_sequence_are_not_options():
+    menu = tracker(['1. first', '3. skipped two', '2. second'])
+    assert menu.texts == ['first', 'second']
+
+
+def test_a_new_one_starts_a_new_menu():
+    menu = tracker(['Pick a file', '1. a.py', '2. b.py'])
+    generation = menu.menu.generation
+    menu.feed(['Pick a test', '1. test_a.py'])
+    assert menu.texts == ['test_a.py']
+    assert menu.menu.question == 'Pick a test'
+    assert menu.menu.generation != generation
+
+
+def test_redraw_keeps_the_generation():
+    menu = tracker(SELECTION)
+    generation = menu.menu.generation
+    menu.feed(SELECTION)
+    assert menu.menu.generation == generation
+    menu.reset()
+    menu.feed(SELECTION)
+    assert menu.menu.generation != generation  # answered, then asked again
+
+
+def test_question_after_the_options_ends_the_menu():
+    menu = tracker(['1. Postgres', '2. SQLite', 'Proceed with the migration? (y/n)'])
+    assert menu.menu is None and menu.texts == []
+
+
+def test_menu_goes_stale_after_other_output():
+    menu = tracker(['1. Postgres', '2. SQLite'])
+    menu.feed([f'output line {i}' for i in range(STALE_AFTER)])
+    assert menu.texts == ['Postgres', 'SQLite']
+    menu.feed_line('one more line')
+    assert menu.menu is None
+
+
+def test_blank_and_border_lines_do_not_count():
+    menu = tracker(['1. Postgres', '2. SQLite'] + ['', '│     │', '\x1b[2K'] * STALE_AFTER)
+    assert menu.texts == ['Postgres', 'SQLite']
+
+
+def test_resolve_by_number_text_or_prefix():
+    menu = tracker(SELECTION)
+    assert menu.resolve('2') == Option(2, "Yes, and don't ask again this session")
+    assert menu.resolve(' [3]. ').number == 3
+    assert menu.resolve('YES').number == 1
+    assert menu.resolve('no, and').number == 3
+    assert menu.resolve('Yes,').number == 2
+    assert menu.resolve('4') is None
+    assert menu.resolve('n') is None  # too short to be a prefix
+    assert menu.resolve('') is None
+
+
+def test_answer_sends_a_digit_to_a_selection_menu():
+    menu = tracker(SELECTION)
+    assert menu.answer('no, and') == ('3', None)
+    assert menu.answer('please rename it') == (None, 'please rename it')
+
+
+def test_answer_pastes_the_text_of_a_plain_list():
+    menu = tracker(['Which database?', '1. Postgres', '2. SQLite'])
+    assert menu.answer('2') == (None, 'SQLite')
+    assert menu.answer('sqlite') == (None, 'SQLite')
+
+
+def test_reset_forgets_the_menu():
+    menu = tracker(SELECTION)
+    menu.reset()
+    assert menu.menu is None and menu.texts == []
+    assert menu.answer('1') == (None, '1')
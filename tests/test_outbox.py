@@ -0,0 +1,155 @@
+"""Outbox against a real SQLite file: retry, expiry, leases and replay after a restart"""
+
+import itertools
+import json
+import sqlite3
+import time
+
+import pytest
+
+from claude_notify import outbox as outbox_module
+from claude_notify.breaker import get_breaker
+from claude_notify.outbox import LEASE, SCHEMA, Outbox
+
+_names = itertools.count()
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(outbox_module, 'backoff', lambda attempts: 0.01)
+
+
+@pytest.fixture
+def endpoint():
+    # Breakers are process-wide, so every test gets an endpoint of its own
+    return f'endpoint{next(_names)}'
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'outbox.db')
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+def insert(path, endpoint, payload, created, next_attempt=None):
+    db = sqlite3.connect(path, isolation_level=None)
+    db.executescript(SCHEMA)
+    db.execute('INSERT INTO outbox (endpoint, payload, created, next_attempt) VALUES (?, ?, ?, ?)',
+               (endpoint, json.dumps(payload), created, created if next_attempt is None else next_attempt))
+    db.close()
+
+
+def test_failed_sends_are_retried_until_delivered(db_path, endpoint):
+    results = iter([False, False, True])
+    seen = []
+
+    def send(payload):
+        seen.append(payload['n'])
+        return next(results)
+    box = Outbox({endpoint: send}, path=db_path)
+    box.enqueue(endpoint, {'n': 1})
+    assert wait_for(lambda: box.counters['delivered'] == 1)
+    box.close()
+    assert seen == [1, 1, 1]
+    assert box.counters['retried'] == 2
+    assert box.pending(endpoint) == 0
+
+
+def test_exceptions_count_as_failures_until_max_attempts(db_path, endpoint):
+    calls = []
+
+    def send(payload):
+        calls.append(1)
+        raise RuntimeError('503')
+    get_breaker(endpoint).failure_threshold = 100
+    box = Outbox({endpoint: send}, path=db_path, max_attempts=3)
+    box.enqueue(endpoint, {})
+    assert wait_for(lambda: box.counters['dropped'] == 1)
+    box.close()
+    assert len(calls) == 3
+    assert box.pending() == 0
+
+
+def test_partial_progress_is_saved_with_the_retry(db_path, endpoint):
+    attempts = []
+
+    def send(payload):
+        attempts.append(list(payload['sent']))
+        payload['sent'].append(len(attempts))
+        return len(attempts) == 2
+    box = Outbox({endpoint: send}, path=db_path)
+    box.enqueue(endpoint, {'sent': []})
+    assert wait_for(lambda: box.counters['delivered'] == 1)
+    box.close()
+    assert attempts == [[], [1]]
+
+
+def test_old_notifications_expire_unsent(db_path, endpoint):
+    insert(db_path, endpoint, {'n': 1}, created=time.time() - 7200)
+    calls = []
+    box = Outbox({endpoint: calls.append}, path=db_path, max_age=3600)
+    assert wait_for(lambda: box.counters['expired'] == 1)
+    box.close()
+    assert calls == []
+    assert box.pending() == 0
+
+
+def test_leased_rows_are_left_to_their_owner(db_path, endpoint):
+    now = time.time()
+    insert(db_path, endpoint, {'n': 1}, created=now, next_attempt=now + LEASE)
+    calls = []
+    box = Outbox({endpoint: calls.append}, path=db_path)
+    time.sleep(0.2)
+    box.close()
+    assert calls == []
+    assert box.pending(endpoint) == 1
+
+
+def test_delivery_holds_a_lease_on_its_row(db_path, endpoint):
+    leases = []
+
+    def send(payload):
+        db = sqlite3.connect(db_path)
+        leases.append(db.execute('SELECT next_attempt FROM outbox').fetchone()[0] - time.time())
+        db.close()
+        return True
+    box = Outbox({endpoint: send}, path=db_path)
+    box.enqueue(endpoint, {})
+    assert wait_for(lambda: box.counters['delivered'] == 1)
+    box.close()
+    assert LEASE - 5 < leases[0] <= LEASE
+
+
+def test_rows_are_replayed_by_the_next_outbox(db_path, endpoint):
+    first = Outbox({}, path=db_path)
+    first.enqueue(endpoint, {'message': 'waiting'})
+    first.close()
+    assert first.pending(endpoint) == 1
+
+    delivered = []
+    second = Outbox({endpoint: lambda payload: delivered.append(payload) or True}, path=db_path)
+    assert wait_for(lambda: delivered)
+    second.close()
+    assert delivered == [{'message': 'waiting'}]
+    assert second.pending(endpoint) == 0
+
+
+def test_open_breaker_defers_without_calling(db_path, endpoint):
+    breaker = get_breaker(endpoint)
+    for _ in range(breaker.failure_threshold):
+        breaker.record(False)
+    calls = []
+    box = Outbox({endpoint: calls.append}, path=db_path)
+    box.enqueue(endpoint, {})
+    time.sleep(0.2)
+    box.close()
+    assert calls == []
+    assert box.pending(endpoint) == 1
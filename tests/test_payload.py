@@ -0,0 +1,110 @@
+"""fit_context budgets, canonical signed bodies, and the seal/unseal round trip"""
+
+import base64
+import hashlib
+import hmac
+import json
+
+import pytest
+
+from claude_notify.payload import (BUDGETS, DEFAULT_BUDGET, GAP, SEALED_BUDGETS, budget_for, canonical, encode,
+                                   fit_context, seal, unseal)
+
+
+class ReversingCipher:
+    """Stands in for Fernet: bytes in, URL-safe base64 token out"""
+
+    def encrypt(self, data):
+        return base64.urlsafe_b64encode(data[::-1])
+
+    def decrypt(self, token):
+        return base64.urlsafe_b64decode(token)[::-1]
+
+
+def screen(filler=40):
+    lines = [f"● Read(src/module_{i}.py)" for i in range(filler)]
+    lines += ['✻ Thinking… (12s · esc to interrupt)',
+              '╭──────────────────────────────╮',
+              '│ Do you want to make this edit? │',
+              '│ ❯ 1. Yes                       │',
+              '│   2. No, and tell Claude       │',
+              '╰──────────────────────────────╯',
+              '> ']
+    return '\n'.join(lines)
+
+
+def test_sealed_budgets_need_a_cipher():
+    assert budget_for('azure', sealed=True) == SEALED_BUDGETS['azure']
+    assert budget_for('azure') == DEFAULT_BUDGET
+    assert budget_for('pushover', sealed=True) == BUDGETS['pushover']
+    assert budget_for('unknown') == DEFAULT_BUDGET
+
+
+def test_short_context_only_loses_escapes():
+    assert fit_context('\x1b[1mProceed?\x1b[0m (y/n)', 100) == 'Proceed? (y/n)'
+    assert fit_context(None, 100) == ''
+
+
+@pytest.mark.parametrize('budget', [120, 200, 300, 500])
+def test_fitted_context_keeps_the_question_within_budget(budget):
+    fitted = fit_context(screen(), budget)
+    assert len(fitted.encode()) <= budget
+    lines = fitted.split('\n')
+    assert lines[-1] == '>'
+    assert 'Do you want to make this edit?' in lines
+    assert '1. Yes' in fitted
+    assert 'esc to interrupt' not in fitted
+    assert '╭' not in fitted and '│' not in fitted
+    assert GAP in lines
+
+
+def test_lines_stay_in_their_original_order():
+    fitted = fit_context(screen(), 300).split('\n')
+    kept = [line for line in fitted if line != GAP]
+    original = screen().split('\n')
+    positions = [next(i for i, line in enumerate(original) if text.strip() in line) for text in kept]
+    assert positions == sorted(positions)
+
+
+def test_oversized_last_line_is_cut_to_its_tail():
+    fitted = fit_context('x' * 50 + '\n' + 'é' * 200 + 'Continue?', 40)
+    assert len(fitted.encode()) <= 40
+    assert fitted.endswith('Continue?')
+
+
+def test_signature_covers_the_exact_body():
+    body, headers = encode({'b': 'é', 'a': 1}, secret='s3cret', headers={'X-Session-ID': 'abc'})
+    assert body == '{"a":1,"b":"é"}'.encode()
+    assert headers['X-Signature'] == hmac.new(b's3cret', body, hashlib.sha256).hexdigest()
+    assert headers['Content-Type'] == 'application/json'
+    assert 'X-Signature' not in encode({'a': 1}).headers
+
+
+def test_without_a_cipher_the_data_stays_plain_json():
+    data = {'context': 'Proceed?', 'options': ['Yes', 'No']}
+    sealed = seal(data)
+    assert sealed == {'encoding': 'json', 'data': data}
+    assert unseal(sealed) == data
+
+
+def test_seal_round_trip_compresses_when_it_pays():
+    cipher = ReversingCipher()
+    small = {'context': 'y/n?'}
+    sealed = seal(small, cipher)
+    assert sealed['encoding'] == 'fernet'
+    assert unseal(sealed, cipher) == small
+
+    large = {'context': fit_context(screen(200), 2048), 'options': ['Yes', 'No'], 'alerts': 3}
+    sealed = seal(large, cipher)
+    assert sealed['encoding'] == 'zlib+fernet'
+    assert len(sealed['data']) < len(base64.urlsafe_b64encode(canonical(large)))
+    assert unseal(json.loads(json.dumps(sealed)), cipher) == large
+
+
+def test_fernet_round_trip():
+    fernet = pytest.importorskip('cryptography.fernet')
+    cipher = fernet.Fernet(fernet.Fernet.generate_key())
+    data = {'context': fit_context(screen(), 2048), 'options': ['Yes']}
+    sealed = seal(data, cipher)
+    assert sealed['encoding'] == 'zlib+fernet'
+    assert unseal(sealed, cipher) == data
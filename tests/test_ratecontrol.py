@@ -0,0 +1,48 @@
+"""RateController dedup: one alert per waiting episode, not one per prompt text"""
+
+import unittest
+
+from claude_notify.ratecontrol import RateController
+from claude_notify.timers import TimerQueue
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class DedupTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.sent = []
+        self.timers = TimerQueue(self.clock)
+        self.rate = RateController('desktop', self.sent.append, timers=self.timers, clock=self.clock)
+
+    def advance(self, seconds):
+        self.clock.now += seconds
+        self.timers.run_due()
+
+    def test_same_prompt_after_keystroke_is_sent(self):
+        self.assertEqual(self.rate.offer('> ', 'Done. Anything else?'), 'sent')
+        self.rate.reset()  # the user typed
+        self.advance(30)
+        self.assertEqual(self.rate.offer('> ', 'Done. Anything else?'), 'sent')
+        self.assertEqual(len(self.sent), 2)
+
+    def test_flapping_prompt_without_input_is_dropped(self):
+        self.assertEqual(self.rate.offer('> ', 'Done.'), 'sent')
+        self.advance(30)
+        self.assertEqual(self.rate.offer('> ', 'Done.'), 'duplicate')
+
+    def test_same_prompt_with_new_context_is_not_a_duplicate(self):
+        self.assertEqual(self.rate.offer('> ', 'Fixed the parser.'), 'sent')
+        self.advance(30)
+        self.assertNotEqual(self.rate.offer('> ', 'Added the tests.'), 'duplicate')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+"""Recorder: coalesced events, age rotation under constant output, readable segments"""
+
+import gzip
+import json
+import time
+
+from claude_notify.recorder import Recorder
+
+
+def events(path):
+    lines = gzip.decompress(open(path, 'rb').read()).decode().splitlines()
+    header = json.loads(lines[0])
+    return header, [json.loads(line) for line in lines[1:]]
+
+
+def test_chunks_close_together_share_an_event(tmp_path):
+    rec = Recorder(str(tmp_path), session='t', codec='gzip')
+    start = time.monotonic()
+    for i in range(5):
+        rec.output(b'ab', monotonic=lambda: start + i * 0.001)
+    rec.output(b'cd', monotonic=lambda: start + 0.5)
+    rec.marker('waiting')
+    rec.output(b'ef', monotonic=lambda: start + 0.501)
+    rec.close()
+    _, found = events(rec.segments[0])
+    assert [(kind, text) for _, kind, text in found] == [
+        ('o', 'ababababab'), ('o', 'cd'), ('m', 'waiting'), ('o', 'ef')]
+
+
+def test_busy_session_still_rotates_by_age(tmp_path):
+    rec = Recorder(str(tmp_path), session='t', codec='gzip', block_size=64, segment_age=10)
+    start = time.monotonic()
+    sent = b''
+    for i in range(30):
+        data = b'line %d\r\n' % i * 4
+        sent += data
+        rec.output(data, monotonic=lambda: start + i)
+    rec.close()
+    assert len(rec.segments) >= 3
+    played = ''
+    for path in rec.segments:
+        header, found = events(path)
+        assert found[0][0] >= 0 and found[-1][0] < 13
+        played += ''.join(text for _, kind, text in found if kind == 'o')
+    assert played == sent.decode()
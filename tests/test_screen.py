@@ -0,0 +1,60 @@
+"""Screen must keep the cursor on the grid whatever the child or a resize does"""
+
+import unittest
+
+from claude_notify.screen import Screen
+
+
+class CursorBoundsTest(unittest.TestCase):
+
+    def assert_on_grid(self, screen):
+        self.assertTrue(0 <= screen.x < screen.cols and 0 <= screen.y < screen.rows)
+        self.assertEqual(len(screen.grid), screen.rows)
+        self.assertTrue(all(len(row) == screen.cols for row in screen.grid))
+
+    def test_restore_after_shrink(self):
+        screen = Screen(24, 80)
+        screen.feed('\x1b[20;70H\x1b7')
+        screen.resize(10, 40)
+        screen.feed('\x1b8x')
+        self.assert_on_grid(screen)
+        self.assertEqual(screen.row_text(9), ' ' * 39 + 'x')
+
+    def test_csi_restore_after_shrink(self):
+        screen = Screen(24, 80)
+        screen.feed('\x1b[20;70H\x1b[s')
+        screen.resize(10, 40)
+        screen.feed('\x1b[ux')
+        self.assert_on_grid(screen)
+
+    def test_leave_alternate_screen_after_grow(self):
+        screen = Screen(10, 40)
+        screen.feed('main screen\x1b[?1049h')
+        screen.resize(24, 80)
+        screen.feed('\x1b[?1049l\x1b[24;80Hx')
+        self.assert_on_grid(screen)
+        self.assertEqual(screen.row_text(23), ' ' * 79 + 'x')
+
+    def test_leave_alternate_screen_after_shrink(self):
+        screen = Screen(24, 80)
+        screen.feed('\x1b[24;80H\x1b[?1049h')
+        screen.resize(10, 40)
+        screen.feed('\x1b[?1049lx')
+        self.assert_on_grid(screen)
+
+    def test_negative_parameters_are_defaults(self):
+        screen = Screen(24, 80)
+        screen.feed('\x1b[5;5H\x1b[-100Hx')
+        self.assert_on_grid(screen)
+        self.assertEqual(screen.row_text(0), 'x')
+        screen.feed('\x1b[-3A\x1b[-7G\x1b[-2d')
+        self.assert_on_grid(screen)
+
+    def test_huge_insert_stays_in_row(self):
+        screen = Screen(5, 10)
+        screen.feed('abc\x1b[1G\x1b[99999999@')
+        self.assertEqual(screen.grid[0], [' '] * 10)
+
+
+if __name__ == '__main__':
+    unittest.main()